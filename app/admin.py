@@ -1,12 +1,21 @@
 """Django admin configuration."""
 from django.contrib import admin
 
-from .models import Table, User, Reservation, MenuItem, Order, OrderItem
+from .models import Table, User, Reservation, MenuItem, Order, OrderItem, ArchivedReservation, ArchivedOrder, \
+    ArchivedOrderItem, ReservationRecurrence, DailySales, ItemPair, StockShard, Promotion
 
 # Register your models here.
 admin.site.register(Table)
 admin.site.register(User)
 admin.site.register(Reservation)
+admin.site.register(ReservationRecurrence)
 admin.site.register(MenuItem)
 admin.site.register(Order)
 admin.site.register(OrderItem)
+admin.site.register(ArchivedReservation)
+admin.site.register(ArchivedOrder)
+admin.site.register(ArchivedOrderItem)
+admin.site.register(DailySales)
+admin.site.register(ItemPair)
+admin.site.register(StockShard)
+admin.site.register(Promotion)
@@ -6,3 +6,7 @@ class BurgirConfig(AppConfig):
     """App configuration."""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel,unused-import
+        from app import signals
@@ -0,0 +1,87 @@
+"""
+Archival of finished reservations and orders.
+
+Rows older than the retention window are copied into the archive tables and
+deleted from the hot tables in small chunks, each in its own short
+transaction, so that no write lock is held for long.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from app import counters
+from app.models import (ArchivedOrder, ArchivedOrderItem, ArchivedReservation, Order, OrderItem,
+                        Reservation)
+
+DEFAULT_RETENTION = timedelta(days=90)
+DEFAULT_CHUNK_SIZE = 500
+
+RESERVATION_FIELDS = ["id", "number_of_people", "date_and_time", "duration", "end_time", "user_id", "table_id"]
+ORDER_FIELDS = ["id", "status", "user_id", "created_at"]
+ORDER_ITEM_FIELDS = ["id", "item_id", "amount", "order_id", "price", "discount", "promotion_id"]
+
+
+def archive_reservations_chunk(cutoff, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Moves up to chunk_size reservations that ended before the cutoff into the archive.
+
+    Args:
+        cutoff (datetime): Reservations ending before this are archived.
+        chunk_size (int): Maximum number of reservations to move.
+
+    Returns:
+        int: Number of reservations moved.
+    """
+    with transaction.atomic():
+        # Recurring reservations stay, their rule still produces occurrences
+        rows = list(Reservation.objects.select_for_update().filter(end_time__lt=cutoff, recurrence__isnull=True)
+                    .order_by("end_time").values(*RESERVATION_FIELDS)[:chunk_size])
+        if not rows:
+            return 0
+        ArchivedReservation.objects.bulk_create([ArchivedReservation(**row) for row in rows])
+        Reservation.objects.filter(id__in=[row["id"] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_orders_chunk(cutoff, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Moves up to chunk_size finished orders created before the cutoff, with their
+    items, into the archive.
+
+    Args:
+        cutoff (datetime): Orders created before this are archived.
+        chunk_size (int): Maximum number of orders to move.
+
+    Returns:
+        int: Number of orders moved.
+    """
+    with transaction.atomic():
+        rows = list(Order.objects.select_for_update()
+                    .filter(status__in=Order.FINISHED_STATUSES, created_at__lt=cutoff)
+                    .order_by("created_at").values(*ORDER_FIELDS)[:chunk_size])
+        if not rows:
+            return 0
+        order_ids = [row["id"] for row in rows]
+        items = OrderItem.objects.filter(order_id__in=order_ids).values(*ORDER_ITEM_FIELDS)
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in rows])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items])
+        # Order items are removed by the cascade; archived orders stay counted in the rollups
+        with counters.paused():
+            Order.objects.filter(id__in=order_ids).delete()
+    return len(rows)
+
+
+def archive_chunk(retention=DEFAULT_RETENTION, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Moves one chunk of reservations and one chunk of orders into the archive.
+
+    Args:
+        retention (timedelta): How long finished rows stay in the hot tables.
+        chunk_size (int): Maximum number of rows of each kind to move.
+
+    Returns:
+        tuple[int, int]: Number of reservations and orders moved.
+    """
+    cutoff = timezone.now() - retention
+    return archive_reservations_chunk(cutoff, chunk_size), archive_orders_chunk(cutoff, chunk_size)
@@ -0,0 +1,152 @@
+"""
+Automatic table assignment.
+
+Tables are bucketed by capacity in an in-process index, so finding the
+tables that fit a party is a binary search rather than a scan. The index is
+rebuilt when the tables version shows that another process changed the
+tables, and when the table it picked turns out to be gone or changed. Availability
+and fragmentation of the candidates are then read from the slot bitmaps of
+the affected days in one query, with a single reservation probe for tables
+whose bitmap cannot give a definite answer and one query for recurring
+reservations.
+"""
+from bisect import bisect_left
+
+from django.db import transaction
+
+from app import recurrence, slots, versions
+from app.models import Reservation, Table, TableSlotBitmap
+
+
+class CapacityIndex:
+    """
+    Tables grouped by max_people, with the distinct capacities kept sorted.
+    """
+
+    def __init__(self, tables):
+        """
+        Args:
+            tables (Iterable[tuple[int, int, int]]): (id, min_people, max_people) triples.
+        """
+        self.buckets = {}
+        for table_id, min_people, max_people in sorted(tables, key=lambda table: (table[2], table[0])):
+            self.buckets.setdefault(max_people, []).append((table_id, min_people))
+        self.capacities = sorted(self.buckets)
+
+    def candidates(self, number_of_people):
+        """
+        Yields the buckets of tables that fit the party, smallest capacity first.
+
+        Args:
+            number_of_people (int): Size of the party.
+
+        Yields:
+            list[int]: Ids of fitting tables with the same max_people.
+        """
+        for capacity in self.capacities[bisect_left(self.capacities, number_of_people):]:
+            bucket = [table_id for table_id, min_people in self.buckets[capacity] if min_people <= number_of_people]
+            if bucket:
+                yield bucket
+
+
+VERSION_NAME = "tables"
+
+_index = versions.LocalCache(
+    VERSION_NAME, lambda version: CapacityIndex(Table.objects.values_list("id", "min_people", "max_people")))
+
+
+def get_index():
+    """
+    Returns the capacity index, building it with one query when it is not cached or the tables changed.
+
+    Returns:
+        CapacityIndex: The index of all tables.
+    """
+    return _index.get()
+
+
+def invalidate_index():
+    """
+    Drops the cached capacity index of this process and, through the tables
+    version, those of the other processes; called whenever a table changes.
+    """
+    versions.bump(VERSION_NAME)
+    _index.invalidate()
+    transaction.on_commit(_index.invalidate)
+
+
+def free_runs(bits):
+    """
+    Counts the runs of free slots in a day bitmap.
+
+    Args:
+        bits (int): Occupied slots of a day.
+
+    Returns:
+        int: Number of maximal runs of consecutive free slots.
+    """
+    free = ~bits & slots.FULL_DAY
+    # A run starts at every free slot whose preceding slot is not free
+    return bin(free & ~(free << 1)).count("1")
+
+
+def assign_table(number_of_people, start_time, duration):
+    """
+    Picks the best free table for a reservation: the smallest max_people that
+    fits, with ties broken by the fewest free runs left on the affected days.
+
+    Args:
+        number_of_people (int): Size of the party.
+        start_time (datetime): Start of the reservation.
+        duration (timedelta): Length of the reservation.
+
+    Returns:
+        Table: The chosen table, or None if no fitting table is free.
+    """
+    for _ in range(2):
+        best = best_table(get_index(), number_of_people, start_time, duration)
+        if best is None:
+            return None
+        table = Table.objects.filter(id=best, min_people__lte=number_of_people,
+                                     max_people__gte=number_of_people).first()
+        if table is not None:
+            return table
+        # Another process deleted or resized the table since the index was built
+        _index.invalidate()
+    return None
+
+
+def best_table(index, number_of_people, start_time, duration):
+    """
+    Returns the id of the best free table in the index, see assign_table().
+    """
+    end_time = start_time + duration
+    buckets = list(index.candidates(number_of_people))
+    if not buckets:
+        return None
+
+    masks = slots.slot_masks(start_time, end_time)
+    table_ids = [table_id for bucket in buckets for table_id in bucket]
+    bitmaps = {table_id: dict.fromkeys(masks, 0) for table_id in table_ids}
+    for table_id, day, value in TableSlotBitmap.objects.filter(
+            table_id__in=table_ids, day__in=masks.keys()).values_list("table_id", "day", "slots"):
+        bitmaps[table_id][day] = int.from_bytes(value, "little")
+
+    occupied = {table_id for table_id, days in bitmaps.items()
+                if any(bits & masks[day] for day, bits in days.items())}
+    if occupied and not slots.is_aligned(start_time, end_time):
+        # Partially covered slots need the reservation rows to tell whether they really clash
+        occupied = set(Reservation.objects.filter(
+            table_id__in=occupied, date_and_time__lt=end_time, end_time__gt=start_time
+        ).values_list("table_id", flat=True))
+    # Later occurrences of recurring reservations are not in the bitmaps
+    occupied.update(series.table_id for series in recurrence.load_series(table_ids, start_time, end_time)
+                    if recurrence.overlaps_interval(series, start_time, end_time))
+
+    for bucket in buckets:
+        free = [table_id for table_id in bucket if table_id not in occupied]
+        if free:
+            return min(free, key=lambda table_id: (
+                sum(free_runs(bits | masks[day]) for day, bits in bitmaps[table_id].items()), table_id
+            ))
+    return None
@@ -0,0 +1,120 @@
+"""
+Free slot search for tables.
+
+Busy intervals for all candidate tables are loaded with a single ordered query
+and the gaps between them are found in one sweep per table, so the cost of a
+search does not depend on the number of slots in the requested window.
+"""
+from itertools import groupby
+
+from django.utils import timezone
+
+from app import recurrence
+from app.models import Reservation, Table
+
+
+def candidate_tables(number_of_people):
+    """
+    Returns the tables whose capacity fits the given party size.
+
+    Args:
+        number_of_people (int): Size of the party.
+
+    Returns:
+        QuerySet: Matching tables.
+    """
+    return Table.objects.filter(min_people__lte=number_of_people, max_people__gte=number_of_people)
+
+
+def busy_intervals(table_ids, window_start, window_end):
+    """
+    Loads the reservations of the given tables that touch the window.
+
+    Args:
+        table_ids (list[int]): Tables to load reservations for.
+        window_start (datetime): Start of the window.
+        window_end (datetime): End of the window.
+
+    Returns:
+        dict[int, list[tuple[datetime, datetime]]]: Intervals per table id, sorted by start.
+    """
+    rows = Reservation.objects.filter(
+        table_id__in=table_ids,
+        date_and_time__lt=window_end,
+        end_time__gt=window_start,
+    ).order_by('table_id', 'date_and_time').values_list('table_id', 'date_and_time', 'end_time')
+
+    intervals = {table_id: [] for table_id in table_ids}
+    for table_id, group in groupby(rows, key=lambda row: row[0]):
+        intervals[table_id] = [(start, end) for _, start, end in group]
+
+    # Later occurrences of recurring reservations, expanded within the window only
+    occurrences = recurrence.expand(recurrence.load_series(table_ids, window_start, window_end),
+                                    window_start, window_end)
+    for series, start, end in occurrences:
+        intervals[series.table_id].append((start, end))
+    if occurrences:
+        for table_intervals in intervals.values():
+            table_intervals.sort()
+    return intervals
+
+
+def free_starts(intervals, window_start, window_end, slot, duration, not_before=None):
+    """
+    Sweeps the sorted busy intervals of one table and yields every slot start
+    in [window_start, window_end) where a reservation of the given duration fits.
+
+    Args:
+        intervals (list[tuple[datetime, datetime]]): Busy intervals sorted by start.
+        window_start (datetime): Start of the window, also the origin of the slot grid.
+        window_end (datetime): Starts at or after this are not returned.
+        slot (timedelta): Slot granularity.
+        duration (timedelta): Length of the reservation.
+        not_before (datetime): Starts before this are not returned.
+
+    Yields:
+        datetime: Bookable start times in ascending order.
+    """
+    lower = window_start if not_before is None else max(window_start, not_before)
+    # Gaps end where the next busy interval starts; the final gap is open-ended
+    # since a reservation starting inside the window may run past its end.
+    sentinel = [(window_end + duration, window_end + duration)]
+    cursor = window_start
+    for busy_start, busy_end in list(intervals) + sentinel:
+        gap_start = max(cursor, lower)
+        gap_end = busy_start
+        if gap_end - gap_start >= duration:
+            # First slot on the grid at or after gap_start
+            steps = -((window_start - gap_start) // slot)
+            start = window_start + steps * slot
+            while start + duration <= gap_end and start < window_end:
+                yield start
+                start += slot
+        cursor = max(cursor, busy_end)
+
+
+def find_available_slots(number_of_people, window_start, window_end, slot, duration):
+    """
+    Finds every bookable (table, start) pair for a party within a window.
+
+    Args:
+        number_of_people (int): Size of the party.
+        window_start (datetime): Earliest start time.
+        window_end (datetime): Latest start time (exclusive).
+        slot (timedelta): Slot granularity.
+        duration (timedelta): Length of the reservation.
+
+    Returns:
+        list[dict]: Dictionaries with ``table`` and ``start`` keys, ordered by table and start.
+    """
+    table_ids = list(candidate_tables(number_of_people).values_list('id', flat=True))
+    if not table_ids:
+        return []
+
+    now = timezone.now()
+    intervals = busy_intervals(table_ids, window_start, window_end + duration)
+    return [
+        {'table': table_id, 'start': start}
+        for table_id in table_ids
+        for start in free_starts(intervals[table_id], window_start, window_end, slot, duration, not_before=now)
+    ]
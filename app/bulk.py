@@ -0,0 +1,132 @@
+"""
+Bulk import of reservations.
+
+The whole batch is validated in memory: tables and users are loaded once,
+conflicts inside the batch are found by sorting the intervals of each table,
+and conflicts with stored reservations are found against a single ordered
+query. Valid batches are written with one bulk_create.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate, groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from app import recurrence, slots
+from app.models import Reservation, Table, User
+from app.serializers import ReservationImportSerializer, reservation_overlap_guard
+
+MAX_BATCH_SIZE = 5000
+
+
+def import_reservations(rows):
+    """
+    Validates and creates a batch of reservations. Nothing is written unless
+    every row is valid.
+
+    Args:
+        rows (list[dict]): Reservation data, one dictionary per row.
+
+    Returns:
+        tuple[list[Reservation], dict[int, list]]: The created reservations and
+        the validation errors per row index.
+    """
+    errors = defaultdict(list)
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = ReservationImportSerializer(data=row)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            errors[index].append(serializer.errors)
+
+    with transaction.atomic():
+        tables = Table.objects.in_bulk({data['table'] for data in valid.values()})
+        user_ids = set(User.objects.filter(id__in={data['user'] for data in valid.values()})
+                       .values_list('id', flat=True))
+        now = timezone.now()
+
+        by_table = defaultdict(list)
+        for index, data in valid.items():
+            table = tables.get(data['table'])
+            if table is None:
+                errors[index].append({'table': [f"Table {data['table']} does not exist."]})
+                continue
+            if data['user'] not in user_ids:
+                errors[index].append({'user': [f"User {data['user']} does not exist."]})
+                continue
+            if data['date_and_time'] < now:
+                errors[index].append("The reservation cannot be in the past.")
+                continue
+            if data['number_of_people'] < table.min_people or data['number_of_people'] > table.max_people:
+                errors[index].append("The number of people exceeds the table's capacity.")
+                continue
+            by_table[table.id].append((data['date_and_time'], data['date_and_time'] + data['duration'], index))
+
+        _check_conflicts(by_table, errors)
+
+        if errors:
+            transaction.set_rollback(True)
+            return [], dict(errors)
+
+        reservations = []
+        for index, data in sorted(valid.items()):
+            reservation = Reservation(
+                user_id=data['user'],
+                table_id=data['table'],
+                number_of_people=data['number_of_people'],
+                date_and_time=data['date_and_time'],
+                duration=data['duration'],
+            )
+            reservation.set_end_time()
+            reservations.append(reservation)
+        # Rows committed concurrently since the conflict check still trip the constraint
+        with reservation_overlap_guard():
+            Reservation.objects.bulk_create(reservations, batch_size=500)
+        slots.mark_many((reservation.table_id, reservation.date_and_time, reservation.end_time)
+                        for reservation in reservations)
+    return reservations, {}
+
+
+def _check_conflicts(by_table, errors):
+    """
+    Records an error for every interval that overlaps an earlier interval of
+    the same batch or a stored reservation of the same table.
+
+    Args:
+        by_table (dict[int, list[tuple]]): (start, end, row index) triples per table id.
+        errors (dict[int, list]): Errors per row index, updated in place.
+    """
+    if not by_table:
+        return
+
+    window_start = min(start for intervals in by_table.values() for start, _, _ in intervals)
+    window_end = max(end for intervals in by_table.values() for _, end, _ in intervals)
+    stored = Reservation.objects.filter(
+        table_id__in=by_table.keys(), date_and_time__lt=window_end, end_time__gt=window_start
+    ).order_by('table_id', 'date_and_time').values_list('table_id', 'date_and_time', 'end_time')
+    existing = {table_id: [(start, end) for _, start, end in group]
+                for table_id, group in groupby(stored, key=lambda row: row[0])}
+    series_by_table = defaultdict(list)
+    for series in recurrence.load_series(by_table.keys(), window_start, window_end):
+        series_by_table[series.table_id].append(series)
+
+    for table_id, intervals in by_table.items():
+        intervals.sort()
+        stored_starts = [start for start, _ in existing.get(table_id, [])]
+        # Running maximum of the stored end times, so that the latest end among
+        # all reservations starting before a given time is a single lookup.
+        stored_ends = list(accumulate((end for _, end in existing.get(table_id, [])), max))
+
+        batch_end = None
+        for start, end, index in intervals:
+            if batch_end is not None and start < batch_end:
+                errors[index].append("The reservation overlaps another reservation in the batch.")
+                continue
+            position = bisect_left(stored_starts, end)
+            if position and stored_ends[position - 1] > start \
+                    or any(recurrence.overlaps_interval(series, start, end) for series in series_by_table[table_id]):
+                errors[index].append("The selected table is not available at this time.")
+                continue
+            batch_end = end
@@ -0,0 +1,70 @@
+"""
+Helpers for tables of counters that are maintained incrementally.
+
+Rollups such as the daily sales are kept up to date by adding differences
+to their rows rather than recomputing them. The differences of a change are
+applied with a single upsert, and can be paused for operations that remove
+rows from the source tables without undoing what was counted (archiving).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection, transaction
+from django.db.models import F
+
+_paused = ContextVar("counters_paused", default=False)
+
+
+@contextmanager
+def paused():
+    """
+    Stops the signal handlers from updating the counters inside the block.
+    """
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def is_paused():
+    """
+    Returns whether counter updates from signal handlers are paused.
+    """
+    return _paused.get()
+
+
+def increment(model, keys, values, rows):
+    """
+    Adds differences to counter rows, creating the rows that do not exist yet.
+    Uses one INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL.
+
+    Args:
+        model (type[Model]): Counter model with a unique constraint over the key fields.
+        keys (list[str]): Names of the key fields.
+        values (list[str]): Names of the counter fields.
+        rows (Iterable[tuple]): Key values followed by the differences, in field order.
+    """
+    # Sorted so that concurrent changes lock the rows in the same order
+    rows = sorted(row for row in rows if any(row[len(keys):]))
+    if not rows:
+        return
+    if connection.vendor not in ("postgresql", "sqlite"):
+        with transaction.atomic():
+            for row in rows:
+                key = dict(zip(keys, row))
+                counter, _ = model.objects.select_for_update().get_or_create(**key)
+                model.objects.filter(pk=counter.pk).update(
+                    **{field: F(field) + value for field, value in zip(values, row[len(keys):])})
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    key_columns = [quote(model._meta.get_field(field).column) for field in keys]
+    value_columns = [quote(model._meta.get_field(field).column) for field in values]
+    placeholders = f"({', '.join(['%s'] * (len(keys) + len(values)))})"
+    sql = (f"INSERT INTO {table} ({', '.join(key_columns + value_columns)}) "
+           f"VALUES {', '.join([placeholders] * len(rows))} "
+           f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+           + ", ".join(f"{column} = {table}.{column} + excluded.{column}" for column in value_columns))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
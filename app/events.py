@@ -0,0 +1,105 @@
+"""
+In-process publish/subscribe for order events.
+
+Model signal handlers publish events from the request threads and the
+kitchen feed subscribes from the ASGI event loop. The broker only reaches
+subscribers in the same process, so the feed must be served by the same
+ASGI process that handles the order writes (or the broker replaced by a
+shared one).
+"""
+import asyncio
+import threading
+
+from django.db import transaction
+
+
+class Subscription:
+    """
+    A subscriber's bounded queue of events, optionally limited to some order statuses.
+    """
+
+    def __init__(self, loop, statuses=None, max_size=100):
+        self.loop = loop
+        self.statuses = set(statuses) if statuses else None
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def matches(self, event):
+        """
+        Checks whether the event concerns an order in one of the subscribed statuses.
+        """
+        return self.statuses is None or event.get("status") in self.statuses \
+            or event.get("previous_status") in self.statuses
+
+    def deliver(self, event):
+        """
+        Queues an event, dropping the oldest one if a slow subscriber's queue is full.
+        Must be called from the subscriber's event loop.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        """
+        Waits for the next event.
+        """
+        return await self.queue.get()
+
+
+class Broker:
+    """
+    Fans events out to the subscriptions whose filter matches.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, statuses=None, loop=None):
+        """
+        Registers a new subscription.
+
+        Args:
+            statuses (Iterable[str]): Order statuses to receive events for, or None for all.
+            loop (AbstractEventLoop): Loop the subscription is consumed on, defaults to the running one.
+
+        Returns:
+            Subscription: The subscription.
+        """
+        subscription = Subscription(loop or asyncio.get_running_loop(), statuses)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Removes a subscription.
+        """
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """
+        Sends an event to every matching subscription. Safe to call from any thread.
+
+        Args:
+            event (dict): The event; "type" and "status" are used for routing.
+        """
+        with self._lock:
+            subscriptions = [subscription for subscription in self._subscriptions if subscription.matches(event)]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def publish_on_commit(event):
+    """
+    Publishes an event once the surrounding transaction has committed.
+    """
+    transaction.on_commit(lambda: broker.publish(event))
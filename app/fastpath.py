@@ -0,0 +1,147 @@
+"""
+Read-only fast path for the list and retrieve actions.
+
+DRF serializes a page of model instances by walking every field of every
+instance through get_attribute and to_representation. For serializers made
+only of model fields, primary key relations and nested single serializers,
+the same output can be built straight from values_list() rows: each
+serializer class is compiled once into a RowConverter that knows the column
+of every field and converts only the values that need it (durations, dates,
+floats), so a page of rows costs no model instances and no per-field calls
+for plain values.
+"""
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from app.sparse import is_sparse
+
+# Fields whose representation of a database value is the value itself
+PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField,
+                serializers.PrimaryKeyRelatedField)
+
+UNSUPPORTED_FIELDS = (serializers.SerializerMethodField, serializers.ManyRelatedField, serializers.ListSerializer,
+                      serializers.HiddenField, serializers.RelatedField)
+
+
+class RowConverter:
+    """
+    Builds the representation of a serializer from values_list() rows.
+
+    Args:
+        serializer (Serializer): Serializer instance to compile.
+        prefix (str): Lookup prefix of a nested serializer.
+        lookups (list[str]): Lookups of the enclosing serializer, extended with those of this one.
+    """
+
+    def __init__(self, serializer, prefix="", lookups=None):
+        self.lookups = [] if lookups is None else lookups
+        fields = [field for field in serializer.fields.values() if not field.write_only]
+        # The fields of this serializer take consecutive columns from start on,
+        # so that a row can be zipped with their names
+        self.start = len(self.lookups)
+        self.names = [field.field_name for field in fields]
+        nested = []
+        for field in fields:
+            if field.source == '*' or (isinstance(field, UNSUPPORTED_FIELDS)
+                                       and not isinstance(field, serializers.PrimaryKeyRelatedField)):
+                raise ImproperlyConfigured(f"{type(serializer).__name__}.{field.field_name} has no fast path.")
+            path = prefix + "__".join(field.source_attrs)
+            if isinstance(field, serializers.BaseSerializer):
+                # The nested row is missing when its primary key is null
+                self.lookups.append(f"{path}__pk")
+                nested.append((field, path))
+            else:
+                self.lookups.append(path)
+        self.converted = [(field.field_name, index, float if isinstance(field, serializers.FloatField)
+                           else field.to_representation)
+                          for index, field in enumerate(fields, self.start)
+                          if not isinstance(field, (*PLAIN_FIELDS, serializers.BaseSerializer))]
+        self.nested = [(field.field_name, self.start + fields.index(field), RowConverter(field, f"{path}__",
+                                                                                       self.lookups))
+                       for field, path in nested]
+
+    def build(self, row):
+        """
+        Returns the representation of one row.
+        """
+        data = dict(zip(self.names, row[self.start:]))
+        for name, index, convert in self.converted:
+            if row[index] is not None:
+                data[name] = convert(row[index])
+        for name, index, converter in self.nested:
+            data[name] = None if row[index] is None else converter.build(row)
+        return data
+
+
+_converters = {}
+
+# Most converters kept for sparse fieldsets, which clients may combine freely
+MAX_CONVERTERS = 256
+
+
+def converter_for(serializer_class, names=None):
+    """
+    Returns the compiled converter of a serializer class, compiling it on first use.
+
+    Args:
+        serializer_class (type): The serializer class.
+        names (tuple[str]): Names of the fields to include, or None for all fields.
+    """
+    key = (serializer_class, names)
+    converter = _converters.get(key)
+    if converter is None:
+        if len(_converters) >= MAX_CONVERTERS:
+            _converters.clear()
+        serializer = serializer_class()
+        for name in [name for name in serializer.fields if names is not None and name not in names]:
+            serializer.fields.pop(name)
+        converter = _converters[key] = RowConverter(serializer)
+    return converter
+
+
+class FastReadMixin:
+    """
+    ViewSet mixin serving the list and retrieve actions from values_list()
+    rows instead of serializer instances. The queryset must provide every
+    field of the serializer as a column or annotation. Columns after those
+    of the serializer are ignored by the converter.
+    """
+
+    def get_converter(self):
+        """
+        Returns the converter for the fields of the request's serializer, narrowed by a sparse fieldset.
+        """
+        if not is_sparse(self.request):
+            return converter_for(self.get_serializer_class())
+        return converter_for(self.get_serializer_class(), tuple(self.get_serializer().fields))
+
+    def list(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        """
+        Lists the rows of the filtered queryset, paginated when pagination is enabled.
+        """
+        converter = self.get_converter()
+        queryset = self.filter_queryset(self.get_queryset())
+        # Keyset pagination reads the key of each row from extra columns after the serializer's
+        key_lookups = getattr(self.paginator, 'key_lookups', lambda queryset: [])(queryset)
+        rows = queryset.values_list(*converter.lookups, *key_lookups)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([converter.build(row) for row in page])
+        return Response([converter.build(row) for row in rows])
+
+    def retrieve(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        """
+        Returns one row, with the same 404 response as get_object.
+        """
+        converter = self.get_converter()
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        try:
+            row = queryset.filter(**lookup).values_list(*converter.lookups).first()
+        except (TypeError, ValueError, DjangoValidationError):
+            row = None
+        if row is None:
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+        return Response(converter.build(row))
@@ -0,0 +1,133 @@
+"""
+Stock levels of menu items.
+
+The stock of a tracked item is split over stock_shards counter rows. An
+order takes its amount from one row picked at random with a conditional
+UPDATE ... SET quantity = quantity - amount WHERE quantity >= amount, so
+concurrent orders for the same item usually lock different rows, and no
+row can go negative. Only when no single row holds enough are all rows of
+the item locked and drained in turn. Items without counter rows are not
+tracked and never run out.
+"""
+import random
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from app.models import OrderItem, StockShard
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when an order asks for more portions than are in stock.
+    """
+
+    def __init__(self, item_ids):
+        super().__init__(f"Not enough stock for menu items: {', '.join(map(str, item_ids))}.")
+        self.item_ids = item_ids
+
+
+def stock_levels(item_ids):
+    """
+    Returns the shard count and total stock of the tracked items among the given ones, with one query.
+
+    Args:
+        item_ids (Iterable[int]): Menu items.
+
+    Returns:
+        dict: Item id mapped to (number of shards, total stock).
+    """
+    return {item_id: (shards, total) for item_id, shards, total in
+            StockShard.objects.filter(item_id__in=list(item_ids)).values("item_id").order_by()
+            .annotate(shards=Count("id"), total=Sum("quantity")).values_list("item_id", "shards", "total")}
+
+
+def set_stock(item, quantity):
+    """
+    Replaces the stock of an item, split evenly over its shards.
+
+    Args:
+        item (MenuItem): The menu item.
+        quantity (int): New stock, or None to stop tracking it.
+    """
+    with transaction.atomic():
+        StockShard.objects.filter(item=item).delete()
+        if quantity is None:
+            return
+        share, rest = divmod(quantity, item.stock_shards)
+        StockShard.objects.bulk_create([StockShard(item=item, shard=shard, quantity=share + (shard < rest))
+                                        for shard in range(item.stock_shards)])
+
+
+def take(amounts, levels=None):
+    """
+    Takes portions out of stock. Must run inside the transaction that records
+    the order, so that a rejected order leaves the stock untouched.
+
+    Args:
+        amounts (dict): Menu item id mapped to the number of portions.
+        levels (dict): Result of stock_levels for the items, if already loaded.
+
+    Raises:
+        InsufficientStock: If any tracked item does not have enough stock.
+    """
+    levels = stock_levels(amounts) if levels is None else levels
+    short = sorted(item_id for item_id, amount in amounts.items()
+                   if item_id in levels and levels[item_id][1] < amount)
+    if short:
+        raise InsufficientStock(short)
+    for item_id in sorted(item_id for item_id in amounts if item_id in levels):
+        if not _take_from_shard(item_id, amounts[item_id], levels[item_id][0]) \
+                and not _take_from_all(item_id, amounts[item_id]):
+            short.append(item_id)
+    if short:
+        raise InsufficientStock(short)
+
+
+def _take_from_shard(item_id, amount, shards):
+    """
+    Takes the amount from a single shard, trying them from a random one on.
+    """
+    first = random.randrange(shards)
+    for offset in range(shards):
+        if StockShard.objects.filter(item_id=item_id, shard=(first + offset) % shards, quantity__gte=amount) \
+                .update(quantity=F("quantity") - amount):
+            return True
+    return False
+
+
+def _take_from_all(item_id, amount):
+    """
+    Takes the amount spread over all shards of an item, locking them.
+    """
+    rows = list(StockShard.objects.select_for_update().filter(item_id=item_id).order_by("shard")
+                .values_list("id", "quantity"))
+    if sum(quantity for _, quantity in rows) < amount:
+        return False
+    for row_id, quantity in rows:
+        part = min(quantity, amount)
+        if part:
+            StockShard.objects.filter(id=row_id).update(quantity=F("quantity") - part)
+            amount -= part
+    return True
+
+
+def give_back(amounts):
+    """
+    Returns portions to stock, e.g. from a cancelled order. Untracked items are skipped.
+
+    Args:
+        amounts (dict): Menu item id mapped to the number of portions.
+    """
+    levels = stock_levels(amounts)
+    for item_id in sorted(item_id for item_id, amount in amounts.items() if amount and item_id in levels):
+        StockShard.objects.filter(item_id=item_id, shard=random.randrange(levels[item_id][0])) \
+            .update(quantity=F("quantity") + amounts[item_id])
+
+
+def order_amounts(order_ids):
+    """
+    Returns the portions of each menu item over the given orders, with one query.
+    """
+    return dict(OrderItem.objects.filter(order_id__in=list(order_ids)).values("item_id").order_by()
+                .annotate(amount=Sum("amount")).values_list("item_id", "amount"))
@@ -0,0 +1,292 @@
+"""
+Kitchen work plan for the open orders.
+
+Every station prepares one batch at a time, and a batch holds up to the
+menu item's batch_size portions, which may come from several orders. Orders
+are planned first come, first served: the portions of a line first fill
+the batches of the same item that are already queued, and the rest go into
+new batches at the end of the station's queue. The predicted ready time of
+an order is the end of the last batch holding one of its portions.
+
+The plan is kept in the process and updated per order as orders arrive,
+change or leave the open statuses, instead of being rebuilt from all open
+orders. It is rebuilt from the database when it is older than MAX_AGE, so
+that changes made by other processes show up.
+
+The outstanding quantity of each menu item over the orders in a status is
+a single aggregate query, kept in the Django cache until the next order
+change or for at most MAX_AGE. An order change only clears the cache of the
+process that made it unless the cache backend is shared, so MAX_AGE also
+bounds how long other processes see old quantities.
+"""
+import threading
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from app.models import Order, OrderItem
+
+# How long the plan is updated incrementally before it is rebuilt
+MAX_AGE = timedelta(minutes=1)
+
+LINE_FIELDS = ["order_id", "item_id", "item__name", "item__station", "item__prep_time", "item__batch_size",
+               "amount"]
+
+
+class Batch:
+    """
+    Portions of one menu item prepared together at a station.
+    """
+
+    def __init__(self, item_id, name, duration, capacity):
+        self.item_id = item_id
+        self.name = name
+        self.duration = duration
+        self.capacity = capacity
+        self.portions = {}
+        self.start = None
+        self.end = None
+
+    @property
+    def quantity(self):
+        """
+        Number of portions in the batch.
+        """
+        return sum(self.portions.values())
+
+    def add(self, order_id, amount):
+        """
+        Adds up to amount portions of an order to the batch.
+
+        Returns:
+            int: Number of portions that did not fit.
+        """
+        taken = min(amount, self.capacity - self.quantity)
+        if taken > 0:
+            self.portions[order_id] = self.portions.get(order_id, 0) + taken
+        return amount - taken
+
+
+class KitchenPlan:
+    """
+    Queues of batches per station for the open orders.
+    """
+
+    def __init__(self, now):
+        self.created = now
+        self.stations = {}
+        # When each station started working through its current queue
+        self.anchors = {}
+        # Batches holding portions of each order
+        self.orders = {}
+
+    def add_order(self, order_id, lines, now):
+        """
+        Plans an order after the ones already in the plan.
+
+        Args:
+            order_id (int): The order.
+            lines (Iterable[dict]): Its lines, with the LINE_FIELDS values.
+            now (datetime): Time new work can start at an idle station.
+        """
+        batches = self.orders.setdefault(order_id, [])
+        for line in lines:
+            queue = self.stations.setdefault(line["item__station"], [])
+            if not queue:
+                self.anchors[line["item__station"]] = now
+            remaining = line["amount"]
+            for batch in queue:
+                if remaining <= 0:
+                    break
+                if batch.item_id == line["item_id"] and batch.quantity < batch.capacity:
+                    remaining = batch.add(order_id, remaining)
+                    if batch not in batches:
+                        batches.append(batch)
+            while remaining > 0:
+                batch = Batch(line["item_id"], line["item__name"], line["item__prep_time"],
+                              line["item__batch_size"])
+                remaining = batch.add(order_id, remaining)
+                batch.start = queue[-1].end if queue else self.anchors[line["item__station"]]
+                batch.end = batch.start + batch.duration
+                queue.append(batch)
+                batches.append(batch)
+
+    def remove_order(self, order_id):
+        """
+        Takes an order out of the plan and moves the later batches of the affected stations forward.
+        """
+        batches = self.orders.pop(order_id, [])
+        for batch in batches:
+            batch.portions.pop(order_id, None)
+        for station, queue in list(self.stations.items()):
+            if not any(batch.quantity == 0 for batch in queue):
+                continue
+            queue[:] = [batch for batch in queue if batch.quantity]
+            if not queue:
+                del self.stations[station]
+                del self.anchors[station]
+                continue
+            self.retime(station)
+
+    def retime(self, station):
+        """
+        Recomputes the start and end of the batches of a station from its anchor.
+        """
+        start = self.anchors[station]
+        for batch in self.stations[station]:
+            batch.start, batch.end = start, start + batch.duration
+            start = batch.end
+
+    def ready_times(self):
+        """
+        Returns the predicted ready time of each order, in plan order.
+        """
+        return {order_id: max((batch.end for batch in batches), default=self.created)
+                for order_id, batches in self.orders.items()}
+
+    def as_dict(self):
+        """
+        Returns the plan in the shape of the kitchen plan response.
+        """
+        return {
+            "stations": [{"station": station, "batches": [
+                {"item_id": batch.item_id, "name": batch.name, "quantity": batch.quantity,
+                 "orders": list(batch.portions), "start": batch.start, "end": batch.end}
+                for batch in queue]} for station, queue in sorted(self.stations.items())],
+            "orders": [{"order": order_id, "ready_at": ready_at}
+                       for order_id, ready_at in self.ready_times().items()],
+        }
+
+
+def open_lines(order_ids=None):
+    """
+    Loads the lines of open orders, oldest order first, with one query.
+
+    Args:
+        order_ids (Iterable[int]): Limit to these orders, or None for all open orders.
+
+    Returns:
+        dict: Order id mapped to its lines.
+    """
+    orders = Order.objects.filter(status__in=Order.OPEN_STATUSES)
+    if order_ids is not None:
+        orders = orders.filter(id__in=list(order_ids))
+    lines = {order_id: [] for order_id in orders.order_by("created_at", "id").values_list("id", flat=True)}
+    for line in (OrderItem.objects.filter(order_id__in=list(lines)).order_by("id").values(*LINE_FIELDS)):
+        lines[line["order_id"]].append(line)
+    return lines
+
+
+def build_plan(now=None):
+    """
+    Plans all open orders from scratch.
+    """
+    now = now or timezone.now()
+    plan = KitchenPlan(now)
+    for order_id, lines in open_lines().items():
+        plan.add_order(order_id, lines, now)
+    return plan
+
+
+_plan = None
+_lock = threading.Lock()
+
+
+def current_plan():
+    """
+    Returns the current plan as a dictionary, rebuilding it when it is missing or too old.
+    """
+    global _plan  # pylint: disable=global-statement
+    with _lock:
+        now = timezone.now()
+        if _plan is None or now - _plan.created > MAX_AGE:
+            _plan = build_plan(now)
+        return _plan.as_dict()
+
+
+def invalidate_plan():
+    """
+    Drops the plan; called when menu items change.
+    """
+    global _plan  # pylint: disable=global-statement
+    with _lock:
+        _plan = None
+
+
+def orders_changed(order_ids):
+    """
+    Replans the given orders: they are taken out of the plan and the open
+    ones are added again after the others.
+
+    Args:
+        order_ids (Iterable[int]): Orders that arrived, changed or were closed.
+    """
+    order_ids = list(order_ids)
+    with _lock:
+        if _plan is None:
+            return
+        lines = open_lines(order_ids)
+        now = timezone.now()
+        for order_id in order_ids:
+            _plan.remove_order(order_id)
+        for order_id, order_lines in lines.items():
+            _plan.add_order(order_id, order_lines, now)
+
+
+def orders_closed(order_ids):
+    """
+    Takes orders that left the open statuses out of the plan.
+
+    Args:
+        order_ids (Iterable[int]): The orders.
+    """
+    with _lock:
+        if _plan is None:
+            return
+        for order_id in order_ids:
+            _plan.remove_order(order_id)
+
+
+def orders_changed_on_commit(order_ids):
+    """
+    Replans the given orders once the surrounding transaction has committed,
+    when their lines are in place.
+    """
+    order_ids = list(order_ids)
+    transaction.on_commit(lambda: orders_changed(order_ids))
+
+
+BATCHES_CACHE_KEY = "kitchen-batches"
+
+
+def outstanding_items(status):
+    """
+    Returns the total quantity of each menu item over all orders in a status,
+    largest first, from the cache or with one GROUP BY query.
+
+    Args:
+        status (str): The order status.
+
+    Returns:
+        list[dict]: Item id, name, type, station, quantity and number of orders.
+    """
+    key = f"{BATCHES_CACHE_KEY}:{status}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(OrderItem.objects.filter(order__status=status)
+                    .values("item_id", name=F("item__name"), type=F("item__type"), station=F("item__station"))
+                    .order_by()
+                    .annotate(quantity=Sum("amount"), orders=Count("order_id", distinct=True))
+                    .order_by("-quantity", "item_id"))
+        cache.set(key, rows, MAX_AGE.total_seconds())
+    return rows
+
+
+def invalidate_batches():
+    """
+    Drops the cached outstanding quantities; called after every order change.
+    """
+    cache.delete_many([f"{BATCHES_CACHE_KEY}:{status}" for status in Order.STATUSES])
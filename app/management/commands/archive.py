@@ -0,0 +1,52 @@
+"""
+Management command for moving finished reservations and orders into the archive tables.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app.archive import archive_chunk, DEFAULT_CHUNK_SIZE, DEFAULT_RETENTION
+
+
+class Command(BaseCommand):
+    """
+    Archives reservations and orders older than the retention window in chunks.
+    """
+    help = "Move finished reservations and orders older than the retention window into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION.days,
+                            help="Keep rows newer than this many days in the hot tables.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Maximum number of rows moved per transaction.")
+        parser.add_argument("--online", action="store_true",
+                            help="Keep running alongside the API, pausing between chunks and passes.")
+        parser.add_argument("--pause", type=float, default=0.5,
+                            help="Seconds to sleep between chunks in online mode.")
+        parser.add_argument("--interval", type=float, default=3600,
+                            help="Seconds to wait between passes in online mode.")
+
+    def handle(self, *args, **options):
+        retention = timedelta(days=options["retention_days"])
+        while True:
+            reservations, orders = self.archive_pass(retention, options["chunk_size"], options)
+            self.stdout.write(f"Archived {reservations} reservations and {orders} orders.")
+            if not options["online"]:
+                return
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def archive_pass(retention, chunk_size, options):
+        """
+        Archives chunks until nothing older than the retention window is left.
+        """
+        total_reservations = total_orders = 0
+        while True:
+            reservations, orders = archive_chunk(retention, chunk_size)
+            total_reservations += reservations
+            total_orders += orders
+            if reservations < chunk_size and orders < chunk_size:
+                return total_reservations, total_orders
+            if options["online"]:
+                time.sleep(options["pause"])
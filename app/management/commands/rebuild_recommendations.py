@@ -0,0 +1,17 @@
+"""
+Management command for recomputing the item co-occurrence counts.
+"""
+from django.core.management.base import BaseCommand
+
+from app.recommendations import rebuild
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the "frequently ordered together" counts from the live and archived orders.
+    """
+    help = "Recompute the item co-occurrence counts used for recommendations from the live and archived orders."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write("Rebuilt the item co-occurrence counts.")
@@ -0,0 +1,17 @@
+"""
+Management command for recomputing the daily sales rollup.
+"""
+from django.core.management.base import BaseCommand
+
+from app.sales import rebuild
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the daily sales rollup from the live and archived orders.
+    """
+    help = "Recompute the daily sales rollup from the live and archived orders, e.g. after menu price changes."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write("Rebuilt the daily sales rollup.")
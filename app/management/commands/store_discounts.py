@@ -0,0 +1,22 @@
+"""
+Management command for storing the promotion discounts of orders placed before discounts were stored.
+"""
+from django.core.management.base import BaseCommand
+
+from app.models import Order
+from app.promotions import store_discounts
+
+
+class Command(BaseCommand):
+    """
+    Prices the live orders that have lines without a stored discount and stores the discounts.
+    """
+    help = "Store the promotion discounts of the live orders whose lines have none, priced with the current promotions."
+
+    def handle(self, *args, **options):
+        orders = Order.objects.filter(order_items__discount__isnull=True, order_items__isnull=False).distinct()
+        count = 0
+        for order in orders.iterator():
+            store_discounts(order)
+            count += 1
+        self.stdout.write(f"Stored the discounts of {count} orders.")
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_end_time(apps, schema_editor):
+    """Populates end_time for existing reservations."""
+    reservation_model = apps.get_model('app', 'Reservation')
+    reservation_model.objects.update(end_time=F('date_and_time') + F('duration'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_alter_menuitem_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reservation',
+            name='end_time',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['table', 'date_and_time', 'end_time'], name='reservation_table_time_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from datetime import datetime, time, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+SLOT = timedelta(minutes=15)
+SLOTS_PER_DAY = 96
+
+
+def build_bitmaps(apps, schema_editor):
+    """Builds the slot bitmaps of all existing reservations."""
+    reservation_model = apps.get_model('app', 'Reservation')
+    bitmap_model = apps.get_model('app', 'TableSlotBitmap')
+
+    bits = {}
+    for table_id, start_time, end_time in reservation_model.objects.values_list(
+            'table_id', 'date_and_time', 'end_time').iterator():
+        day = timezone.localtime(start_time).date()
+        while True:
+            begin = timezone.make_aware(datetime.combine(day, time.min))
+            if begin >= end_time:
+                break
+            first = max(0, (start_time - begin) // SLOT)
+            last = min(SLOTS_PER_DAY, -((begin - end_time) // SLOT))
+            if last > first:
+                mask = ((1 << last) - 1) ^ ((1 << first) - 1)
+                bits[(table_id, day)] = bits.get((table_id, day), 0) | mask
+            day += timedelta(days=1)
+
+    bitmap_model.objects.bulk_create(
+        [bitmap_model(table_id=table_id, day=day, slots=value.to_bytes(SLOTS_PER_DAY // 8, 'little'))
+         for (table_id, day), value in bits.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_reservation_end_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableSlotBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots', models.BinaryField(default=b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',
+                                             max_length=12)),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                            related_name='slot_bitmaps', to='app.table')),
+            ],
+            options={
+                'ordering': ['table', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('table', 'day'), name='unique_table_slot_bitmap')],
+            },
+        ),
+        migrations.RunPython(build_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+from django.db import IntegrityError, migrations
+
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    "ALTER TABLE app_reservation ADD CONSTRAINT reservation_no_overlap "
+    "EXCLUDE USING gist (table_id WITH =, tstzrange(date_and_time, end_time, '[)') WITH &&)",
+]
+POSTGRESQL_REVERSE = [
+    "ALTER TABLE app_reservation DROP CONSTRAINT IF EXISTS reservation_no_overlap",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER reservation_no_overlap_insert BEFORE INSERT ON app_reservation
+    WHEN EXISTS (
+        SELECT 1 FROM app_reservation
+        WHERE table_id = NEW.table_id AND date_and_time < NEW.end_time AND end_time > NEW.date_and_time
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'reservation_no_overlap');
+    END
+    """,
+    """
+    CREATE TRIGGER reservation_no_overlap_update BEFORE UPDATE OF table_id, date_and_time, end_time
+    ON app_reservation
+    WHEN EXISTS (
+        SELECT 1 FROM app_reservation
+        WHERE table_id = NEW.table_id AND date_and_time < NEW.end_time AND end_time > NEW.date_and_time
+            AND id != NEW.id
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'reservation_no_overlap');
+    END
+    """,
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS reservation_no_overlap_insert",
+    "DROP TRIGGER IF EXISTS reservation_no_overlap_update",
+]
+
+
+def check_overlaps(apps, schema_editor):  # pylint: disable=unused-argument
+    """
+    Fails with the ids of the reservations that already overlap on a table, which the constraint would reject.
+    They have to be moved or cancelled by hand before migrating again.
+    """
+    reservation_model = apps.get_model('app', 'Reservation')
+    rows = reservation_model.objects.order_by('table_id', 'date_and_time', 'id') \
+        .values_list('id', 'table_id', 'date_and_time', 'end_time')
+    conflicts = []
+    table_id = latest = None
+    for row in rows.iterator():
+        # The reservation ending last so far on the table overlaps every later one starting before it ends
+        if row[1] == table_id and row[2] < latest[3]:
+            conflicts.append(f"{latest[0]} and {row[0]}")
+        if row[1] != table_id or row[3] > latest[3]:
+            latest = row
+        table_id = row[1]
+    if conflicts:
+        raise IntegrityError(f"Overlapping reservations on the same table: {', '.join(conflicts)}. "
+                             "Move or cancel one of each pair before migrating.")
+
+
+def run_for_vendor(statements):
+    """Returns a RunPython callable that executes the statements of the current database vendor."""
+    def run(apps, schema_editor):  # pylint: disable=unused-argument
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_tableslotbitmap'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_overlaps, migrations.RunPython.noop),
+        migrations.RunPython(
+            run_for_vendor({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_for_vendor({'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,62 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_reservation_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='archived_orders', to='app.user')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.IntegerField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='archived_order_items', to='app.menuitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                            related_name='order_items', to='app.archivedorder')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('number_of_people', models.IntegerField()),
+                ('date_and_time', models.DateTimeField()),
+                ('duration', models.DurationField()),
+                ('end_time', models.DateTimeField()),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                            related_name='archived_reservations', to='app.table')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='archived_reservations', to='app.user')),
+            ],
+            options={
+                'ordering': ['date_and_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_order_created_at_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], default='weekly',
+                                               max_length=16)),
+                ('interval', models.PositiveIntegerField(default=1, validators=[
+                    django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(52)])),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('reservation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE,
+                                                     related_name='recurrence', to='app.reservation')),
+            ],
+            options={
+                'ordering': ['reservation'],
+            },
+        ),
+    ]
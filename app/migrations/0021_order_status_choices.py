@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def lowercase_statuses(apps, schema_editor):
+    # Older clients stored capitalised statuses
+    Order = apps.get_model('app', 'Order')
+    Order.objects.exclude(status=Lower('status')).update(status=Lower('status'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_reservationrecurrence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('registered', 'Registered'),
+                                            ('preparing', 'Preparing'), ('ready', 'Ready'), ('served', 'Served'),
+                                            ('cancelled', 'Cancelled')], max_length=64),
+        ),
+        migrations.RunPython(lowercase_statuses, migrations.RunPython.noop),
+    ]
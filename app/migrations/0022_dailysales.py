@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def build_rollup(apps, schema_editor):
+    """Builds the daily sales rollup from the existing live and archived orders."""
+    sales_model = apps.get_model('app', 'DailySales')
+    totals = {}
+    for model_name in ('OrderItem', 'ArchivedOrderItem'):
+        rows = (apps.get_model('app', model_name).objects.exclude(order__status='cancelled')
+                .annotate(day=TruncDate('order__created_at', tzinfo=timezone.get_current_timezone()))
+                .values('day', 'item_id').order_by()
+                .annotate(quantity=Sum('amount'), revenue=Sum(F('amount') * F('item__price'), output_field=FloatField())))
+        for row in rows:
+            quantity, revenue = totals.get((row['day'], row['item_id']), (0, 0.0))
+            totals[(row['day'], row['item_id'])] = (quantity + row['quantity'], revenue + row['revenue'])
+
+    sales_model.objects.bulk_create(
+        [sales_model(day=day, item_id=item_id, quantity=quantity, revenue=revenue)
+         for (day, item_id), (quantity, revenue) in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_order_status_choices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.FloatField(default=0.0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='daily_sales', to='app.menuitem')),
+            ],
+            options={
+                'ordering': ['day', 'item'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'item'), name='unique_daily_sales')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
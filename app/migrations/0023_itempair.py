@@ -0,0 +1,59 @@
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+
+def co_occurrences(order_ids, item_ids):
+    """Counts the orders containing each pair of items, including each item with itself."""
+    lines = np.unique(np.column_stack([np.asarray(order_ids, dtype=np.int64),
+                                       np.asarray(item_ids, dtype=np.int64)]).reshape(-1, 2), axis=0)
+    items = lines[:, 1]
+    _, starts, sizes = np.unique(lines[:, 0], return_index=True, return_counts=True)
+    repeats = np.repeat(sizes, sizes)
+    left = np.repeat(items, repeats)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    right = items[np.repeat(np.repeat(starts, sizes), repeats) + offsets]
+    pairs, counts = np.unique(np.column_stack([left, right]), axis=0, return_counts=True)
+    return pairs[:, 0], pairs[:, 1], counts
+
+
+def build_pairs(apps, schema_editor):
+    """Counts the co-ordered items of the existing live and archived orders."""
+    pair_model = apps.get_model('app', 'ItemPair')
+    lines = [*apps.get_model('app', 'OrderItem').objects.order_by().values_list('order_id', 'item_id'),
+             *apps.get_model('app', 'ArchivedOrderItem').objects.order_by().values_list('order_id', 'item_id')]
+    if not lines:
+        return
+    items, others, orders = co_occurrences(*zip(*lines))
+    pair_model.objects.bulk_create(
+        [pair_model(item_id=item, other_id=other, orders=count)
+         for item, other, count in zip(items.tolist(), others.tolist(), orders.tolist())],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_dailysales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='pairs', to='app.menuitem')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                            related_name='+', to='app.menuitem')),
+            ],
+            options={
+                'ordering': ['item', '-orders'],
+                'indexes': [models.Index(fields=['item', '-orders'], name='item_pair_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item', 'other'), name='unique_item_pair')],
+            },
+        ),
+        migrations.RunPython(build_pairs, migrations.RunPython.noop),
+    ]
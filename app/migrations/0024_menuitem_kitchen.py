@@ -0,0 +1,29 @@
+import datetime
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_itempair'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='station',
+            field=models.CharField(default='kitchen', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='prep_time',
+            field=models.DurationField(default=datetime.timedelta(seconds=300)),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='batch_size',
+            field=models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
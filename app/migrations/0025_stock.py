@@ -0,0 +1,38 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0024_menuitem_kitchen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='stock_shards',
+            field=models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1),
+                                                             django.core.validators.MaxValueValidator(64)]),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.IntegerField()),
+                ('quantity', models.IntegerField(default=0,
+                                                 validators=[django.core.validators.MinValueValidator(0)])),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='stock_rows', to='app.menuitem')),
+            ],
+            options={
+                'ordering': ['item', 'shard'],
+                'constraints': [
+                    models.UniqueConstraint(fields=('item', 'shard'), name='unique_stock_shard'),
+                    models.CheckConstraint(condition=models.Q(('quantity__gte', 0)),
+                                           name='stock_shard_not_negative'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0025_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('active', models.BooleanField(default=True)),
+                ('percent_off', models.FloatField(validators=[django.core.validators.MinValueValidator(0),
+                                                              django.core.validators.MaxValueValidator(100)])),
+                ('item_type', models.CharField(blank=True, default='', max_length=20)),
+                ('combo', models.BooleanField(default=False)),
+                ('min_quantity', models.IntegerField(default=1,
+                                                     validators=[django.core.validators.MinValueValidator(1)])),
+                ('valid_from', models.DateTimeField(blank=True, null=True)),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+                ('daily_start', models.TimeField(blank=True, null=True)),
+                ('daily_end', models.TimeField(blank=True, null=True)),
+                ('items', models.ManyToManyField(blank=True, related_name='promotions', to='app.menuitem')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def record_prices(apps, schema_editor):
+    """Records the current menu item prices on the existing lines, the best known price for them."""
+    menu_item_model = apps.get_model('app', 'MenuItem')
+    price = Subquery(menu_item_model.objects.filter(id=OuterRef('item_id')).values('price')[:1])
+    for model_name in ('OrderItem', 'ArchivedOrderItem'):
+        apps.get_model('app', model_name).objects.update(price=price)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0027_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='price',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='price',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(record_prices, migrations.RunPython.noop),
+    ]
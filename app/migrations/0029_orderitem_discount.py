@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0028_orderitem_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='discount',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='+', to='app.promotion'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='discount',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='+', to='app.promotion'),
+        ),
+    ]
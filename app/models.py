@@ -1,6 +1,11 @@
 """Models for the application."""
-from django.core.validators import MinValueValidator
-from django.db import models
+from datetime import timedelta
+
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connection, models, transaction
+from django.db.models import ExpressionWrapper, F, Prefetch, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class User(models.Model):
@@ -26,12 +31,29 @@ class Table(models.Model):
         return f"Table {self.id} ({self.min_people}-{self.max_people} people)"
 
 
+class MenuItemQuerySet(models.QuerySet):
+    """QuerySet for menu items."""
+
+    def with_stock(self):
+        """Annotates each menu item with its stock, None for items whose stock is not tracked."""
+        return self.annotate(stock=Sum("stock_rows__quantity"))
+
+
 class MenuItem(models.Model):
     """Represents a menu item that can be ordered."""
     name = models.CharField(max_length=64, unique=True)
     description = models.CharField(max_length=255)  # Increased max_length to be more realistic
     type = models.CharField(max_length=20, default="main course")
     price = models.FloatField()
+    # Kitchen station preparing the item, how long one batch takes and how
+    # many portions fit in a batch
+    station = models.CharField(max_length=32, default="kitchen")
+    prep_time = models.DurationField(default=timedelta(minutes=5))
+    batch_size = models.IntegerField(default=1, validators=[MinValueValidator(1)])
+    # Number of counter rows the stock is split over, more for items ordered concurrently
+    stock_shards = models.IntegerField(default=1, validators=[MinValueValidator(1), MaxValueValidator(64)])
+
+    objects = MenuItemQuerySet.as_manager()
 
     class Meta:
         ordering = ["name"]
@@ -40,14 +62,122 @@ class MenuItem(models.Model):
         return f"{self.name} (${self.price})"
 
 
+class OrderQuerySet(models.QuerySet):
+    """QuerySet for orders."""
+
+    def with_totals(self):
+        """
+        Annotates each order with its price before promotions and item count,
+        and prefetches its lines annotated with their line totals and what the
+        promotions need, so that a page of orders costs a constant number of
+        queries. Lines are priced at their stored price.
+        """
+        return self.annotate(
+            subtotal=Coalesce(Sum(F("order_items__amount") * Coalesce(F("order_items__price"),
+                                                                      F("order_items__item__price")),
+                                  output_field=models.FloatField()), 0.0),
+            item_count=Coalesce(Sum("order_items__amount"), 0),
+        ).prefetch_related(Prefetch("order_items", queryset=OrderItem.objects.with_line_totals()))
+
+
+class OrderItemQuerySet(models.QuerySet):
+    """QuerySet for order items."""
+
+    def with_line_totals(self):
+        """
+        Annotates each order item with its stored price, amount times that
+        price, and the type of the menu item. Lines stored without a price use
+        the current price of the menu item.
+        """
+        return self.annotate(unit_price=Coalesce(F("price"), F("item__price")), item_type=F("item__type")) \
+            .annotate(line_total=ExpressionWrapper(F("amount") * F("unit_price"), output_field=models.FloatField()))
+
+
 class Order(models.Model):
     """Represents an order made by a user."""
-    status = models.CharField(max_length=64)
+    STATUSES = ["pending", "registered", "preparing", "ready", "served", "cancelled"]
+    # Statuses each status may move to
+    TRANSITIONS = {
+        "pending": ["registered", "preparing", "cancelled"],
+        "registered": ["preparing", "cancelled"],
+        "preparing": ["ready", "cancelled"],
+        "ready": ["served"],
+        "served": [],
+        "cancelled": [],
+    }
+    # Orders in these statuses are still to be prepared by the kitchen
+    OPEN_STATUSES = ["pending", "registered", "preparing"]
+    # Orders in these statuses are finished and may be archived; ready orders are still to be served
+    FINISHED_STATUSES = ["served", "cancelled"]
+
+    status = models.CharField(max_length=64, choices=[(status, status.capitalize()) for status in STATUSES])
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         ordering = ["id"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so that signal handlers can tell a
+        # status change from other updates.
+        instance.loaded_status = dict(zip(field_names, values)).get("status")
+        return instance
+
+    @classmethod
+    def can_transition(cls, current, new):
+        """
+        Checks whether an order may move from one status to another.
+        """
+        return new in cls.TRANSITIONS.get(current, [])
+
+    @classmethod
+    def predecessors(cls, status):
+        """
+        Returns the statuses an order may move to the given status from.
+        """
+        return [current for current, following in cls.TRANSITIONS.items() if status in following]
+
+    @classmethod
+    def transition(cls, ids, status):
+        """
+        Moves the given orders to a status with a single conditional UPDATE.
+        Orders that do not exist or whose current status may not move to the
+        new one are left as they are.
+
+        Args:
+            ids (Iterable[int]): Ids of the orders to move.
+            status (str): The new status.
+
+        Returns:
+            list[tuple[int, int]]: Id and user id of each order that moved.
+        """
+        ids = list(ids)
+        predecessors = cls.predecessors(status)
+        if not ids or not predecessors:
+            return []
+        # SQLite has UPDATE ... RETURNING from 3.35 on, the same versions that can return rows from inserts
+        returning = (connection.vendor in ("postgresql", "sqlite")
+                     and connection.features.can_return_rows_from_bulk_insert)
+        if not returning:
+            # No UPDATE ... RETURNING, lock the matching rows and update those instead
+            with transaction.atomic():
+                moved = list(cls.objects.select_for_update().filter(id__in=ids, status__in=predecessors)
+                             .order_by().values_list("id", "user_id"))
+                cls.objects.filter(id__in=[order_id for order_id, _ in moved]).update(status=status)
+            return sorted(moved)
+        quote = connection.ops.quote_name
+        sql = (f"UPDATE {quote(cls._meta.db_table)} SET {quote('status')} = %s "
+               f"WHERE {quote('id')} IN ({', '.join(['%s'] * len(ids))}) "
+               f"AND {quote('status')} IN ({', '.join(['%s'] * len(predecessors))}) "
+               f"RETURNING {quote('id')}, {quote('user_id')}")
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [status, *ids, *predecessors])
+            return sorted(tuple(row) for row in cursor.fetchall())
+
     def __str__(self):
         return f"Order {self.id} by {self.user.name}"
 
@@ -57,24 +187,311 @@ class OrderItem(models.Model):
     item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     amount = models.IntegerField()
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="order_items")
+    # Price of the menu item when the line was recorded, at which the sales rollup counts it.
+    # Lines stored without one are counted at the current price.
+    price = models.FloatField(null=True, blank=True)
+    # Discount of the promotion applied when the order was priced, and that promotion. Lines
+    # stored without a discount are priced with the current promotions when they are read.
+    discount = models.FloatField(null=True, blank=True)
+    promotion = models.ForeignKey("Promotion", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+
+    objects = OrderItemQuerySet.as_manager()
 
     class Meta:
         ordering = ["id"]
 
+    def save(self, *args, **kwargs):
+        self.set_price()
+        super().save(*args, **kwargs)
+
+    def set_price(self):
+        """
+        Records the current price of the menu item for a new line or one whose
+        item changed. Must be done before bulk_create, which bypasses save().
+        """
+        if self.price is None or self.item_id != getattr(self, "loaded_values", {}).get("item_id", self.item_id):
+            self.price = self.item.price
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored line so that the sales rollup can apply the difference on update
+        instance.loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"{self.amount}x {self.item.name}"
 
 
 class Reservation(models.Model):
-    """Represents a table reservation made by a user."""
+    """
+    Represents a table reservation made by a user. Overlapping reservations of
+    the same table are rejected by the database (see OVERLAP_CONSTRAINT).
+    """
+    # Name of the exclusion constraint (PostgreSQL) or trigger error (SQLite)
+    OVERLAP_CONSTRAINT = "reservation_no_overlap"
+
     number_of_people = models.IntegerField(validators=[MinValueValidator(1)])
     date_and_time = models.DateTimeField()
     duration = models.DurationField()
+    # Stored so that overlap checks can be answered from an index instead of
+    # computing date_and_time + duration for every row.
+    end_time = models.DateTimeField(editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reservations")
     table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name="reservations")
 
     class Meta:
         ordering = ["date_and_time"]
+        indexes = [
+            models.Index(fields=["table", "date_and_time", "end_time"], name="reservation_table_time_idx"),
+            models.Index(fields=["date_and_time"], name="reservation_start_idx"),
+            models.Index(fields=["end_time"], name="reservation_end_idx"),
+        ]
 
     def __str__(self):
         return f"Reservation by {self.user.name} on {self.date_and_time.strftime('%Y-%m-%d %H:%M')}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored interval so that signal handlers can tell which
+        # slot bitmaps an update or delete has to refresh.
+        instance.loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.set_end_time()
+        super().save(*args, **kwargs)
+
+    def set_end_time(self):
+        """
+        Computes end_time from date_and_time and duration. Must be called before
+        bulk_create or queryset updates, since those bypass save().
+        """
+        self.date_and_time = self._meta.get_field("date_and_time").to_python(self.date_and_time)
+        self.duration = self._meta.get_field("duration").to_python(self.duration)
+        self.end_time = self.date_and_time + self.duration
+
+    @classmethod
+    def overlapping(cls, table, start_time, end_time):
+        """
+        Returns the reservations of a table that overlap the interval [start_time, end_time).
+
+        Args:
+            table (Table): The table to check.
+            start_time (datetime): Start of the interval.
+            end_time (datetime): End of the interval.
+
+        Returns:
+            QuerySet: Overlapping reservations.
+        """
+        return cls.objects.filter(table=table, date_and_time__lt=end_time, end_time__gt=start_time)
+
+
+class ReservationRecurrence(models.Model):
+    """
+    Repeats a reservation every `interval` days or weeks, optionally until a
+    given time. Only the first occurrence is stored as a Reservation row; the
+    others are expanded on demand within the window being queried.
+    """
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    FREQUENCY_CHOICES = [(DAILY, "Daily"), (WEEKLY, "Weekly")]
+
+    reservation = models.OneToOneField(Reservation, on_delete=models.CASCADE, related_name="recurrence")
+    frequency = models.CharField(max_length=16, choices=FREQUENCY_CHOICES, default=WEEKLY)
+    interval = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1), MaxValueValidator(52)])
+    until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["reservation"]
+
+    def __str__(self):
+        return f"Every {self.interval} {self.frequency} repeat of reservation {self.reservation_id}"
+
+    @property
+    def period(self):
+        """Time between two consecutive occurrences."""
+        return timedelta(days=self.interval) if self.frequency == self.DAILY else timedelta(weeks=self.interval)
+
+
+class TableSlotBitmap(models.Model):
+    """
+    Occupied slots of a table on a single day, one bit per 15-minute slot.
+    Bit i is set when any reservation overlaps the i-th slot of the day.
+    """
+    SLOT = timedelta(minutes=15)
+    SLOTS_PER_DAY = 96
+
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name="slot_bitmaps")
+    day = models.DateField()
+    slots = models.BinaryField(max_length=SLOTS_PER_DAY // 8, default=bytes(SLOTS_PER_DAY // 8))
+
+    class Meta:
+        ordering = ["table", "day"]
+        constraints = [
+            models.UniqueConstraint(fields=["table", "day"], name="unique_table_slot_bitmap"),
+        ]
+
+    def __str__(self):
+        return f"Slots of table {self.table_id} on {self.day}"
+
+    @property
+    def bits(self):
+        """The slots as an integer, slot i being bit i."""
+        return int.from_bytes(self.slots, "little")
+
+    @bits.setter
+    def bits(self, value):
+        self.slots = value.to_bytes(self.SLOTS_PER_DAY // 8, "little")
+
+
+class ArchivedReservation(models.Model):
+    """A finished reservation moved out of the Reservation table. Keeps the original id."""
+    id = models.BigIntegerField(primary_key=True)
+    number_of_people = models.IntegerField()
+    date_and_time = models.DateTimeField()
+    duration = models.DurationField()
+    end_time = models.DateTimeField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_reservations")
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name="archived_reservations")
+
+    class Meta:
+        ordering = ["date_and_time"]
+
+    def __str__(self):
+        return f"Archived reservation {self.id}"
+
+
+class ArchivedOrder(models.Model):
+    """A finished order moved out of the Order table. Keeps the original id."""
+    id = models.BigIntegerField(primary_key=True)
+    status = models.CharField(max_length=64)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_orders")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"Archived order {self.id}"
+
+
+class ArchivedOrderItem(models.Model):
+    """An item of an archived order. Keeps the original id."""
+    id = models.BigIntegerField(primary_key=True)
+    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="archived_order_items")
+    amount = models.IntegerField()
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="order_items")
+    price = models.FloatField(null=True, blank=True)
+    discount = models.FloatField(null=True, blank=True)
+    promotion = models.ForeignKey("Promotion", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"Archived order item {self.id}"
+
+
+class DailySales(models.Model):
+    """
+    Quantity sold and revenue of a menu item on one day, maintained
+    incrementally as orders change. Cancelled orders are not counted.
+    """
+    day = models.DateField()
+    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="daily_sales")
+    quantity = models.IntegerField(default=0)
+    revenue = models.FloatField(default=0.0)
+
+    class Meta:
+        ordering = ["day", "item"]
+        constraints = [models.UniqueConstraint(fields=["day", "item"], name="unique_daily_sales")]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.item_id} on {self.day}"
+
+
+class ItemPair(models.Model):
+    """
+    Number of orders that contain both menu items. Stored in both directions,
+    so the items most often ordered with an item are one index range; the
+    row pairing an item with itself counts the orders containing it.
+    """
+    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="pairs")
+    other = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="+")
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["item", "-orders"]
+        constraints = [models.UniqueConstraint(fields=["item", "other"], name="unique_item_pair")]
+        indexes = [models.Index(fields=["item", "-orders"], name="item_pair_top_idx")]
+
+    def __str__(self):
+        return f"{self.item_id} with {self.other_id} in {self.orders} orders"
+
+
+class StockShard(models.Model):
+    """
+    One of the counter rows holding the stock of a tracked menu item. The
+    stock of the item is the sum of its rows.
+    """
+    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="stock_rows")
+    shard = models.IntegerField()
+    quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+
+    class Meta:
+        ordering = ["item", "shard"]
+        constraints = [
+            models.UniqueConstraint(fields=["item", "shard"], name="unique_stock_shard"),
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name="stock_shard_not_negative"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} of {self.item_id} in shard {self.shard}"
+
+
+class Promotion(models.Model):
+    """
+    A percentage discount on the order lines it applies to. A promotion
+    applies to its menu items and to the items of its type; one without
+    either applies to every item. It only counts while the order time is
+    within its validity range and daily window, and when the order holds at
+    least min_quantity portions it applies to, and for a combo, every one of
+    its menu items.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    active = models.BooleanField(default=True)
+    percent_off = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(100)])
+    item_type = models.CharField(max_length=20, blank=True, default="")
+    items = models.ManyToManyField(MenuItem, blank=True, related_name="promotions")
+    combo = models.BooleanField(default=False)
+    min_quantity = models.IntegerField(default=1, validators=[MinValueValidator(1)])
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+    # Local time of day the promotion runs, wrapping past midnight when the end is before the start
+    daily_start = models.TimeField(null=True, blank=True)
+    daily_end = models.TimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name} (-{self.percent_off}%)"
+
+
+class Version(models.Model):
+    """
+    Counter of the changes to a set of rows that processes cache locally,
+    such as the active promotions. A process compares the value with the
+    one its cache was built from to tell whether another process changed
+    the rows.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name} at version {self.value}"
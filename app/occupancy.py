@@ -0,0 +1,114 @@
+"""
+Occupancy heatmap and utilisation report for tables.
+
+Reservation intervals in the window are loaded with one query into NumPy
+arrays and rasterized into a table x bucket matrix with difference arrays,
+so the cost grows with the number of reservations plus the size of the
+matrix, without per-object Python loops.
+"""
+import numpy as np
+
+from app import recurrence
+from app.models import Reservation, Table
+
+
+def rasterize(table_index, starts, ends, weights, table_count, bucket_count, bucket):
+    """
+    Sums the weighted time each interval spends in every bucket.
+
+    Args:
+        table_index (ndarray): Row of the matrix for each interval.
+        starts (ndarray): Interval starts in seconds from the window start, clipped to the window.
+        ends (ndarray): Interval ends in seconds from the window start, clipped to the window.
+        weights (ndarray): Weight of each interval.
+        table_count (int): Number of rows.
+        bucket_count (int): Number of buckets.
+        bucket (float): Bucket length in seconds.
+
+    Returns:
+        ndarray: Weighted seconds per table and bucket, shape (table_count, bucket_count).
+    """
+    matrix = np.zeros((table_count, bucket_count + 1))
+    first = (starts // bucket).astype(np.int64)
+    last = np.minimum((ends // bucket).astype(np.int64), bucket_count)
+    single = first == last
+
+    # Intervals that start and end inside the same bucket
+    np.add.at(matrix, (table_index[single], first[single]), weights[single] * (ends - starts)[single])
+
+    spanning = ~single
+    rows, first, last = table_index[spanning], first[spanning], last[spanning]
+    starts, ends, weights = starts[spanning], ends[spanning], weights[spanning]
+    # Partial first and last buckets
+    np.add.at(matrix, (rows, first), weights * ((first + 1) * bucket - starts))
+    np.add.at(matrix, (rows, last), weights * (ends - last * bucket))
+    # Fully covered buckets in between, as a difference array over bucket indices
+    full = np.zeros((table_count, bucket_count + 1))
+    np.add.at(full, (rows, first + 1), weights)
+    np.add.at(full, (rows, last), -weights)
+    matrix += np.cumsum(full, axis=1) * bucket
+    return matrix[:, :bucket_count]
+
+
+def occupancy_report(window_start, window_end, bucket):
+    """
+    Builds the occupancy matrix and seat-hours utilisation of all tables.
+
+    Args:
+        window_start (datetime): Start of the window.
+        window_end (datetime): End of the window.
+        bucket (timedelta): Bucket length.
+
+    Returns:
+        dict: The matrix as fractions of each bucket that a table is reserved,
+        utilisation (reserved seat-hours divided by max_people times the window
+        length) per table, and the overall utilisation.
+    """
+    tables = list(Table.objects.order_by('id').values_list('id', 'max_people'))
+    table_ids = np.array([table_id for table_id, _ in tables], dtype=np.int64)
+    capacities = np.array([max_people for _, max_people in tables], dtype=np.float64)
+
+    bucket_seconds = bucket.total_seconds()
+    window_seconds = (window_end - window_start).total_seconds()
+    bucket_count = int(np.ceil(window_seconds / bucket_seconds))
+
+    rows = list(Reservation.objects.filter(
+        date_and_time__lt=window_end, end_time__gt=window_start
+    ).values_list('table_id', 'date_and_time', 'end_time', 'number_of_people'))
+    rows.extend((series.table_id, start, end, series.number_of_people) for series, start, end in recurrence.expand(
+        recurrence.load_series(table_ids.tolist(), window_start, window_end), window_start, window_end))
+    count = len(rows)
+    origin = window_start.timestamp()
+    reserved_tables = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    starts = np.fromiter((row[1].timestamp() for row in rows), dtype=np.float64, count=count) - origin
+    ends = np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=count) - origin
+    people = np.fromiter((row[3] for row in rows), dtype=np.float64, count=count)
+
+    starts = np.clip(starts, 0, window_seconds)
+    ends = np.clip(ends, 0, window_seconds)
+    table_index = np.searchsorted(table_ids, reserved_tables)
+
+    ones = np.ones(count)
+    busy = rasterize(table_index, starts, ends, ones, len(tables), bucket_count, bucket_seconds)
+    # The last bucket may be cut short by the end of the window
+    lengths = np.full(bucket_count, bucket_seconds)
+    if bucket_count:
+        lengths[-1] = window_seconds - (bucket_count - 1) * bucket_seconds
+    occupancy = np.clip(busy / lengths, 0, 1)
+
+    seat_seconds = np.bincount(table_index, weights=people * (ends - starts), minlength=len(tables))
+    available = capacities * window_seconds
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilisation = np.where(available > 0, seat_seconds / available, 0.0)
+    total = available.sum()
+
+    return {
+        'start': window_start,
+        'end': window_end,
+        'bucket': bucket,
+        'utilisation': float(seat_seconds.sum() / total) if total > 0 else 0.0,
+        'tables': [
+            {'table': int(table_id), 'utilisation': float(table_utilisation), 'occupancy': row.round(4).tolist()}
+            for table_id, table_utilisation, row in zip(table_ids, utilisation, occupancy)
+        ],
+    }
@@ -0,0 +1,207 @@
+"""
+Keyset pagination for the API.
+
+Pages are read in the order of the queryset (its order_by, or the model's
+Meta.ordering), with the primary key added as the last key so that rows with
+equal values keep a stable order. The cursor holds the key of the row the
+page starts after, so each page is one indexed range query: no COUNT and no
+OFFSET, however deep the client pages.
+
+Several querysets with the same ordering fields, such as the live and
+archived reservations of a user, can be paged as one merged listing.
+"""
+import base64
+import json
+from datetime import date, datetime, time
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the ordering fields of the queryset, with a page size
+    chosen by the client up to max_page_size.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def key_fields(self, queryset):
+        """
+        Returns the model fields the queryset is ordered by, with the primary
+        key as the final tie-breaker, and whether each one is descending.
+        """
+        meta = queryset.model._meta
+        keys = []
+        for name in queryset.query.order_by or meta.ordering:
+            if not isinstance(name, str) or '__' in name:
+                raise ImproperlyConfigured(f"Cannot paginate {meta.object_name} by {name}.")
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            keys.append((meta.pk if name == 'pk' else meta.get_field(name), descending))
+        if not any(field.primary_key for field, _ in keys):
+            keys.append((meta.pk, False))
+        return keys
+
+    def key_lookups(self, queryset):
+        """
+        Returns the columns to add to a values_list() queryset so that its rows
+        can be paginated, as expressions so that they are not merged with the
+        columns of the same name already selected.
+        """
+        return [F(field.attname) for field, _ in self.key_fields(queryset)]
+
+    def get_page_size(self, request):
+        """
+        Returns the page size asked for by the client, capped, or the default.
+        """
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request, view)
+
+    def paginate_querysets(self, querysets, request, view=None):  # pylint: disable=unused-argument
+        """
+        Returns one page of the rows of the querysets, merged in key order.
+
+        Args:
+            querysets (list[QuerySet]): Querysets ordered by the same fields.
+            request (Request): The request, holding the cursor and page size.
+            view (APIView): The view.
+
+        Returns:
+            list: The rows of the page.
+        """
+        self.request = request
+        self.size = self.get_page_size(request)
+        self.keys = self.key_fields(querysets[0])
+        values, self.reverse = self.decode_cursor(request)
+        rows = []
+        for queryset in querysets:
+            if values is not None:
+                queryset = queryset.filter(self.after(values))
+            ordering = [('-' if descending != self.reverse else '') + field.attname for field, descending in self.keys]
+            rows.extend(queryset.order_by(*ordering)[:self.size + 1])
+        if len(querysets) > 1:
+            for index in reversed(range(len(self.keys))):
+                rows.sort(key=lambda row, index=index: self.key_of(row)[index],
+                          reverse=self.keys[index][1] != self.reverse)
+        self.has_more = len(rows) > self.size
+        rows = rows[:self.size]
+        if self.reverse:
+            rows.reverse()
+        self.has_cursor = values is not None
+        self.rows = rows
+        return rows
+
+    def after(self, values):
+        """
+        Returns the condition for the rows after the given key, in the direction of paging.
+        """
+        condition = Q()
+        for index, (field, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != self.reverse else 'gt'
+            term = Q(**{f"{field.attname}__{lookup}": values[index]})
+            for (previous, _), value in zip(self.keys[:index], values):
+                term &= Q(**{previous.attname: value})
+            condition |= term
+        return condition
+
+    def key_of(self, row):
+        """
+        Returns the key of a model instance, or of a values_list() row ending in the key_lookups columns.
+        """
+        if isinstance(row, tuple):
+            return row[len(row) - len(self.keys):]
+        return tuple(getattr(row, field.attname) for field, _ in self.keys)
+
+    def decode_cursor(self, request):
+        """
+        Returns the key and direction of the cursor in the request, or (None, False) without one.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if len(cursor['key']) != len(self.keys):
+                raise ValueError("Wrong key length")
+            values = [field.to_python(value) for (field, _), value in zip(self.keys, cursor['key'])]
+            return values, bool(cursor.get('reverse'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, DjangoValidationError) as error:
+            raise NotFound(self.invalid_cursor_message) from error
+
+    def encode_cursor(self, row, reverse):
+        """
+        Returns the URL of the page starting after (or, in reverse, before) a row.
+        """
+        key = [value.isoformat() if isinstance(value, (date, datetime, time)) else value
+               for value in self.key_of(row)]
+        encoded = base64.urlsafe_b64encode(json.dumps({'key': key, 'reverse': reverse}).encode()).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        """
+        Returns the link to the next page, None on the last one.
+        """
+        if not self.rows or (not self.reverse and not self.has_more):
+            return None
+        return self.encode_cursor(self.rows[-1], False)
+
+    def get_previous_link(self):
+        """
+        Returns the link to the previous page, None on the first one.
+        """
+        if (self.reverse and not self.has_more) or (not self.reverse and not self.has_cursor):
+            return None
+        if not self.rows:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.rows[0], True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results to return per page, at most {self.max_page_size}.',
+                'schema': {'type': 'integer'},
+            },
+        ]
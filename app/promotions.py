@@ -0,0 +1,163 @@
+"""
+Promotion engine for order pricing.
+
+The active promotions are compiled once into an Evaluator that indexes the
+rules by menu item id and by menu item type. Pricing an order looks up the
+candidate rules of each line in those indexes, so its cost grows with the
+number of rules that could apply to the order's items rather than with the
+number of promotions; only promotions without an item or type scope are
+checked for every line. Each line gets the largest discount of the rules
+whose conditions hold; discounts do not stack. Orders are priced at the
+time they were created, against the promotions as they are when their lines
+are saved, and the discount of each line is stored with it, so that later
+changes to the promotions leave placed orders as they are. Only previews
+are priced with the promotions as they are now.
+
+The compiled evaluator is kept in the process and recompiled when the
+promotions version in the database changes, which happens on every change to
+the promotions, so that the other processes pick up changes within
+versions.CHECK_SECONDS.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from app import versions
+from app.models import OrderItem, Promotion
+
+VERSION_NAME = "promotions"
+
+Rule = namedtuple("Rule", ["id", "percent_off", "items", "combo", "min_quantity", "valid_from", "valid_until",
+                           "daily_start", "daily_end"])
+
+
+def in_window(rule, at):
+    """
+    Returns whether a moment is within the validity range and daily window of a rule.
+    """
+    if rule.valid_from is not None and at < rule.valid_from:
+        return False
+    if rule.valid_until is not None and at >= rule.valid_until:
+        return False
+    if rule.daily_start is None or rule.daily_end is None:
+        return True
+    time = timezone.localtime(at).time()
+    if rule.daily_start <= rule.daily_end:
+        return rule.daily_start <= time < rule.daily_end
+    return time >= rule.daily_start or time < rule.daily_end
+
+
+class Evaluator:
+    """
+    Promotion rules compiled into lookups by menu item id and type.
+    """
+
+    def __init__(self, rules, version=None):
+        self.version = version
+        self.by_item = {}
+        self.by_type = {}
+        self.everywhere = []
+        # Largest discount first, so that the first rule that holds for a line is the best one
+        for rule, item_type in sorted(rules, key=lambda entry: -entry[0].percent_off):
+            for item_id in rule.items:
+                self.by_item.setdefault(item_id, []).append(rule)
+            if item_type:
+                self.by_type.setdefault(item_type, []).append(rule)
+            if not rule.items and not item_type:
+                self.everywhere.append(rule)
+
+    def candidates(self, item_id, item_type):
+        """
+        Returns the rules that may apply to a menu item, largest discount first.
+        """
+        rules = [*self.by_item.get(item_id, ()), *self.by_type.get(item_type, ()), *self.everywhere]
+        return sorted(set(rules), key=lambda rule: (-rule.percent_off, rule.id))
+
+    def price(self, lines, at):
+        """
+        Works out the discount of each line of an order.
+
+        Args:
+            lines (list[tuple]): Menu item id, item type, unit price and amount of each line.
+            at (datetime): Time of the order.
+
+        Returns:
+            list[tuple[float, int]]: Discount and id of the applied promotion of each line,
+            (0.0, None) for lines without one.
+        """
+        candidates = [[rule for rule in self.candidates(item_id, item_type) if in_window(rule, at)]
+                      for item_id, item_type, _, _ in lines]
+        present = {item_id for item_id, _, _, _ in lines}
+        quantities = {}
+        for rules, (_, _, _, amount) in zip(candidates, lines):
+            for rule in rules:
+                quantities[rule.id] = quantities.get(rule.id, 0) + amount
+        priced = []
+        for rules, (_, _, price, amount) in zip(candidates, lines):
+            rule = next((rule for rule in rules if quantities[rule.id] >= rule.min_quantity
+                         and (not rule.combo or rule.items <= present)), None)
+            if rule is None:
+                priced.append((0.0, None))
+            else:
+                priced.append((round(amount * price * rule.percent_off / 100, 2), rule.id))
+        return priced
+
+    def discount(self, lines, at):
+        """
+        Returns the total discount of an order, see price().
+        """
+        return round(sum(discount for discount, _ in self.price(lines, at)), 2)
+
+
+def compile_rules(version=None):
+    """
+    Compiles the active promotions with two queries.
+    """
+    promotions = Promotion.objects.filter(active=True).prefetch_related("items")
+    return Evaluator([(Rule(promotion.id, promotion.percent_off,
+                            frozenset(item.id for item in promotion.items.all()), promotion.combo,
+                            promotion.min_quantity, promotion.valid_from, promotion.valid_until,
+                            promotion.daily_start, promotion.daily_end), promotion.item_type)
+                      for promotion in promotions], version)
+
+
+_evaluator = versions.LocalCache(VERSION_NAME, compile_rules)
+
+
+def evaluator():
+    """
+    Returns the compiled promotions, recompiling them when they changed.
+    """
+    return _evaluator.get()
+
+
+def invalidate():
+    """
+    Drops the compiled promotions of this process at once and, through the
+    promotions version, those of the other processes.
+    """
+    versions.bump(VERSION_NAME)
+    _evaluator.invalidate()
+    # Also after the commit, in case a request of this process compiled the old rules in between
+    transaction.on_commit(_evaluator.invalidate)
+
+
+def store_discounts(order):
+    """
+    Prices the lines of an order and stores the discount and promotion of
+    each line that changed.
+
+    Args:
+        order (Order): The order, whose lines have been saved.
+    """
+    lines = list(OrderItem.objects.filter(order_id=order.id).with_line_totals().order_by())
+    priced = evaluator().price([(line.item_id, line.item_type, line.unit_price, line.amount) for line in lines],
+                               order.created_at)
+    changed = []
+    for line, (discount, promotion_id) in zip(lines, priced):
+        if (line.discount, line.promotion_id) != (discount, promotion_id):
+            line.discount, line.promotion_id = discount, promotion_id
+            changed.append(line)
+    # bulk_update bypasses the model signals, which would store the discounts again
+    OrderItem.objects.bulk_update(changed, ["discount", "promotion"])
@@ -0,0 +1,165 @@
+"""
+"Frequently ordered together" recommendations.
+
+The ItemPair table is a sparse item x item matrix of how many orders
+contain both items. It is built from the order lines with NumPy and kept up
+to date by adding the differences of each order change, so it never needs
+a scan of the order history. The top of each item's row is cached in the
+process for a short while, so lookups are a dictionary access.
+"""
+import time
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, When
+
+from app import counters
+from app.models import ArchivedOrderItem, ItemPair, OrderItem
+
+# Number of co-ordered items cached per item
+TOP_K = 20
+# How long a cached row is used before it is read again, so that changes
+# made by other processes show up
+CACHE_SECONDS = 60
+
+_cache = {}
+
+
+def co_occurrences(order_ids, item_ids):
+    """
+    Counts the orders containing each pair of items, including each item with itself.
+
+    The lines are deduplicated and sorted by order, and every ordered pair
+    within an order is generated with array operations, so the cost is the
+    sum of the squared number of distinct items per order.
+
+    Args:
+        order_ids (array-like): Order of each line.
+        item_ids (array-like): Menu item of each line.
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: Item, other item and number of orders of each pair.
+    """
+    lines = np.unique(np.column_stack([np.asarray(order_ids, dtype=np.int64),
+                                       np.asarray(item_ids, dtype=np.int64)]).reshape(-1, 2), axis=0)
+    if not len(lines):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    items = lines[:, 1]
+    _, starts, sizes = np.unique(lines[:, 0], return_index=True, return_counts=True)
+    # Each line is paired with every line of its order
+    repeats = np.repeat(sizes, sizes)
+    left = np.repeat(items, repeats)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    right = items[np.repeat(np.repeat(starts, sizes), repeats) + offsets]
+    pairs, counts = np.unique(np.column_stack([left, right]), axis=0, return_counts=True)
+    return pairs[:, 0], pairs[:, 1], counts
+
+
+def pairs_of(items):
+    """
+    Returns the ordered pairs of a set of items, including each item with itself.
+    """
+    return {(item, other) for item in items for other in items}
+
+
+def record_change(before, after):
+    """
+    Applies a change to the set of items of one order.
+
+    Args:
+        before (Iterable[int]): Items of the order before the change.
+        after (Iterable[int]): Items of the order after the change.
+    """
+    deltas = Counter(dict.fromkeys(pairs_of(set(after)), 1))
+    deltas.subtract(dict.fromkeys(pairs_of(set(before)), 1))
+    rows = [(item, other, delta) for (item, other), delta in deltas.items() if delta]
+    counters.increment(ItemPair, ["item", "other"], ["orders"], rows)
+    invalidate({item for item, _, _ in rows})
+
+
+def record_line_change(order_id, removed=None, added=None):
+    """
+    Applies a change to one line of an order that has already been saved.
+
+    Args:
+        order_id (int): The order.
+        removed (int): Menu item of the line before the change, if any.
+        added (int): Menu item of the line after the change, if any.
+    """
+    after = list(OrderItem.objects.filter(order_id=order_id).order_by().values_list("item_id", flat=True))
+    before = list(after)
+    if added is not None:
+        before.remove(added)
+    if removed is not None:
+        before.append(removed)
+    record_change(before, after)
+
+
+def rebuild():
+    """
+    Recomputes the whole matrix from the live and archived order lines.
+    """
+    lines = [*OrderItem.objects.order_by().values_list("order_id", "item_id"),
+             *ArchivedOrderItem.objects.order_by().values_list("order_id", "item_id")]
+    items, others, orders = co_occurrences(*zip(*lines)) if lines else co_occurrences([], [])
+    with transaction.atomic():
+        ItemPair.objects.all().delete()
+        ItemPair.objects.bulk_create([ItemPair(item_id=item, other_id=other, orders=count)
+                                      for item, other, count in zip(items.tolist(), others.tolist(),
+                                                                    orders.tolist())],
+                                     batch_size=1000)
+    invalidate()
+
+
+def invalidate(item_ids=None):
+    """
+    Drops cached rows, of the given items or of all items.
+    """
+    if item_ids is None:
+        _cache.clear()
+    for item_id in item_ids or ():
+        _cache.pop(item_id, None)
+
+
+def top_row(item_id):
+    """
+    Returns the number of orders containing an item and the items most often
+    ordered with it, reading the row with one query when it is not cached.
+
+    Args:
+        item_id (int): The menu item.
+
+    Returns:
+        tuple[int, list[tuple[int, str, int]]]: Orders with the item, and the
+        id, name and number of shared orders of the top co-ordered items.
+    """
+    cached = _cache.get(item_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    # The item's own count is sorted first, so that items tied with it cannot push it out of the slice
+    own_first = Case(When(other_id=item_id, then=0), default=1)
+    rows = list(ItemPair.objects.filter(item_id=item_id, orders__gt=0).order_by(own_first, "-orders", "other_id")
+                .values_list("other_id", "other__name", "orders")[:TOP_K + 1])
+    own = rows[0][2] if rows and rows[0][0] == item_id else 0
+    row = (own, [row for row in rows if row[0] != item_id][:TOP_K])
+    _cache[item_id] = (time.monotonic() + CACHE_SECONDS, row)
+    return row
+
+
+def recommend(item_id, limit):
+    """
+    Returns the items most often ordered together with an item.
+
+    Args:
+        item_id (int): The menu item.
+        limit (int): Maximum number of items, up to TOP_K.
+
+    Returns:
+        list[dict]: Item id, name, number of shared orders and the share of the
+        item's orders that also contain the other item.
+    """
+    own, row = top_row(item_id)
+    return [{"item_id": other_id, "name": name, "orders": orders, "confidence": orders / own if own else 0.0}
+            for other_id, name, orders in row[:limit]]
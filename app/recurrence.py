@@ -0,0 +1,271 @@
+"""
+Lazy expansion of recurring reservations.
+
+A recurring reservation is stored as its first occurrence plus a
+ReservationRecurrence rule. Occurrence k starts at start + k * period, and
+the occurrences overlapping a window are computed with a couple of integer
+divisions, so storage and conflict checks stay constant in the number of
+occurrences. The first occurrence is a regular Reservation row and is
+covered by the database overlap constraint; the functions here deal with
+the occurrences after it.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from math import gcd
+
+from django.db import connection
+from django.db.models import F, Func, IntegerField, Q
+
+from app.models import Reservation, ReservationRecurrence
+
+MAX_PERIOD = timedelta(weeks=52)
+
+Series = namedtuple("Series", ["reservation_id", "table_id", "start", "duration", "period", "until",
+                               "number_of_people"])
+
+
+class Epoch(Func):
+    """
+    Whole seconds since the Unix epoch of a datetime column.
+    """
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):  # pylint: disable=redefined-outer-name
+        return self.as_sql(compiler, connection,
+                           template="CAST(ROUND((julianday(%(expressions)s) - 2440587.5) * 86400) AS INTEGER)",
+                           **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):  # pylint: disable=redefined-outer-name
+        return self.as_sql(compiler, connection, template="CAST(EXTRACT(EPOCH FROM %(expressions)s) AS BIGINT)",
+                           **extra_context)
+
+
+def series_of(recurrence, reservation):
+    """
+    Builds a Series from a recurrence rule and its reservation.
+
+    Args:
+        recurrence (ReservationRecurrence): The rule.
+        reservation (Reservation): The first occurrence.
+
+    Returns:
+        Series: The series.
+    """
+    return Series(reservation.id, reservation.table_id, reservation.date_and_time, reservation.duration,
+                  recurrence.period, recurrence.until, reservation.number_of_people)
+
+
+def load_series(table_ids, window_start=None, window_end=None, exclude=None):
+    """
+    Loads the recurring reservations of some tables that may have occurrences in a window.
+
+    Args:
+        table_ids (Iterable[int]): Tables to load series for.
+        window_start (datetime): Start of the window, or None for no lower bound.
+        window_end (datetime): End of the window, or None for no upper bound.
+        exclude (int): Id of a reservation whose series is left out.
+
+    Returns:
+        list[Series]: The series.
+    """
+    recurrences = ReservationRecurrence.objects.filter(reservation__table_id__in=table_ids) \
+        .select_related("reservation")
+    if window_end is not None:
+        recurrences = recurrences.filter(reservation__date_and_time__lt=window_end)
+    if window_start is not None:
+        # Occurrences start no later than until and are shorter than the longest period
+        recurrences = recurrences.filter(Q(until__isnull=True) | Q(until__gt=window_start - MAX_PERIOD))
+    if exclude is not None:
+        recurrences = recurrences.exclude(reservation_id=exclude)
+    return [series_of(recurrence, recurrence.reservation) for recurrence in recurrences]
+
+
+def occurrence_range(series, window_start, window_end):
+    """
+    Returns the indices of the occurrences that overlap [window_start, window_end).
+
+    Args:
+        series (Series): The series.
+        window_start (datetime): Start of the window.
+        window_end (datetime): End of the window.
+
+    Returns:
+        range: Occurrence indices, 0 being the stored reservation.
+    """
+    # Occurrence k overlaps when start + k * period < window_end and start + k * period + duration > window_start
+    first = max(0, (window_start - series.duration - series.start) // series.period + 1)
+    last = -((series.start - window_end) // series.period)
+    if series.until is not None:
+        last = min(last, (series.until - series.start) // series.period + 1)
+    return range(first, max(first, last))
+
+
+def expand(series_list, window_start, window_end):
+    """
+    Lists the occurrences after the first one that overlap a window.
+
+    Args:
+        series_list (Iterable[Series]): The series to expand.
+        window_start (datetime): Start of the window.
+        window_end (datetime): End of the window.
+
+    Returns:
+        list[tuple[Series, datetime, datetime]]: The series, start and end of every occurrence.
+    """
+    occurrences = []
+    for series in series_list:
+        for index in occurrence_range(series, window_start, window_end):
+            if index:
+                start = series.start + index * series.period
+                occurrences.append((series, start, start + series.duration))
+    return occurrences
+
+
+def occurrences_in_window(window_start, window_end):
+    """
+    Lists every occurrence of every reservation that overlaps a window, with
+    recurring reservations expanded inside the window only.
+
+    Args:
+        window_start (datetime): Start of the window.
+        window_end (datetime): End of the window.
+
+    Returns:
+        list[dict]: Occurrences ordered by start time.
+    """
+    fields = ["id", "table_id", "user_id", "number_of_people", "date_and_time", "end_time"]
+    occurrences = [
+        {"reservation": row[0], "table": row[1], "user": row[2], "number_of_people": row[3],
+         "start": row[4], "end": row[5]}
+        for row in Reservation.objects.filter(date_and_time__lt=window_end, end_time__gt=window_start)
+        .values_list(*fields)
+    ]
+
+    recurrences = ReservationRecurrence.objects.filter(reservation__date_and_time__lt=window_end) \
+        .filter(Q(until__isnull=True) | Q(until__gt=window_start - MAX_PERIOD)).select_related("reservation")
+    users = {}
+    series_list = []
+    for rule in recurrences:
+        series_list.append(series_of(rule, rule.reservation))
+        users[rule.reservation_id] = rule.reservation.user_id
+    for series, start, end in expand(series_list, window_start, window_end):
+        occurrences.append({"reservation": series.reservation_id, "table": series.table_id,
+                            "user": users[series.reservation_id], "number_of_people": series.number_of_people,
+                            "start": start, "end": end})
+
+    occurrences.sort(key=lambda occurrence: (occurrence["start"], occurrence["reservation"]))
+    return occurrences
+
+
+def overlaps_interval(series, start_time, end_time):
+    """
+    Checks whether any occurrence after the first one overlaps an interval.
+
+    Args:
+        series (Series): The series.
+        start_time (datetime): Start of the interval.
+        end_time (datetime): End of the interval.
+
+    Returns:
+        bool: True if an occurrence overlaps the interval.
+    """
+    occurrences = occurrence_range(series, start_time, end_time)
+    return len(occurrences) > 1 or (len(occurrences) == 1 and occurrences[0] != 0)
+
+
+def overlaps_series(first, second):
+    """
+    Checks whether two series of the same table ever overlap. The relative
+    position of their occurrences repeats with the least common multiple of
+    the periods, so only the occurrences of the first series within one such
+    cycle have to be compared.
+
+    Args:
+        first (Series): A series.
+        second (Series): Another series.
+
+    Returns:
+        bool: True if an occurrence of one overlaps an occurrence of the other.
+    """
+    first_seconds = int(first.period.total_seconds())
+    second_seconds = int(second.period.total_seconds())
+    cycle = first.period * (second_seconds // gcd(first_seconds, second_seconds))
+
+    origin = max(first.start, second.start)
+    window_end = origin + cycle + first.duration
+    if first.until is not None:
+        window_end = min(window_end, first.until + first.duration)
+    for index in occurrence_range(first, origin, window_end):
+        start = first.start + index * first.period
+        if occurrence_range(second, start, start + first.duration):
+            return True
+    return False
+
+
+def conflicts_with_series(table_id, start_time, end_time, exclude=None):
+    """
+    Checks whether an interval clashes with an occurrence of a recurring reservation.
+
+    Args:
+        table_id (int): The table.
+        start_time (datetime): Start of the interval.
+        end_time (datetime): End of the interval.
+        exclude (int): Id of a reservation whose series is ignored.
+
+    Returns:
+        bool: True if the interval overlaps an occurrence after the first one.
+    """
+    return any(overlaps_interval(series, start_time, end_time)
+               for series in load_series([table_id], start_time, end_time, exclude=exclude))
+
+
+def in_phase(reservations, series):
+    """
+    Narrows reservations to those an occurrence of a series may overlap, in
+    the database, so that an open-ended series is not compared in Python with
+    every later reservation of its table. A reservation [a, b) overlaps
+    occurrence k when a - start - duration < k * period < b - start, which for
+    k >= 1 holds when the two bounds fall in different periods. Both bounds are
+    widened by two seconds for rounding, so the result is checked exactly after.
+
+    Args:
+        reservations (QuerySet): Reservations of the series' table.
+        series (Series): The series.
+
+    Returns:
+        QuerySet: The reservations starting within the first period, and the later ones in phase with the series.
+    """
+    start = int(series.start.timestamp())
+    period = int(series.period.total_seconds())
+    duration = int(series.duration.total_seconds())
+    return reservations.alias(
+        last_period=(Epoch("end_time") - start + 2) / period,
+        first_period=(Epoch("date_and_time") - start - duration - 2) / period,
+    ).filter(Q(date_and_time__lt=series.start + series.period + series.duration)
+             | Q(last_period__gt=F("first_period")))
+
+
+def series_conflicts(series):
+    """
+    Checks whether a new or changed series clashes with the reservations or
+    other series of its table.
+
+    Args:
+        series (Series): The series to check.
+
+    Returns:
+        bool: True if any occurrence after the first one clashes.
+    """
+    window_end = None if series.until is None else series.until + series.duration
+    reservations = Reservation.objects.filter(table_id=series.table_id, end_time__gt=series.start) \
+        .exclude(id=series.reservation_id)
+    if window_end is not None:
+        reservations = reservations.filter(date_and_time__lt=window_end)
+    if connection.vendor in ("postgresql", "sqlite"):
+        reservations = in_phase(reservations, series)
+    if any(overlaps_interval(series, start, end)
+           for start, end in reservations.values_list("date_and_time", "end_time")):
+        return True
+
+    others = load_series([series.table_id], series.start, window_end, exclude=series.reservation_id)
+    return any(overlaps_series(series, other) for other in others)
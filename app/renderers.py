@@ -0,0 +1,103 @@
+"""
+Renderers and parsers for the API.
+
+JSON is encoded and decoded with orjson, which handles datetimes, dates and
+times natively; timedeltas, decimals and other values fall back to DRF's
+encoder, so the output is the same as that of DRF's JSONRenderer. Without
+orjson installed, or when an indented response is asked for, the stdlib
+json module of DRF's classes is used instead.
+
+MessagePack is offered to the point of sale clients under
+application/msgpack when the msgpack package is installed. Values without
+a MessagePack type are encoded as they would be in JSON.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def encode_default(value):
+    """
+    Encodes the values the fast encoders have no type for, like DRF's JSONEncoder.
+    """
+    return _encoder.default(value)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Renders the data into JSON, with the stdlib encoder when orjson is missing or indentation is asked for.
+        """
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=encode_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser backed by orjson.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parses the JSON request body, with the stdlib decoder when orjson is missing.
+        """
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as error:
+            raise ParseError(f"JSON parse error - {error}") from error
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack renderer.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Renders the data into MessagePack.
+        """
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default)
+
+
+class MessagePackParser(BaseParser):
+    """
+    MessagePack parser.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parses the MessagePack request body.
+        """
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as error:
+            raise ParseError(f"MessagePack parse error - {error}") from error
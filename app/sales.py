@@ -0,0 +1,143 @@
+"""
+Daily sales rollup per menu item.
+
+Every change to orders and their lines is applied to the DailySales table
+as a difference, so that the sales reports read only the rollup and their
+cost does not grow with the order history. Revenue is counted at the price
+stored on each line when it was recorded, so removing a line later takes
+out what was added even if the menu item's price changed in between.
+Archiving moves orders out of the hot tables without touching the rollup,
+and rebuild() recomputes it from the live and archived orders for
+reconciliation.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from app import counters
+from app.models import ArchivedOrderItem, DailySales, MenuItem, Order, OrderItem
+
+# Statuses of orders whose lines are not counted as sales
+UNCOUNTED_STATUSES = ["cancelled"]
+
+# Revenue of a line, at its stored price or, for lines stored without one, the current price
+LINE_REVENUE = Sum(F("amount") * Coalesce(F("price"), F("item__price")), output_field=FloatField())
+
+
+def is_counted(status):
+    """
+    Returns whether the lines of an order in the given status count as sales.
+    """
+    return status not in UNCOUNTED_STATUSES
+
+
+def apply(deltas):
+    """
+    Adds quantity and revenue differences to the rollup with one upsert.
+
+    Args:
+        deltas (dict): (day, item id) mapped to a [quantity, revenue] difference.
+    """
+    counters.increment(DailySales, ["day", "item"], ["quantity", "revenue"],
+                       [(*key, quantity, revenue) for key, (quantity, revenue) in deltas.items()])
+
+
+def record_orders(order_ids, sign=1):
+    """
+    Adds (or with sign -1, removes) all lines of the given orders to the rollup,
+    aggregated in the database.
+
+    Args:
+        order_ids (Iterable[int]): Ids of the orders.
+        sign (int): 1 to add the lines, -1 to remove them.
+    """
+    rows = (OrderItem.objects.filter(order_id__in=list(order_ids))
+            .annotate(day=TruncDate("order__created_at", tzinfo=timezone.get_current_timezone()))
+            .values("day", "item_id").order_by()
+            .annotate(quantity=Sum("amount"), revenue=LINE_REVENUE))
+    apply({(row["day"], row["item_id"]): [sign * row["quantity"], sign * row["revenue"]] for row in rows})
+
+
+def record_lines(lines):
+    """
+    Applies changes to individual order lines to the rollup. Lines of
+    uncounted orders are skipped.
+
+    Args:
+        lines (Iterable[tuple[int, int, int, float]]): Order id, menu item id, a signed amount and the
+            stored price of the line, or None for the current price, for each change.
+    """
+    lines = list(lines)
+    if not lines:
+        return
+    orders = {order_id: (status, created_at) for order_id, status, created_at in
+              Order.objects.filter(id__in={line[0] for line in lines}).order_by()
+              .values_list("id", "status", "created_at")}
+    unpriced = {line[1] for line in lines if line[3] is None}
+    prices = dict(MenuItem.objects.filter(id__in=unpriced).order_by().values_list("id", "price")) if unpriced else {}
+    deltas = defaultdict(lambda: [0, 0.0])
+    for order_id, item_id, amount, price in lines:
+        price = prices.get(item_id) if price is None else price
+        if order_id not in orders or price is None or not is_counted(orders[order_id][0]):
+            continue
+        delta = deltas[(timezone.localdate(orders[order_id][1]), item_id)]
+        delta[0] += amount
+        delta[1] += amount * price
+    apply(deltas)
+
+
+def rebuild():
+    """
+    Recomputes the whole rollup from the live and archived orders.
+    """
+    deltas = defaultdict(lambda: [0, 0.0])
+    tzinfo = timezone.get_current_timezone()
+    for model in (OrderItem, ArchivedOrderItem):
+        rows = (model.objects.exclude(order__status__in=UNCOUNTED_STATUSES)
+                .annotate(day=TruncDate("order__created_at", tzinfo=tzinfo))
+                .values("day", "item_id").order_by()
+                .annotate(quantity=Sum("amount"), revenue=LINE_REVENUE))
+        for row in rows:
+            delta = deltas[(row["day"], row["item_id"])]
+            delta[0] += row["quantity"]
+            delta[1] += row["revenue"]
+    with transaction.atomic():
+        DailySales.objects.all().delete()
+        DailySales.objects.bulk_create([DailySales(day=day, item_id=item_id, quantity=quantity, revenue=revenue)
+                                        for (day, item_id), (quantity, revenue) in deltas.items()])
+
+
+def sales_by_day(start, end):
+    """
+    Total quantity and revenue per day in a date range, read from the rollup.
+
+    Args:
+        start (date): First day of the range.
+        end (date): Last day of the range.
+
+    Returns:
+        list[dict]: Day, quantity and revenue for each day with sales.
+    """
+    return list(DailySales.objects.filter(day__range=(start, end)).values("day").order_by("day")
+                .annotate(quantity=Sum("quantity"), revenue=Sum("revenue")).filter(quantity__gt=0))
+
+
+def top_items(start, end, limit):
+    """
+    Best selling menu items in a date range, read from the rollup.
+
+    Args:
+        start (date): First day of the range.
+        end (date): Last day of the range.
+        limit (int): Maximum number of items.
+
+    Returns:
+        list[dict]: Item id, name, quantity and revenue, by quantity sold.
+    """
+    return list(DailySales.objects.filter(day__range=(start, end))
+                .values("item_id", name=F("item__name")).order_by()
+                .annotate(quantity=Sum("quantity"), revenue=Sum("revenue")).filter(quantity__gt=0)
+                .order_by("-quantity", "-revenue", "item_id")[:limit])
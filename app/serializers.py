@@ -1,14 +1,63 @@
 """
 Serializers for the application.
 """
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
 from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.fields import empty
+
+from app import counters, inventory, kitchen, promotions, recommendations, recurrence, sales
+from app.assignment import assign_table
+from app.models import User, Reservation, ReservationRecurrence, Table, MenuItem, OrderItem, Order, Promotion
+from app.sparse import SparseFieldsMixin
+
 
-from app.models import User, Reservation, Table, MenuItem, OrderItem, Order
+@contextmanager
+def reservation_overlap_guard():
+    """
+    Runs the enclosed writes in a savepoint and turns a violation of the
+    reservation overlap constraint into a validation error.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as error:
+        if Reservation.OVERLAP_CONSTRAINT in str(error):
+            raise ValidationError("The selected table is not available at this time.") from error
+        raise
+
+
+@contextmanager
+def stock_guard():
+    """
+    Runs the enclosed writes in a savepoint and turns missing stock into a
+    validation error, leaving the stock and the order untouched.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except inventory.InsufficientStock as error:
+        raise ValidationError({'order_items': [str(error)]}) from error
 
 
-class UserSerializer(serializers.ModelSerializer):
+def line_amounts(lines):
+    """
+    Returns the number of portions of each menu item over order lines.
+    """
+    amounts = {}
+    for line in lines:
+        amounts[line['item_id']] = amounts.get(line['item_id'], 0) + line['amount']
+    return amounts
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the User model.
     """
@@ -16,17 +65,61 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'name']
 
-class ReservationSerializer(serializers.ModelSerializer):
+class RecurrenceSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ReservationRecurrence model.
+    """
+    class Meta:
+        model = ReservationRecurrence
+        fields = ['frequency', 'interval', 'until']
+
+
+class ReservationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Reservation model.
     """
+    recurrence = RecurrenceSerializer(required=False, allow_null=True)
+
     class Meta:
         model = Reservation
-        fields = ['id', 'user', 'table', 'number_of_people', 'date_and_time', 'duration']
+        fields = ['id', 'user', 'table', 'number_of_people', 'date_and_time', 'duration', 'end_time', 'recurrence']
+        read_only_fields = ['end_time']
+        extra_kwargs = {'table': {'required': False}}
+
+    def validate(self, attrs):
+        """
+        Check that occurrences of a recurring reservation cannot overlap each other.
+        """
+        rule = attrs.get('recurrence')
+        duration = attrs.get('duration', getattr(self.instance, 'duration', None))
+        if rule and duration is not None and duration >= ReservationRecurrence(**rule).period:
+            raise ValidationError("The reservation must be shorter than its recurrence period.")
+        return attrs
+
+    def _save_recurrence(self, instance, recurrence_data=empty):
+        """
+        Creates, replaces or removes (None) the recurrence rule of a reservation,
+        then checks the occurrences after the first one for conflicts. The first
+        occurrence is covered by the database constraint.
+        """
+        if recurrence_data is None:
+            ReservationRecurrence.objects.filter(reservation=instance).delete()
+            instance.recurrence = None
+        elif recurrence_data is not empty:
+            instance.recurrence, _ = ReservationRecurrence.objects.update_or_create(
+                reservation=instance, defaults=recurrence_data)
+
+        if recurrence.conflicts_with_series(instance.table_id, instance.date_and_time, instance.end_time,
+                                            exclude=instance.id):
+            raise ValidationError("The selected table is not available at this time.")
+        rule = ReservationRecurrence.objects.filter(reservation=instance).first()
+        if rule is not None and recurrence.series_conflicts(recurrence.series_of(rule, instance)):
+            raise ValidationError("The selected table is not available for every occurrence of this reservation.")
 
     def create(self, validated_data):
         """
         Override the create method to add custom validation for table availability.
+        A table is assigned automatically when none is given.
         """
         table = validated_data.get('table')
         date_and_time = validated_data.get('date_and_time')
@@ -36,40 +129,23 @@ class ReservationSerializer(serializers.ModelSerializer):
         if date_and_time < timezone.now():
             raise ValidationError("The reservation cannot be in the past.")
 
-        actual_table = Table.objects.get(id=table.id)
+        if table is None:
+            table = assign_table(validated_data.get('number_of_people'), date_and_time, duration)
+            if table is None:
+                raise ValidationError("No table is available for this number of people at this time.")
+            validated_data['table'] = table
+
         # Check if the number of people is within the table's capacity
-        if validated_data.get('number_of_people') < actual_table.min_people \
-                or validated_data.get('number_of_people') > actual_table.max_people:
+        if validated_data.get('number_of_people') < table.min_people \
+                or validated_data.get('number_of_people') > table.max_people:
             raise ValidationError("The number of people exceeds the table's capacity.")
 
-        # Check if the table is available
-        if not self._is_table_available(table, date_and_time, duration):
-            raise ValidationError("The selected table is not available at this time.")
-
-        return super().create(validated_data)
-
-    def _is_table_available(self, table, start_time, duration):
-        """
-        Checks if a table is available at a given time.
-
-        Args:
-            table (Table): The table to check availability for.
-            start_time (datetime): The desired reservation start time.
-            duration (timedelta): The duration of the reservation.
-
-        Returns:
-            bool: True if the table is available, False otherwise.
-        """
-        end_time = start_time + duration
-
-        # Check if any existing reservation overlaps
-        overlapping_reservations = Reservation.objects.filter(
-            table=table,
-            date_and_time__lt=end_time,
-            date_and_time__gt=start_time - duration
-        )
-
-        return not overlapping_reservations.exists()
+        # Overlaps are rejected by the database constraint, no pre-check needed
+        recurrence_data = validated_data.pop('recurrence', empty)
+        with reservation_overlap_guard():
+            instance = super().create(validated_data)
+            self._save_recurrence(instance, recurrence_data)
+        return instance
 
     def update(self, instance, validated_data):
         """
@@ -77,26 +153,93 @@ class ReservationSerializer(serializers.ModelSerializer):
         """
         table = validated_data.get('table', instance.table)
         date_and_time = validated_data.get('date_and_time', instance.date_and_time)
-        duration = validated_data.get('duration', instance.duration)
+        number_of_people = validated_data.get('number_of_people', instance.number_of_people)
 
         # Check that reservation is not in the past
         if date_and_time < timezone.now():
             raise ValidationError("The reservation cannot be in the past.")
 
-        actual_table = Table.objects.get(id=table.id)
         # Check if the number of people is within the table's capacity
-        if (validated_data.get('number_of_people') < actual_table.min_people \
-                or validated_data.get('number_of_people') > actual_table.max_people):
+        if number_of_people < table.min_people or number_of_people > table.max_people:
             raise ValidationError("The number of people exceeds the table's capacity.")
 
-        # Check if the table is available
-        if not self._is_table_available(table, date_and_time, duration):
-            raise ValidationError("The selected table is not available at this time.")
+        # Overlaps are rejected by the database constraint, no pre-check needed
+        recurrence_data = validated_data.pop('recurrence', empty)
+        with reservation_overlap_guard():
+            instance = super().update(instance, validated_data)
+            self._save_recurrence(instance, recurrence_data)
+        return instance
 
-        return super().update(instance, validated_data)
 
+class ReservationFilterSerializer(serializers.Serializer):
+    """
+    Serializer for validating the query parameters of the reservation list.
+    """
+    time_status = serializers.ChoiceField(choices=['upcoming', 'current', 'past'], required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
 
-class TableSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        """
+        Check that the date range is not empty.
+        """
+        if 'start' in attrs and 'end' in attrs and attrs['end'] <= attrs['start']:
+            raise ValidationError("The end of the range must be after its start.")
+        return attrs
+
+
+class OccurrenceQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the window of an occurrence listing.
+    """
+    MAX_WINDOW = timedelta(days=92)
+
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+    def validate(self, attrs):
+        """
+        Check that the window is non-empty and not too long.
+        """
+        if attrs['end'] <= attrs['start']:
+            raise ValidationError("The end of the window must be after its start.")
+        if attrs['end'] - attrs['start'] > self.MAX_WINDOW:
+            raise ValidationError(f"The window cannot be longer than {self.MAX_WINDOW.days} days.")
+        return attrs
+
+
+class OccurrenceSerializer(serializers.Serializer):
+    """
+    Serializer for a single occurrence of a reservation, recurring or not.
+    """
+    reservation = serializers.IntegerField()
+    table = serializers.IntegerField()
+    user = serializers.IntegerField()
+    number_of_people = serializers.IntegerField()
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class ArchiveQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the query parameter that includes archived rows.
+    """
+    include_archived = serializers.BooleanField(default=False)
+
+
+class ReservationImportSerializer(serializers.Serializer):
+    """
+    Serializer for validating a single row of a bulk reservation import.
+    Related objects are referenced by id and resolved for the whole batch at once.
+    """
+    user = serializers.IntegerField()
+    table = serializers.IntegerField()
+    number_of_people = serializers.IntegerField(min_value=1)
+    date_and_time = serializers.DateTimeField()
+    duration = serializers.DurationField(min_value=timedelta(minutes=1))
+
+
+class TableSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Table model.
     """
@@ -104,29 +247,284 @@ class TableSerializer(serializers.ModelSerializer):
         model = Table
         fields = ['id', 'min_people', 'max_people']
 
-class MenuItemSerializer(serializers.ModelSerializer):
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the query parameters of a free slot search.
+    """
+    MAX_WINDOW = timedelta(days=31)
+
+    people = serializers.IntegerField(min_value=1)
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    slot = serializers.DurationField(default=timedelta(minutes=15), min_value=timedelta(minutes=1))
+    duration = serializers.DurationField(min_value=timedelta(minutes=1))
+
+    def validate(self, attrs):
+        """
+        Check that the search window is non-empty and not too long.
+        """
+        if attrs['end'] <= attrs['start']:
+            raise ValidationError("The end of the window must be after its start.")
+        if attrs['end'] - attrs['start'] > self.MAX_WINDOW:
+            raise ValidationError(f"The window cannot be longer than {self.MAX_WINDOW.days} days.")
+        return attrs
+
+
+class DayGridQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the query parameters of the day grid.
+    """
+    date = serializers.DateField(required=False)
+
+
+class DayGridSerializer(serializers.Serializer):
+    """
+    Serializer for the occupied slots of a table on a day, one character per
+    15-minute slot ("1" occupied, "0" free).
+    """
+    table = serializers.IntegerField()
+    slots = serializers.CharField()
+
+
+class BucketField(serializers.Field):
+    """
+    A bucket length given as a number and a unit, e.g. "15m", "2h" or "1d".
+    """
+    UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+    default_error_messages = {'invalid': 'Bucket must be a positive number followed by m, h or d.'}
+
+    def to_internal_value(self, data):
+        data = str(data)
+        unit = self.UNITS.get(data[-1:])
+        if unit is None or not data[:-1].isdigit() or int(data[:-1]) == 0:
+            self.fail('invalid')
+        return timedelta(**{unit: int(data[:-1])})
+
+    def to_representation(self, value):
+        return serializers.DurationField().to_representation(value)
+
+
+class OccupancyQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the query parameters of the occupancy report.
+    """
+    MAX_BUCKETS = 10000
+
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    bucket = BucketField(default=timedelta(minutes=15))
+
+    def validate(self, attrs):
+        """
+        Check that the window is non-empty and does not produce too many buckets.
+        """
+        if attrs['end'] <= attrs['start']:
+            raise ValidationError("The end of the window must be after its start.")
+        if (attrs['end'] - attrs['start']) / attrs['bucket'] > self.MAX_BUCKETS:
+            raise ValidationError(f"The window cannot be split into more than {self.MAX_BUCKETS} buckets.")
+        return attrs
+
+
+class TableOccupancySerializer(serializers.Serializer):
+    """
+    Serializer for the occupancy of one table, as the fraction of each bucket it is reserved.
+    """
+    table = serializers.IntegerField()
+    utilisation = serializers.FloatField()
+    occupancy = serializers.ListField(child=serializers.FloatField())
+
+
+class OccupancySerializer(serializers.Serializer):
     """
-    Serializer for the MenuItem model.
+    Serializer for the occupancy heatmap and seat-hours utilisation of all tables.
     """
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    bucket = serializers.DurationField()
+    utilisation = serializers.FloatField()
+    tables = TableOccupancySerializer(many=True)
+
+
+class AvailableSlotSerializer(serializers.Serializer):
+    """
+    Serializer for a bookable (table, start) pair.
+    """
+    table = serializers.IntegerField()
+    start = serializers.DateTimeField()
+
+class MenuItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the MenuItem model. The stock is read from the with_stock
+    annotation and written to the item's counter rows.
+    """
+    stock = serializers.IntegerField(min_value=0, allow_null=True, required=False,
+                                     help_text="Portions in stock, null when the stock is not tracked.")
+
     class Meta:
         model = MenuItem
-        fields = ['id', 'name', 'description', 'type', 'price']
+        fields = ['id', 'name', 'description', 'type', 'price', 'station', 'prep_time', 'batch_size', 'stock',
+                  'stock_shards']
 
+    def create(self, validated_data):
+        """
+        Create the menu item and its stock counters.
+        """
+        stock = validated_data.pop('stock', None)
+        with transaction.atomic():
+            item = super().create(validated_data)
+            inventory.set_stock(item, stock)
+        return item
+
+    def update(self, instance, validated_data):
+        """
+        Update the menu item; a new stock or shard count redistributes the stock over the counters.
+        """
+        stock_given = 'stock' in validated_data
+        stock = validated_data.pop('stock', None)
+        with transaction.atomic():
+            if not stock_given and validated_data.get('stock_shards', instance.stock_shards) != instance.stock_shards:
+                stock_given = True
+                stock = inventory.stock_levels([instance.id]).get(instance.id, (0, None))[1]
+            item = super().update(instance, validated_data)
+            if stock_given:
+                inventory.set_stock(item, stock)
+        return item
 
-class OrderItemSerializer(serializers.ModelSerializer):
+
+class RecommendationQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the query parameters of item recommendations.
+    """
+    limit = serializers.IntegerField(min_value=1, max_value=recommendations.TOP_K, default=5)
+
+
+class RecommendationSerializer(serializers.Serializer):
+    """
+    Serializer for a menu item frequently ordered together with another one.
+    """
+    item_id = serializers.IntegerField()
+    name = serializers.CharField()
+    orders = serializers.IntegerField(help_text="Orders containing both items.")
+    confidence = serializers.FloatField(help_text="Share of the item's orders that also contain this one.")
+
+
+def unit_price(line):
+    """
+    Returns the stored price of an order line, or the current price of its menu item for lines stored without one.
+    """
+    if hasattr(line, 'unit_price'):
+        return line.unit_price
+    return line.item.price if line.price is None else line.price
+
+
+def line_total(line):
+    """
+    Returns the price of an order line, from the SQL annotation when present.
+    """
+    if hasattr(line, 'line_total'):
+        return round(line.line_total, 2)
+    return round(line.amount * unit_price(line), 2)
+
+
+def priced_line(line):
+    """
+    Returns the menu item id, item type, unit price and amount of an order
+    line for the promotions, from the SQL annotations when present.
+    """
+    if hasattr(line, 'item_type'):
+        return line.item_id, line.item_type, line.unit_price, line.amount
+    return line.item_id, line.item.type, unit_price(line), line.amount
+
+
+def order_discount(order):
+    """
+    Returns the discount of an order, worked out once per order instance: the
+    sum of the discounts stored on its lines, or for lines stored without
+    them, the discount of the current promotions.
+    """
+    if not hasattr(order, 'promotion_discount'):
+        lines = order.order_items.all()
+        if all(line.discount is not None for line in lines):
+            order.promotion_discount = round(sum(line.discount for line in lines), 2)
+        else:
+            order.promotion_discount = promotions.evaluator().discount(
+                [priced_line(line) for line in lines], order.created_at)
+    return order.promotion_discount
+
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the OrderItem model.
     """
     item_id = serializers.PrimaryKeyRelatedField(
         queryset=MenuItem.objects.all(), source='item'
     )
+    order_id = serializers.PrimaryKeyRelatedField(
+        queryset=Order.objects.all(), source='order', write_only=True
+    )
+    line_total = serializers.SerializerMethodField()
+    sparse_columns = {'line_total': []}
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'amount', 'item_id']
+        fields = ['id', 'amount', 'item_id', 'order_id', 'line_total']
 
+    @extend_schema_field(OpenApiTypes.FLOAT)
+    def get_line_total(self, obj):
+        """
+        Amount times the price of the menu item.
+        """
+        return line_total(obj)
+
+    def create(self, validated_data):
+        """
+        Create the line, taking its portions out of stock.
+        """
+        with stock_guard():
+            line = super().create(validated_data)
+            if line.order.status != 'cancelled':
+                inventory.take({line.item_id: line.amount})
+        return line
 
-class OrderSerializer(serializers.ModelSerializer):
+    def update(self, instance, validated_data):
+        """
+        Update the line, moving the difference in portions in or out of stock.
+        """
+        previous = {instance.item_id: -instance.amount}
+        with stock_guard():
+            line = super().update(instance, validated_data)
+            if line.order.status != 'cancelled':
+                changes = line_amounts([{'item_id': line.item_id, 'amount': line.amount}])
+                for item_id, amount in previous.items():
+                    changes[item_id] = changes.get(item_id, 0) + amount
+                inventory.give_back({item_id: -amount for item_id, amount in changes.items() if amount < 0})
+                inventory.take({item_id: amount for item_id, amount in changes.items() if amount > 0})
+        return line
+
+
+class OrderLineSerializer(serializers.ModelSerializer):
+    """
+    Serializer for an order item nested in an order. Menu items are referenced
+    by id and validated for the whole order at once by OrderSerializer.
+    """
+    item_id = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1)
+    line_total = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'item_id', 'amount', 'line_total']
+
+    @extend_schema_field(OpenApiTypes.FLOAT)
+    def get_line_total(self, obj):
+        """
+        Amount times the price of the menu item.
+        """
+        return line_total(obj)
+
+
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Order model.
     """
@@ -134,11 +532,321 @@ class OrderSerializer(serializers.ModelSerializer):
         queryset=User.objects.all(), source='user'
     )
 
-    order_items = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=OrderItem.objects.all()
-    )
+    status = serializers.CharField(max_length=64, help_text=f"One of: {', '.join(Order.STATUSES)}.")
+    order_items = OrderLineSerializer(many=True, required=False)
+    discount = serializers.SerializerMethodField()
+    total = serializers.SerializerMethodField()
+    item_count = serializers.SerializerMethodField()
+    # The totals come from annotations and the prefetched lines, the discount of lines
+    # stored without one also needs the order time
+    sparse_columns = {'discount': ['created_at'], 'total': ['created_at'], 'item_count': []}
 
     class Meta:
         model = Order
-        fields = ['id', 'status', 'user_id', 'order_items']
+        fields = ['id', 'status', 'user_id', 'order_items', 'discount', 'total', 'item_count']
+
+    @extend_schema_field(OpenApiTypes.FLOAT)
+    def get_discount(self, obj):
+        """
+        Discount of the promotions applied when the order was priced.
+        """
+        return order_discount(obj)
+
+    @extend_schema_field(OpenApiTypes.FLOAT)
+    def get_total(self, obj):
+        """
+        Sum of the line totals, from the SQL annotation when present, less the discount.
+        """
+        if hasattr(obj, 'subtotal'):
+            subtotal = obj.subtotal
+        else:
+            subtotal = sum(line_total(line) for line in obj.order_items.all())
+        return round(subtotal - order_discount(obj), 2)
+
+    @extend_schema_field(OpenApiTypes.INT)
+    def get_item_count(self, obj):
+        """
+        Number of items over all lines, from the SQL annotation when present.
+        """
+        if hasattr(obj, 'item_count'):
+            return obj.item_count
+        return sum(line.amount for line in obj.order_items.all())
+
+    def validate_status(self, value):
+        """
+        Check that the status is known and, on update, reachable from the current one.
+        Statuses are matched case-insensitively for older clients.
+        """
+        value = value.lower()
+        if value not in Order.STATUSES:
+            raise ValidationError(f"Unknown status, expected one of: {', '.join(Order.STATUSES)}.")
+        if self.instance is not None and value != self.instance.status \
+                and not Order.can_transition(self.instance.status, value):
+            raise ValidationError(f"An order cannot move from {self.instance.status} to {value}.")
+        return value
+
+    def validate_order_items(self, value):
+        """
+        Check that all referenced menu items exist, with a single query.
+        """
+        item_ids = {line['item_id'] for line in value}
+        rows = (MenuItem.objects.filter(id__in=item_ids).order_by()
+                .annotate(shards=Count('stock_rows'), stock=Sum('stock_rows__quantity'))
+                .values_list('id', 'shards', 'stock', 'price'))
+        # Stock of the tracked items, reused when taking the portions out of stock
+        self.stock_levels = {item_id: (shards, stock) for item_id, shards, stock, _ in rows if shards}
+        # Prices recorded on the new lines
+        self.prices = {item_id: price for item_id, _, _, price in rows}
+        missing = sorted(item_ids - set(self.prices))
+        if missing:
+            raise ValidationError(f"Menu items do not exist: {', '.join(map(str, missing))}.")
+        # Updates get the portions of the replaced lines back first, so only new orders are checked here
+        short = sorted(item_id for item_id, amount in line_amounts(value).items()
+                       if item_id in self.stock_levels and self.stock_levels[item_id][1] < amount)
+        if short and self.instance is None:
+            raise ValidationError(f"Not enough stock for menu items: {', '.join(map(str, short))}.")
+        return value
+
+    def create(self, validated_data):
+        """
+        Create the order and insert its lines with one bulk insert, in a single transaction.
+        """
+        lines = validated_data.pop('order_items', [])
+        with stock_guard():
+            order = super().create(validated_data)
+            if lines and order.status != 'cancelled':
+                inventory.take(line_amounts(lines), getattr(self, 'stock_levels', None))
+            OrderItem.objects.bulk_create([OrderItem(order=order, price=self.prices[line['item_id']], **line)
+                                           for line in lines])
+            # The bulk insert bypasses the model signals
+            if lines and sales.is_counted(order.status):
+                sales.record_orders([order.id])
+            recommendations.record_change([], [line['item_id'] for line in lines])
+            if lines:
+                promotions.store_discounts(order)
+        return order
+
+    def update(self, instance, validated_data):
+        """
+        Update the order; when lines are given they replace the existing ones.
+        """
+        lines = validated_data.pop('order_items', None)
+        with stock_guard():
+            order = super().update(instance, validated_data)
+            if lines is not None:
+                # Replace the lines in the sales rollup with two aggregated updates
+                # instead of one per deleted line
+                counted = sales.is_counted(order.status)
+                if counted:
+                    sales.record_orders([order.id], -1)
+                previous_items = list(order.order_items.order_by().values_list('item_id', flat=True))
+                if order.status != 'cancelled':
+                    # Portions of the replaced lines go back to stock before the new ones are taken
+                    inventory.give_back(inventory.order_amounts([order.id]))
+                    inventory.take(line_amounts(lines))
+                with counters.paused():
+                    order.order_items.all().delete()
+                OrderItem.objects.bulk_create([OrderItem(order=order, price=self.prices[line['item_id']], **line)
+                                               for line in lines])
+                if counted:
+                    sales.record_orders([order.id])
+                recommendations.record_change(previous_items, [line['item_id'] for line in lines])
+                kitchen.orders_changed_on_commit([order.id])
+                promotions.store_discounts(order)
+        return order
+
+
+class OrderPreviewSerializer(serializers.Serializer):
+    """
+    Serializer for validating the lines of an order to be priced without placing it.
+    """
+    order_items = OrderLineSerializer(many=True, allow_empty=False)
+    at = serializers.DateTimeField(required=False, help_text="Time to price the order at, defaults to now.")
+
+    def validate_order_items(self, value):
+        """
+        Check that all referenced menu items exist and load their types and prices, with a single query.
+        """
+        item_ids = {line['item_id'] for line in value}
+        self.menu_items = {item_id: (item_type, price) for item_id, item_type, price in
+                           MenuItem.objects.filter(id__in=item_ids).order_by().values_list('id', 'type', 'price')}
+        missing = sorted(item_ids - set(self.menu_items))
+        if missing:
+            raise ValidationError(f"Menu items do not exist: {', '.join(map(str, missing))}.")
+        return value
+
+
+class PricedLineSerializer(serializers.Serializer):
+    """
+    Serializer for a priced order line.
+    """
+    item_id = serializers.IntegerField()
+    amount = serializers.IntegerField()
+    line_total = serializers.FloatField()
+    discount = serializers.FloatField()
+    promotion_id = serializers.IntegerField(allow_null=True, help_text="Promotion giving the discount.")
+
+
+class OrderPreviewResultSerializer(serializers.Serializer):
+    """
+    Serializer for the price of an order with the active promotions applied.
+    """
+    order_items = PricedLineSerializer(many=True)
+    subtotal = serializers.FloatField()
+    discount = serializers.FloatField()
+    total = serializers.FloatField()
+
+
+class PromotionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the Promotion model.
+    """
+    items = serializers.PrimaryKeyRelatedField(queryset=MenuItem.objects.all(), many=True, required=False)
+
+    class Meta:
+        model = Promotion
+        fields = ['id', 'name', 'active', 'percent_off', 'item_type', 'items', 'combo', 'min_quantity',
+                  'valid_from', 'valid_until', 'daily_start', 'daily_end']
+
+    def validate(self, attrs):
+        """
+        Check that the validity range is not empty, that the daily window has
+        both ends and that a combo lists its menu items.
+        """
+        def value(field):
+            return attrs.get(field, getattr(self.instance, field, None))
+
+        if value('valid_from') and value('valid_until') and value('valid_until') <= value('valid_from'):
+            raise ValidationError("The promotion must end after it starts.")
+        if (value('daily_start') is None) != (value('daily_end') is None):
+            raise ValidationError("The daily window needs both a start and an end.")
+        items = attrs['items'] if 'items' in attrs else (self.instance.items.all() if self.instance else [])
+        if value('combo') and not items:
+            raise ValidationError("A combo must list its menu items.")
+        return attrs
+
+
+class OrderTransitionSerializer(serializers.Serializer):
+    """
+    Serializer for validating a bulk order status transition.
+    """
+    MAX_BATCH_SIZE = 1000
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False,
+                                max_length=MAX_BATCH_SIZE)
+    status = serializers.ChoiceField(choices=Order.STATUSES)
+
+
+class OrderTransitionResultSerializer(serializers.Serializer):
+    """
+    Serializer for the outcome of a bulk order status transition.
+    """
+    status = serializers.CharField()
+    moved = serializers.ListField(child=serializers.IntegerField(),
+                                  help_text="Orders that moved to the status.")
+    skipped = serializers.ListField(child=serializers.IntegerField(),
+                                    help_text="Orders that do not exist or cannot move to the status.")
+
+
+class SalesQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the date range of a sales report. Defaults to the last seven days.
+    """
+    MAX_DAYS = 366
+    DEFAULT_DAYS = 7
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        """
+        Fill in the default range and check that it is not empty or too long.
+        """
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=self.DEFAULT_DAYS - 1))
+        if attrs['end'] < attrs['start']:
+            raise ValidationError("The end of the range cannot be before its start.")
+        if (attrs['end'] - attrs['start']).days >= self.MAX_DAYS:
+            raise ValidationError(f"The range cannot be longer than {self.MAX_DAYS} days.")
+        return attrs
+
+
+class TopItemsQuerySerializer(SalesQuerySerializer):
+    """
+    Serializer for validating the query parameters of the top items report.
+    """
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class DailySalesSerializer(serializers.Serializer):
+    """
+    Serializer for the total sales of one day.
+    """
+    day = serializers.DateField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.FloatField()
+
+
+class TopItemSerializer(serializers.Serializer):
+    """
+    Serializer for the sales of one menu item over a date range.
+    """
+    item_id = serializers.IntegerField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.FloatField()
+
+
+class KitchenBatchSerializer(serializers.Serializer):
+    """
+    Serializer for portions of one menu item prepared together at a station.
+    """
+    item_id = serializers.IntegerField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    orders = serializers.ListField(child=serializers.IntegerField())
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class KitchenStationSerializer(serializers.Serializer):
+    """
+    Serializer for the queue of batches of one kitchen station.
+    """
+    station = serializers.CharField()
+    batches = KitchenBatchSerializer(many=True)
+
+
+class KitchenOrderSerializer(serializers.Serializer):
+    """
+    Serializer for the predicted ready time of an open order.
+    """
+    order = serializers.IntegerField()
+    ready_at = serializers.DateTimeField()
+
+
+class KitchenPlanSerializer(serializers.Serializer):
+    """
+    Serializer for the kitchen work plan of the open orders.
+    """
+    stations = KitchenStationSerializer(many=True)
+    orders = KitchenOrderSerializer(many=True)
+
+
+class KitchenBatchQuerySerializer(serializers.Serializer):
+    """
+    Serializer for validating the query parameters of the outstanding item quantities.
+    """
+    status = serializers.ChoiceField(choices=Order.STATUSES, default="preparing")
+
+
+class KitchenItemSerializer(serializers.Serializer):
+    """
+    Serializer for the outstanding quantity of one menu item over the orders in a status.
+    """
+    item_id = serializers.IntegerField()
+    name = serializers.CharField()
+    type = serializers.CharField()
+    station = serializers.CharField()
+    quantity = serializers.IntegerField()
+    orders = serializers.IntegerField(help_text="Number of orders containing the item.")
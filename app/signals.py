@@ -0,0 +1,260 @@
+"""
+Signal handlers for the application.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from app import assignment, counters, inventory, kitchen, promotions, recommendations, sales, slots
+from app.events import publish_on_commit
+from app.models import MenuItem, Order, OrderItem, Promotion, Reservation, Table
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keeps the slot bitmaps in sync with a created or updated reservation.
+    """
+    previous = None if created else slots.interval_of(getattr(instance, "loaded_values", {}))
+    current = (instance.table_id, instance.date_and_time, instance.end_time)
+    if previous != current:
+        if previous is not None:
+            slots.rebuild(previous[0], slots.slot_masks(previous[1], previous[2]).keys())
+        slots.mark(*current)
+    instance.loaded_values = {"table_id": current[0], "date_and_time": current[1], "end_time": current[2]}
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Frees the slots of a deleted reservation. Slots in the past cannot be
+    booked anymore, so reservations that already ended (e.g. archived ones)
+    are left in the bitmaps as history. Reservations deleted with their
+    table need nothing, as its bitmaps go with it.
+    """
+    origin = kwargs.get("origin", instance)
+    if instance.end_time <= timezone.now() or getattr(origin, "model", type(origin)) is Table:
+        return
+    slots.rebuild(instance.table_id, slots.slot_masks(instance.date_and_time, instance.end_time).keys())
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def table_changed(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidates the capacity index used for automatic table assignment.
+    """
+    assignment.invalidate_index()
+
+
+@receiver(post_save, sender=Order)
+def order_sales_changed(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Adds or removes the lines of an order in the sales rollup when it moves
+    into or out of a counted status.
+    """
+    if created or counters.is_paused():
+        return
+    previous = getattr(instance, "loaded_status", instance.status)
+    if sales.is_counted(previous) != sales.is_counted(instance.status):
+        sales.record_orders([instance.id], 1 if sales.is_counted(instance.status) else -1)
+
+
+@receiver(post_save, sender=Order)
+def order_stock_changed(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Returns the portions of a cancelled order to stock.
+    """
+    previous = getattr(instance, "loaded_status", instance.status)
+    if not created and previous != "cancelled" and instance.status == "cancelled":
+        inventory.give_back(inventory.order_amounts([instance.id]))
+
+
+@receiver(pre_delete, sender=Order)
+def order_stock_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Returns the portions of a deleted order to stock, unless it was cancelled and they already went back.
+    """
+    if not counters.is_paused() and instance.status != "cancelled":
+        inventory.give_back(inventory.order_amounts([instance.id]))
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_stock_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Returns the portions of a deleted order line to stock. Lines deleted with
+    their order are returned by order_stock_deleted, and those replaced by
+    OrderSerializer.update while counters are paused are returned there.
+    """
+    if counters.is_paused() or not isinstance(kwargs.get("origin", instance), OrderItem):
+        return
+    status = Order.objects.filter(id=instance.order_id).values_list("status", flat=True).first()
+    if status not in (None, "cancelled"):
+        inventory.give_back({instance.item_id: instance.amount})
+
+
+@receiver(post_save, sender=Order)
+def order_kitchen_changed(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Replans an order in the kitchen plan when it arrives or moves into or out
+    of the open statuses.
+    """
+    previous = getattr(instance, "loaded_status", instance.status)
+    if created or (previous in Order.OPEN_STATUSES) != (instance.status in Order.OPEN_STATUSES):
+        kitchen.orders_changed_on_commit([instance.id])
+
+
+@receiver(post_delete, sender=Order)
+def order_kitchen_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Takes a deleted order out of the kitchen plan.
+    """
+    transaction.on_commit(lambda: kitchen.orders_closed([instance.id]))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=MenuItem)
+def kitchen_batches_changed(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drops the cached outstanding item quantities once the change has committed.
+    """
+    transaction.on_commit(kitchen.invalidate_batches)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_kitchen_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Replans an order in the kitchen plan when one of its lines changes.
+    """
+    if isinstance(kwargs.get("origin", instance), OrderItem):
+        kitchen.orders_changed_on_commit([instance.order_id])
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_counters_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Applies the difference of a created or updated order line to the sales
+    rollup and the co-occurrence counts.
+    """
+    current = (instance.order_id, instance.item_id, instance.amount, instance.price)
+    previous = None if created else getattr(instance, "loaded_values", None)
+    previous = previous and (previous["order_id"], previous["item_id"], previous["amount"], previous.get("price"))
+    if previous != current and not counters.is_paused():
+        lines = [current] if previous is None else [(*previous[:2], -previous[2], previous[3]), current]
+        sales.record_lines(lines)
+        if previous is None:
+            recommendations.record_line_change(current[0], added=current[1])
+        elif previous[0] == current[0] and previous[1] != current[1]:
+            recommendations.record_line_change(current[0], removed=previous[1], added=current[1])
+        elif previous[0] != current[0]:
+            recommendations.record_line_change(previous[0], removed=previous[1])
+            recommendations.record_line_change(current[0], added=current[1])
+    instance.loaded_values = {"order_id": current[0], "item_id": current[1], "amount": current[2],
+                              "price": current[3]}
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_counters_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Removes a deleted order line from the sales rollup and the co-occurrence
+    counts. Lines deleted along with their menu item need nothing, as its
+    counter rows go with it.
+    """
+    origin = kwargs.get("origin", instance)
+    if counters.is_paused() or getattr(origin, "model", type(origin)) is MenuItem:
+        return
+    sales.record_lines([(instance.order_id, instance.item_id, -instance.amount, instance.price)])
+    if isinstance(origin, OrderItem):
+        # Lines deleted with their order are removed from the co-occurrence
+        # counts as a whole by order_deleted
+        recommendations.record_line_change(instance.order_id, removed=instance.item_id)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_discounts_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Prices the order of a saved or deleted line again, since the promotions
+    apply to the whole order. Lines replaced or deleted along with their
+    order or menu item need nothing.
+    """
+    origin = kwargs.get("origin", instance)
+    if counters.is_paused() or not isinstance(origin, OrderItem):
+        return
+    order = Order.objects.filter(id=instance.order_id).first()
+    if order is not None:
+        promotions.store_discounts(order)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Removes the items of an order that is about to be deleted from the co-occurrence counts.
+    """
+    if counters.is_paused():
+        return
+    recommendations.record_change(instance.order_items.order_by().values_list("item_id", flat=True), [])
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def menu_item_changed(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drops the cached recommendations, which include item names, and the
+    kitchen plan, which depends on prep times and stations.
+    """
+    recommendations.invalidate()
+    kitchen.invalidate_plan()
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.items.through)
+def promotion_changed(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drops the compiled promotions when a promotion or its menu items change.
+    """
+    promotions.invalidate()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Publishes new orders and status changes to the kitchen feed.
+    """
+    previous = None if created else getattr(instance, "loaded_status", None)
+    if created:
+        event_type = "order.created"
+    elif previous != instance.status:
+        event_type = "order.status_changed"
+    else:
+        return
+    publish_on_commit({"type": event_type, "order": instance.id, "user": instance.user_id,
+                       "status": instance.status, "previous_status": previous})
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Publishes changes to the lines of an order to the kitchen feed.
+    """
+    if not isinstance(kwargs.get("origin", instance), OrderItem):
+        # Lines deleted along with their order (e.g. when archiving)
+        return
+    status = Order.objects.filter(id=instance.order_id).values_list("status", flat=True).first()
+    publish_on_commit({"type": "order.items_changed", "order": instance.order_id, "status": status})
+
+
+@receiver(post_save, sender=Order)
+def order_snapshot_refreshed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Stores the saved status for the next save's handlers. Connected after
+    every other handler that compares the status with the stored one.
+    """
+    instance.loaded_status = instance.status
@@ -0,0 +1,204 @@
+"""
+Materialized per-table slot bitmaps.
+
+Each TableSlotBitmap row holds one bit per 15-minute slot of a day. Adding a
+reservation ORs its slots into the bitmaps of the days it touches. Removing or
+moving one rebuilds only the affected days, since a slot may still be partially
+covered by another reservation.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from app import recurrence
+from app.models import Reservation, TableSlotBitmap
+
+SLOT = TableSlotBitmap.SLOT
+SLOTS_PER_DAY = TableSlotBitmap.SLOTS_PER_DAY
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def day_start(day):
+    """
+    Returns the aware datetime at which a day begins.
+
+    Args:
+        day (date): The day.
+
+    Returns:
+        datetime: Midnight of the day in the current time zone.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def slot_masks(start_time, end_time):
+    """
+    Splits an interval into per-day masks of the slots it overlaps.
+
+    Args:
+        start_time (datetime): Start of the interval.
+        end_time (datetime): End of the interval (exclusive).
+
+    Returns:
+        dict[date, int]: Slot mask per day.
+    """
+    masks = {}
+    if end_time <= start_time:
+        return masks
+    if timezone.is_naive(start_time):
+        start_time, end_time = timezone.make_aware(start_time), timezone.make_aware(end_time)
+    day = timezone.localtime(start_time).date()
+    while True:
+        begin = day_start(day)
+        if begin >= end_time:
+            break
+        first = max(0, (start_time - begin) // SLOT)
+        # Ceiling division, so that a partially covered slot counts as occupied
+        last = min(SLOTS_PER_DAY, -((begin - end_time) // SLOT))
+        if last > first:
+            masks[day] = ((1 << last) - 1) ^ ((1 << first) - 1)
+        day += timedelta(days=1)
+    return masks
+
+
+def is_aligned(start_time, end_time):
+    """
+    Checks whether both ends of an interval fall on slot boundaries.
+
+    Args:
+        start_time (datetime): Start of the interval.
+        end_time (datetime): End of the interval.
+
+    Returns:
+        bool: True if the interval is made up of whole slots.
+    """
+    begin = day_start(timezone.localtime(start_time).date())
+    return (start_time - begin) % SLOT == timedelta(0) and (end_time - begin) % SLOT == timedelta(0)
+
+
+def mark(table_id, start_time, end_time):
+    """
+    Sets the slots of an interval as occupied.
+
+    Args:
+        table_id (int): The table that was reserved.
+        start_time (datetime): Start of the reservation.
+        end_time (datetime): End of the reservation.
+    """
+    with transaction.atomic():
+        for day, mask in slot_masks(start_time, end_time).items():
+            bitmap, _ = TableSlotBitmap.objects.select_for_update().get_or_create(table_id=table_id, day=day)
+            bitmap.bits |= mask
+            bitmap.save(update_fields=["slots"])
+
+
+def mark_many(intervals):
+    """
+    Sets the slots of many intervals as occupied with one read and bulk writes,
+    for imports that bypass the per-row signal handlers.
+
+    Args:
+        intervals (Iterable[tuple[int, datetime, datetime]]): (table id, start, end) triples.
+    """
+    masks = {}
+    for table_id, start_time, end_time in intervals:
+        for day, mask in slot_masks(start_time, end_time).items():
+            masks[(table_id, day)] = masks.get((table_id, day), 0) | mask
+    if not masks:
+        return
+
+    with transaction.atomic():
+        table_ids = {table_id for table_id, _ in masks}
+        days = {day for _, day in masks}
+        existing = {
+            (bitmap.table_id, bitmap.day): bitmap
+            for bitmap in TableSlotBitmap.objects.select_for_update().filter(table_id__in=table_ids, day__in=days)
+        }
+        new_bitmaps = []
+        for key, mask in masks.items():
+            bitmap = existing.get(key)
+            if bitmap is None:
+                bitmap = TableSlotBitmap(table_id=key[0], day=key[1])
+                new_bitmaps.append(bitmap)
+                bitmap.bits = mask
+            else:
+                bitmap.bits |= mask
+        TableSlotBitmap.objects.bulk_update(
+            [bitmap for key, bitmap in existing.items() if key in masks], ["slots"], batch_size=500
+        )
+        TableSlotBitmap.objects.bulk_create(new_bitmaps, batch_size=500)
+
+
+def rebuild(table_id, days):
+    """
+    Recomputes the bitmaps of a table for the given days from its reservations.
+
+    Args:
+        table_id (int): The table to rebuild bitmaps for.
+        days (Iterable[date]): The days to rebuild.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+    window_start = day_start(days[0])
+    window_end = day_start(days[-1] + timedelta(days=1))
+    bits = {day: 0 for day in days}
+    intervals = Reservation.objects.filter(
+        table_id=table_id, date_and_time__lt=window_end, end_time__gt=window_start
+    ).values_list("date_and_time", "end_time")
+    for start_time, end_time in intervals:
+        for day, mask in slot_masks(start_time, end_time).items():
+            if day in bits:
+                bits[day] |= mask
+
+    with transaction.atomic():
+        existing = {bitmap.day: bitmap for bitmap in TableSlotBitmap.objects.select_for_update()
+                    .filter(table_id=table_id, day__in=days)}
+        for day, value in bits.items():
+            if day in existing:
+                existing[day].bits = value
+                existing[day].save(update_fields=["slots"])
+            elif value:
+                # A missing bitmap is a free day, so only occupied days need a new row
+                TableSlotBitmap.objects.create(table_id=table_id, day=day, bits=value)
+
+
+def day_grid(table_ids, day):
+    """
+    Returns the occupied slots of every table on a day.
+
+    Args:
+        table_ids (Iterable[int]): Tables to include.
+        day (date): The day.
+
+    Returns:
+        dict[int, int]: Slot bits per table id; tables without a bitmap are free.
+    """
+    grid = {table_id: 0 for table_id in table_ids}
+    rows = TableSlotBitmap.objects.filter(table_id__in=grid.keys(), day=day).values_list("table_id", "slots")
+    for table_id, slots in rows:
+        grid[table_id] = int.from_bytes(slots, "little")
+
+    # Later occurrences of recurring reservations are not materialized in the bitmaps
+    begin, end = day_start(day), day_start(day + timedelta(days=1))
+    for series, start_time, end_time in recurrence.expand(recurrence.load_series(grid.keys(), begin, end),
+                                                         begin, end):
+        grid[series.table_id] |= slot_masks(start_time, end_time).get(day, 0)
+    return grid
+
+
+def interval_of(values):
+    """
+    Extracts the (table_id, start, end) of a reservation from stored field values.
+
+    Args:
+        values (dict): Field values as loaded from the database.
+
+    Returns:
+        tuple: The table id and interval, or None if the values are incomplete.
+    """
+    try:
+        return values["table_id"], values["date_and_time"], values["end_time"]
+    except KeyError:
+        return None
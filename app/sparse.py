@@ -0,0 +1,111 @@
+"""
+Sparse fieldsets for read requests.
+
+A client may list the fields it needs with ?fields=id,name,price, or the
+ones it does not with ?omit=description; both may be combined. The
+serializer drops the other fields, and the ViewSet loads only the columns
+the remaining fields read, with .only() on the serializer path or through
+the narrower values_list() of the fast path. Only the top level fields of
+a resource can be selected; nested ones are returned whole.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def is_sparse(request):
+    """
+    Returns whether a request narrows the fields of its response.
+    """
+    return request.method in SAFE_METHODS and (FIELDS_PARAM in request.query_params
+                                               or OMIT_PARAM in request.query_params)
+
+
+def field_list(request, param):
+    """
+    Returns the comma-separated field names of a query parameter, or None when it is not given.
+    """
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def selected_fields(request, available):
+    """
+    Returns the names of the fields a read request asks for, in serializer order.
+
+    Args:
+        request (Request): The request.
+        available (Iterable[str]): Names of all fields of the serializer.
+
+    Returns:
+        list[str]: The selected names, or None when the request does not narrow the fields.
+
+    Raises:
+        ValidationError: If a parameter names an unknown field.
+    """
+    available = list(available)
+    fields, omit = field_list(request, FIELDS_PARAM), field_list(request, OMIT_PARAM)
+    if fields is None and omit is None:
+        return None
+    errors = {}
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = sorted(set(names or []) - set(available))
+        if unknown:
+            errors[param] = [f"Unknown fields: {', '.join(unknown)}."]
+    if errors:
+        raise ValidationError(errors)
+    return [name for name in available if (fields is None or name in fields) and name not in (omit or [])]
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin dropping the fields a read request does not select.
+    Write requests always use every field.
+    """
+    # Model columns read by fields that are not model fields themselves, e.g. method fields
+    sparse_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or not is_sparse(request):
+            return
+        names = selected_fields(request, self.fields)
+        for name in [name for name in self.fields if name not in names]:
+            self.fields.pop(name)
+
+    def only_columns(self):
+        """
+        Returns the model fields the selected serializer fields read, for .only().
+        Reverse relations and annotations need no columns of their own.
+
+        Returns:
+            list[str]: Model field names, or None when a field reads the whole instance.
+        """
+        concrete = {field.name for field in self.Meta.model._meta.concrete_fields}
+        columns = set()
+        for name, field in self.fields.items():
+            if name in self.sparse_columns:
+                columns.update(self.sparse_columns[name])
+            elif field.source == '*':
+                return None
+            elif field.source_attrs[0] in concrete:
+                columns.add(field.source_attrs[0])
+        return sorted(columns)
+
+
+class SparseQuerysetMixin:
+    """
+    ViewSet mixin loading only the columns of the selected fields in the list and retrieve actions.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve') or not is_sparse(self.request):
+            return queryset
+        columns = self.get_serializer().only_columns()
+        return queryset if columns is None else queryset.only(*columns)
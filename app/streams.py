@@ -0,0 +1,104 @@
+"""
+Server-sent events feed of order changes for the kitchen displays.
+
+This is a plain ASGI application, mounted by burgir/asgi.py next to Django,
+so that a long-lived connection does not hold a request thread. As it skips
+Django's middleware, it runs the CORS middleware itself for its headers.
+"""
+import asyncio
+import io
+import json
+from urllib.parse import parse_qs
+
+from corsheaders.middleware import CorsMiddleware
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+
+from app.events import broker
+
+ORDER_STREAM_PATH = "/api/kitchen/orders/stream/"
+KEEPALIVE_SECONDS = 15
+
+
+def parse_statuses(query_string):
+    """
+    Reads the status filter from a query string, e.g. ?status=preparing,ready or
+    ?status=preparing&status=ready.
+
+    Args:
+        query_string (bytes): The raw query string.
+
+    Returns:
+        set[str]: The statuses, or None when not filtered.
+    """
+    values = parse_qs(query_string.decode("latin-1")).get("status", [])
+    statuses = {status.strip() for value in values for status in value.split(",") if status.strip()}
+    return statuses or None
+
+
+def format_event(event):
+    """
+    Formats an event as a server-sent event message.
+    """
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+def cors_headers(scope):
+    """
+    Runs a request through the CORS middleware the API uses, with the same settings.
+
+    Args:
+        scope (dict): The ASGI connection scope.
+
+    Returns:
+        list[tuple[bytes, bytes]]: The CORS headers of the response, or of the answer to a preflight request.
+    """
+    response = CorsMiddleware(lambda request: HttpResponse())(ASGIRequest(scope, io.BytesIO()))
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response.items()
+            if name.lower().startswith("access-control-") or name.lower() == "vary"]
+
+
+async def order_stream(scope, receive, send):
+    """
+    ASGI application streaming order events, optionally filtered by status.
+    """
+    headers = cors_headers(scope)
+    if scope["method"] != "GET":
+        status = 200 if scope["method"] == "OPTIONS" else 405
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"allow", b"GET, OPTIONS")] + headers})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    subscription = broker.subscribe(parse_statuses(scope.get("query_string", b"")))
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")] + headers,
+    })
+    await send({"type": "http.response.body", "body": b": connected\n\n", "more_body": True})
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while not disconnected.done():
+            next_event = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, timeout=KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if next_event in done:
+                await send({"type": "http.response.body", "body": format_event(next_event.result()),
+                            "more_body": True})
+            else:
+                next_event.cancel()
+                if not done:
+                    await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+    finally:
+        broker.unsubscribe(subscription)
+        disconnected.cancel()
+
+
+async def wait_for_disconnect(receive):
+    """
+    Returns once the client has disconnected.
+    """
+    while (await receive())["type"] != "http.disconnect":
+        pass
@@ -0,0 +1,84 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.archive import archive_chunk
+from app.models import (User, Table, Reservation, MenuItem, Order, OrderItem, ArchivedReservation,
+                        ArchivedOrder, ArchivedOrderItem)
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.table = Table.objects.create(min_people=2, max_people=6)
+        self.menu_item = MenuItem.objects.create(name="Pizza", description="Delicious pizza", price=10.0)
+        now = timezone.now()
+        self.old_reservation = Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=2, date_and_time=now - timedelta(days=200),
+            duration=timedelta(hours=1)
+        )
+        self.new_reservation = Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=2, date_and_time=now - timedelta(days=1),
+            duration=timedelta(hours=1)
+        )
+        self.old_order = Order.objects.create(user=self.user, status="served", created_at=now - timedelta(days=200))
+        self.old_item = OrderItem.objects.create(order=self.old_order, item=self.menu_item, amount=2)
+        self.open_order = Order.objects.create(user=self.user, status="preparing",
+                                               created_at=now - timedelta(days=200))
+        self.ready_order = Order.objects.create(user=self.user, status="ready", created_at=now - timedelta(days=200))
+
+    def test_archive_chunk(self):
+        # Test case for moving only finished rows older than the retention window
+        self.assertEqual(archive_chunk(timedelta(days=90), chunk_size=10), (1, 1))
+        self.assertEqual(list(Reservation.objects.values_list('id', flat=True)), [self.new_reservation.id])
+        # Ready orders are yet to be served
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [self.open_order.id, self.ready_order.id])
+        self.assertEqual(ArchivedReservation.objects.get().id, self.old_reservation.id)
+        self.assertEqual(ArchivedOrder.objects.get().id, self.old_order.id)
+        self.assertEqual(ArchivedOrderItem.objects.get().id, self.old_item.id)
+        self.assertEqual(archive_chunk(timedelta(days=90), chunk_size=10), (0, 0))
+
+    def test_archive_command(self):
+        # Test case for the archive management command
+        out = StringIO()
+        call_command("archive", "--retention-days=90", "--chunk-size=1", stdout=out)
+        self.assertIn("Archived 1 reservations and 1 orders.", out.getvalue())
+
+    def test_user_reservations_include_archived(self):
+        # Test case for returning archived rows only on explicit request
+        archive_chunk(timedelta(days=90))
+        url = reverse('user-detail', args=[self.user.id])
+        response = self.client.get(f"{url}reservations/")
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.new_reservation.id])
+        response = self.client.get(f"{url}reservations/", {"include_archived": "true"})
+        self.assertEqual([row['id'] for row in response.json()['results']],
+                         [self.old_reservation.id, self.new_reservation.id])
+
+        response = self.client.get(f"{url}orders/", {"include_archived": "true"})
+        self.assertEqual(response.json()['results'][0],
+                         {"id": self.old_order.id, "status": "served", "user_id": self.user.id,
+                          "order_items": [{"id": self.old_item.id, "item_id": self.menu_item.id, "amount": 2,
+                                           "line_total": 20.0}],
+                          "discount": 0.0, "total": 20.0, "item_count": 2})
+
+    def test_retrieve_archived(self):
+        # Test case for retrieving archived rows by id, read-only
+        archive_chunk(timedelta(days=90))
+        response = self.client.get(reverse('order-detail', args=[self.old_order.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['id'], response.json()['total']), (self.old_order.id, 20.0))
+        response = self.client.get(reverse('reservation-detail', args=[self.old_reservation.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.old_reservation.id)
+        response = self.client.get(reverse('reservation-detail', args=[self.old_reservation.id]), {"fields": "id"})
+        self.assertEqual(response.json(), {"id": self.old_reservation.id})
+
+        response = self.client.patch(reverse('order-detail', args=[self.old_order.id]), {"status": "pending"},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(reverse('order-detail', args=[999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('reservation-detail', args=["abc"])).status_code, 404)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase
+
+from app import assignment, versions
+from app.models import User, Table, Reservation
+
+
+class AssignmentTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.small = Table.objects.create(min_people=1, max_people=2)
+        self.medium_a = Table.objects.create(min_people=2, max_people=4)
+        self.medium_b = Table.objects.create(min_people=2, max_people=4)
+        self.large = Table.objects.create(min_people=2, max_people=8)
+        self.start = datetime(2030, 5, 20, 18, 0, tzinfo=timezone.utc)
+
+    def test_capacity_index_candidates(self):
+        # Test case for bucketing tables by capacity, smallest first
+        index = assignment.CapacityIndex([(1, 1, 2), (2, 2, 4), (3, 2, 4), (4, 4, 8)])
+        self.assertEqual(list(index.candidates(4)), [[2, 3], [4]])
+        self.assertEqual(list(index.candidates(3)), [[2, 3]])
+        self.assertEqual(list(index.candidates(1)), [[1]])
+        self.assertEqual(list(index.candidates(9)), [])
+
+    def test_free_runs(self):
+        # Test case for counting runs of free slots
+        self.assertEqual(assignment.free_runs(0), 1)
+        self.assertEqual(assignment.free_runs(0b1100), 2)
+
+    def test_assign_smallest_fitting_table(self):
+        # Test case for picking the smallest table that fits
+        table = assignment.assign_table(3, self.start, timedelta(hours=1))
+        self.assertEqual(table, self.medium_a)
+
+    def test_assign_least_fragmenting_table(self):
+        # Test case for breaking ties by fragmentation of the remaining day
+        Reservation.objects.create(user=self.user, table=self.medium_a, number_of_people=3,
+                                   date_and_time=self.start - timedelta(hours=3), duration=timedelta(hours=1))
+        Reservation.objects.create(user=self.user, table=self.medium_b, number_of_people=3,
+                                   date_and_time=self.start - timedelta(hours=1), duration=timedelta(hours=1))
+        table = assignment.assign_table(3, self.start, timedelta(hours=1))
+        self.assertEqual(table, self.medium_b)
+
+    def test_assign_skips_busy_tables(self):
+        # Test case for moving on to a larger table when the fitting ones are taken
+        for table in (self.medium_a, self.medium_b):
+            Reservation.objects.create(user=self.user, table=table, number_of_people=3,
+                                       date_and_time=self.start - timedelta(minutes=10), duration=timedelta(hours=1))
+        self.assertEqual(assignment.assign_table(3, self.start, timedelta(hours=1)), self.large)
+
+    def test_assign_bounded_queries(self):
+        # Test case for answering in a fixed number of queries
+        # Tables version, index, bitmaps, recurring reservations and the chosen table
+        assignment.invalidate_index()
+        with self.assertNumQueries(5):
+            assignment.assign_table(3, self.start, timedelta(hours=1))
+        Table.objects.bulk_create([Table(min_people=2, max_people=4) for _ in range(50)])
+        assignment.invalidate_index()
+        with self.assertNumQueries(5):
+            assignment.assign_table(3, self.start, timedelta(hours=1))
+
+    def test_stale_index(self):
+        # Test case for tables changed by another process, which this process' index does not know about
+        assignment.invalidate_index()
+        assignment.get_index()
+        Table.objects.filter(id=self.medium_a.id).update(max_people=2)
+        self.assertEqual(assignment.assign_table(3, self.start, timedelta(hours=1)), self.medium_b)
+        added = Table.objects.bulk_create([Table(min_people=3, max_people=3)])[0]
+        versions.bump(assignment.VERSION_NAME)
+        self.assertEqual(assignment.assign_table(3, self.start, timedelta(hours=1)), self.medium_b)
+        assignment._index.checked -= versions.CHECK_SECONDS  # pylint: disable=protected-access
+        self.assertEqual(assignment.assign_table(3, self.start, timedelta(hours=1)), added)
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+from django.test import TestCase
+
+from app.events import Broker, broker
+from app.models import User, MenuItem, Order, OrderItem
+from app.streams import ORDER_STREAM_PATH, cors_headers, order_stream, parse_statuses
+
+
+class EventsTest(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.user = User.objects.create(name="Test User")
+        self.menu_item = MenuItem.objects.create(name="Pizza", description="Delicious pizza", price=10.0)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def drain(self, subscription):
+        """Runs the loop until the published events are delivered and returns them."""
+        self.loop.run_until_complete(asyncio.sleep(0))
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    def test_broker_filters_by_status(self):
+        # Test case for delivering events only to subscriptions whose status filter matches
+        test_broker = Broker()
+        everything = test_broker.subscribe(loop=self.loop)
+        ready = test_broker.subscribe(["ready"], loop=self.loop)
+        test_broker.publish({"type": "order.created", "order": 1, "status": "preparing"})
+        test_broker.publish({"type": "order.status_changed", "order": 1, "status": "ready",
+                             "previous_status": "preparing"})
+        self.assertEqual(len(self.drain(everything)), 2)
+        self.assertEqual([event["status"] for event in self.drain(ready)], ["ready"])
+        test_broker.unsubscribe(ready)
+        test_broker.publish({"type": "order.created", "order": 2, "status": "ready"})
+        self.assertEqual(self.drain(ready), [])
+
+    def test_broker_drops_oldest_when_full(self):
+        # Test case for keeping only the newest events for a slow subscriber
+        test_broker = Broker()
+        subscription = test_broker.subscribe(loop=self.loop)
+        for order in range(subscription.queue.maxsize + 5):
+            test_broker.publish({"type": "order.created", "order": order, "status": "preparing"})
+        events = self.drain(subscription)
+        self.assertEqual(len(events), subscription.queue.maxsize)
+        self.assertEqual(events[0]["order"], 5)
+
+    def test_order_signals(self):
+        # Test case for publishing order changes after the transaction commits
+        subscription = broker.subscribe(loop=self.loop)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                order = Order.objects.create(user=self.user, status="preparing")
+            with self.captureOnCommitCallbacks(execute=True):
+                OrderItem.objects.create(order=order, item=self.menu_item, amount=2)
+            order = Order.objects.get(id=order.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                order.save()
+                order.status = "ready"
+                order.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                order.delete()
+            events = self.drain(subscription)
+        finally:
+            broker.unsubscribe(subscription)
+        self.assertEqual([(event["type"], event["status"]) for event in events], [
+            ("order.created", "preparing"),
+            ("order.items_changed", "preparing"),
+            ("order.status_changed", "ready"),
+        ])
+        self.assertEqual(events[2]["previous_status"], "preparing")
+
+    def test_parse_statuses(self):
+        # Test case for reading the status filter from the query string
+        self.assertIsNone(parse_statuses(b""))
+        self.assertEqual(parse_statuses(b"status=preparing,ready&status=served"), {"preparing", "ready", "served"})
+
+    def test_order_stream(self):
+        # Test case for streaming matching events until the client disconnects
+        sent = []
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message.get("body", b"").startswith(b"event:"):
+                disconnect.set()
+
+        async def run():
+            scope = {"type": "http", "method": "GET", "path": ORDER_STREAM_PATH, "query_string": b"status=ready",
+                     "headers": [(b"origin", b"https://burgirsclient.2.rahtiapp.fi")]}
+            stream = asyncio.ensure_future(order_stream(scope, receive, send))
+            await asyncio.sleep(0)
+            broker.publish({"type": "order.created", "order": 1, "status": "preparing"})
+            broker.publish({"type": "order.status_changed", "order": 1, "status": "ready",
+                            "previous_status": "preparing"})
+            await asyncio.wait_for(stream, 1)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), sent[0]["headers"])
+        self.assertIn((b"access-control-allow-origin", b"https://burgirsclient.2.rahtiapp.fi"), sent[0]["headers"])
+        events = [message["body"] for message in sent[1:] if message["body"].startswith(b"event:")]
+        self.assertEqual(len(events), 1)
+        name, data = events[0].decode().strip().split("\n")
+        self.assertEqual(name, "event: order.status_changed")
+        self.assertEqual(json.loads(data.removeprefix("data: "))["status"], "ready")
+
+    def test_order_stream_cors(self):
+        # Test case for answering preflight requests and leaving out origins the API does not allow
+        scope = {"type": "http", "method": "OPTIONS", "path": ORDER_STREAM_PATH, "query_string": b"",
+                 "headers": [(b"origin", b"https://burgirsclient.2.rahtiapp.fi"),
+                             (b"access-control-request-method", b"GET")]}
+        headers = dict(cors_headers(scope))
+        self.assertEqual(headers[b"access-control-allow-origin"], b"https://burgirsclient.2.rahtiapp.fi")
+        self.assertIn(b"GET", headers[b"access-control-allow-methods"])
+        scope.update(method="GET", headers=[(b"origin", b"https://example.com")])
+        self.assertNotIn(b"access-control-allow-origin", dict(cors_headers(scope)))
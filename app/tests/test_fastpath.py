@@ -0,0 +1,72 @@
+import json
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from app import inventory
+from app.fastpath import converter_for
+from app.models import User, Table, Reservation, ReservationRecurrence, MenuItem
+from app.serializers import UserSerializer, TableSerializer, ReservationSerializer, MenuItemSerializer, \
+    OrderSerializer
+
+
+def rendered(data):
+    return json.loads(JSONRenderer().render(data))
+
+
+class FastPathParityTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.table = Table.objects.create(min_people=2, max_people=6)
+        start = timezone.now().replace(microsecond=123456) + timedelta(days=1)
+        self.reservations = [
+            Reservation.objects.create(user=self.user, table=self.table, number_of_people=2,
+                                       date_and_time=start + timedelta(days=day), duration=timedelta(minutes=90))
+            for day in range(3)
+        ]
+        ReservationRecurrence.objects.create(reservation=self.reservations[1], frequency="daily", interval=1)
+        ReservationRecurrence.objects.create(reservation=self.reservations[2], interval=2,
+                                             until=start + timedelta(days=60))
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", price=10.5,
+                                              prep_time=timedelta(minutes=7, seconds=30))
+        self.fries = MenuItem.objects.create(name="Fries", description="Crispy", type="side", price=3.0,
+                                             stock_shards=4)
+        inventory.set_stock(self.fries, 10)
+
+    def assertParity(self, url_name, serializer_class, queryset):
+        response = self.client.get(reverse(f"{url_name}-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], rendered(serializer_class(queryset[:5], many=True).data))
+        for instance in queryset[:5]:
+            response = self.client.get(reverse(f"{url_name}-detail", args=[instance.pk]))
+            self.assertEqual(response.json(), rendered(serializer_class(instance).data))
+
+    def test_users_and_tables(self):
+        # Test case for identical user and table output on the fast path
+        self.assertParity("user", UserSerializer, User.objects.all())
+        self.assertParity("table", TableSerializer, Table.objects.all())
+
+    def test_reservations(self):
+        # Test case for identical reservation output, with and without a nested recurrence
+        self.assertParity("reservation", ReservationSerializer, Reservation.objects.select_related('recurrence'))
+
+    def test_menu_items(self):
+        # Test case for identical menu item output, with tracked and untracked stock
+        self.assertParity("menuitem", MenuItemSerializer, MenuItem.objects.with_stock().order_by('name'))
+
+    def test_not_found(self):
+        # Test case for the same 404 response as the serializer path
+        for pk in (999, "abc"):
+            response = self.client.get(reverse("menuitem-detail", args=[pk]))
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), {"detail": "No MenuItem matches the given query."})
+
+    def test_compiled_once(self):
+        # Test case for compiling each serializer class once and rejecting unsupported fields
+        self.assertIs(converter_for(MenuItemSerializer), converter_for(MenuItemSerializer))
+        with self.assertRaises(ImproperlyConfigured):
+            converter_for(OrderSerializer)
@@ -0,0 +1,123 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from app import inventory
+from app.models import User, MenuItem, Order, OrderItem, StockShard
+
+
+class InventoryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", price=10.0, stock_shards=4)
+        inventory.set_stock(self.burger, 10)
+        self.fries = MenuItem.objects.create(name="Fries", description="Crispy", price=2.5)
+
+    def stock(self, item):
+        return inventory.stock_levels([item.id]).get(item.id, (0, None))[1]
+
+    def create_order(self, lines, status="pending"):
+        data = {"user_id": self.user.id, "status": status,
+                "order_items": [{"item_id": item.id, "amount": amount} for item, amount in lines]}
+        return self.client.post(reverse('order-list'), data, content_type="application/json")
+
+    def test_set_stock(self):
+        # Test case for splitting the stock over the counter rows and reading it back
+        self.assertEqual(list(StockShard.objects.filter(item=self.burger).values_list('quantity', flat=True)),
+                         [3, 3, 2, 2])
+        response = self.client.get(reverse('menuitem-detail', args=[self.burger.id]))
+        self.assertEqual(response.json()['stock'], 10)
+        response = self.client.get(reverse('menuitem-detail', args=[self.fries.id]))
+        self.assertIsNone(response.json()['stock'])
+
+        response = self.client.patch(reverse('menuitem-detail', args=[self.burger.id]), {"stock_shards": 2},
+                                     content_type="application/json")
+        self.assertEqual(response.json()['stock'], 10)
+        self.assertEqual(StockShard.objects.filter(item=self.burger).count(), 2)
+        response = self.client.post(reverse('menuitem-list'), {"name": "Cola", "description": "Cold", "price": 2.0,
+                                                               "stock": 24}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['stock'], 24)
+
+    def test_take_across_shards(self):
+        # Test case for taking more than any single counter row holds
+        inventory.take({self.burger.id: 5})
+        self.assertEqual(self.stock(self.burger), 5)
+        for _ in range(5):
+            inventory.take({self.burger.id: 1})
+        self.assertEqual(self.stock(self.burger), 0)
+        with self.assertRaises(inventory.InsufficientStock):
+            inventory.take({self.burger.id: 1})
+        self.assertFalse(StockShard.objects.filter(quantity__lt=0).exists())
+
+    def test_order_takes_stock(self):
+        # Test case for decrementing the stock on order creation and rejecting orders beyond it
+        response = self.create_order([(self.burger, 4), (self.fries, 100)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(self.burger), 6)
+
+        response = self.create_order([(self.burger, 7)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(self.burger), 6)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_order_changes_return_stock(self):
+        # Test case for moving stock when lines are replaced or changed and when orders are cancelled
+        first = self.create_order([(self.burger, 4)]).json()['id']
+        second = self.create_order([(self.burger, 2)]).json()['id']
+        response = self.client.patch(reverse('order-detail', args=[first]),
+                                     {"order_items": [{"item_id": self.burger.id, "amount": 8}]},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(self.burger), 0)
+        response = self.client.patch(reverse('order-detail', args=[first]),
+                                     {"order_items": [{"item_id": self.burger.id, "amount": 9}]},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(OrderItem.objects.get(order_id=first).amount, 8)
+
+        line = OrderItem.objects.get(order_id=second)
+        response = self.client.patch(reverse('orderitem-detail', args=[line.id]), {"amount": 1},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(self.burger), 1)
+
+        response = self.client.patch(reverse('order-detail', args=[first]), {"status": "cancelled"},
+                                     content_type="application/json")
+        self.assertEqual(self.stock(self.burger), 9)
+        self.client.post(reverse('order-transition'), {"ids": [second], "status": "cancelled"},
+                         content_type="application/json")
+        self.assertEqual(self.stock(self.burger), 10)
+
+    def test_order_item_create_takes_stock(self):
+        # Test case for taking stock for lines added on their own and rejecting those beyond it
+        order = self.create_order([(self.burger, 2)]).json()['id']
+        response = self.client.post(reverse('orderitem-list'),
+                                    {"order_id": order, "item_id": self.burger.id, "amount": 3},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(self.burger), 5)
+        response = self.client.post(reverse('orderitem-list'),
+                                    {"order_id": order, "item_id": self.burger.id, "amount": 6},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(self.burger), 5)
+        self.assertEqual(OrderItem.objects.filter(order_id=order).count(), 2)
+
+    def test_deletions_return_stock(self):
+        # Test case for returning the portions of deleted lines and orders, but not twice for cancelled ones
+        first = self.create_order([(self.burger, 2), (self.fries, 1)]).json()['id']
+        second = self.create_order([(self.burger, 3)]).json()['id']
+        third = self.create_order([(self.burger, 4)]).json()['id']
+        self.assertEqual(self.stock(self.burger), 1)
+        line = OrderItem.objects.get(order_id=first, item=self.burger)
+        response = self.client.delete(reverse('orderitem-detail', args=[line.id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.stock(self.burger), 3)
+        response = self.client.delete(reverse('order-detail', args=[second]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.stock(self.burger), 6)
+        self.client.patch(reverse('order-detail', args=[third]), {"status": "cancelled"},
+                          content_type="application/json")
+        self.assertEqual(self.stock(self.burger), 10)
+        self.client.delete(reverse('order-detail', args=[third]))
+        self.assertEqual(self.stock(self.burger), 10)
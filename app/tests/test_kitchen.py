@@ -0,0 +1,151 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app import kitchen
+from app.models import User, MenuItem, Order
+
+
+def line(order_id, item, amount):
+    return {"order_id": order_id, "item_id": item.id, "item__name": item.name, "item__station": item.station,
+            "item__prep_time": item.prep_time, "item__batch_size": item.batch_size, "amount": amount}
+
+
+def without_times(plan):
+    return [(station["station"], [(batch["item_id"], batch["quantity"], batch["orders"])
+                                  for batch in station["batches"]]) for station in plan["stations"]]
+
+
+class KitchenPlanTest(TestCase):
+    def setUp(self):
+        kitchen.invalidate_plan()
+        self.user = User.objects.create(name="Test User")
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", price=10.0, station="grill",
+                                              prep_time=timedelta(minutes=10))
+        self.fries = MenuItem.objects.create(name="Fries", description="Crispy", price=2.5, station="fryer",
+                                             prep_time=timedelta(minutes=3), batch_size=4)
+        self.now = timezone.now()
+
+    def tearDown(self):
+        kitchen.invalidate_plan()
+
+    def test_batches_across_orders(self):
+        # Test case for filling queued batches of the same item before starting new ones
+        plan = kitchen.KitchenPlan(self.now)
+        plan.add_order(1, [line(1, self.burger, 2), line(1, self.fries, 1)], self.now)
+        plan.add_order(2, [line(2, self.fries, 2)], self.now)
+        plan.add_order(3, [line(3, self.fries, 3)], self.now)
+        self.assertEqual(without_times(plan.as_dict()), [
+            ("fryer", [(self.fries.id, 4, [1, 2, 3]), (self.fries.id, 2, [3])]),
+            ("grill", [(self.burger.id, 1, [1]), (self.burger.id, 1, [1])]),
+        ])
+        self.assertEqual(plan.ready_times(), {1: self.now + timedelta(minutes=20),
+                                              2: self.now + timedelta(minutes=3),
+                                              3: self.now + timedelta(minutes=6)})
+
+        plan.remove_order(3)
+        self.assertEqual(without_times(plan.as_dict())[0], ("fryer", [(self.fries.id, 3, [1, 2])]))
+        plan.remove_order(1)
+        self.assertEqual(without_times(plan.as_dict()), [("fryer", [(self.fries.id, 2, [2])])])
+
+    def test_remove_moves_later_batches_forward(self):
+        # Test case for retiming a station when a batch is emptied
+        plan = kitchen.KitchenPlan(self.now)
+        plan.add_order(1, [line(1, self.burger, 1)], self.now)
+        plan.add_order(2, [line(2, self.burger, 1)], self.now)
+        plan.remove_order(1)
+        self.assertEqual(plan.ready_times(), {2: self.now + timedelta(minutes=10)})
+
+    def test_plan_endpoint(self):
+        # Test case for updating the cached plan per order and serving it without queries
+        def create_order(lines):
+            data = {"user_id": self.user.id, "status": "pending",
+                    "order_items": [{"item_id": item.id, "amount": amount} for item, amount in lines]}
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('order-list'), data, content_type="application/json")
+            return response.json()['id']
+
+        first = create_order([(self.burger, 1), (self.fries, 2)])
+        response = self.client.get(reverse('kitchen-plan'))
+        self.assertEqual(response.status_code, 200)
+        second = create_order([(self.fries, 3)])
+        with self.assertNumQueries(0):
+            plan = self.client.get(reverse('kitchen-plan')).json()
+        self.assertEqual(without_times(plan), [("fryer", [(self.fries.id, 4, [first, second]),
+                                                          (self.fries.id, 1, [second])]),
+                                               ("grill", [(self.burger.id, 1, [first])])])
+        self.assertEqual(without_times(plan), without_times(kitchen.build_plan().as_dict()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('order-transition'), {"ids": [first], "status": "cancelled"},
+                             content_type="application/json")
+        plan = self.client.get(reverse('kitchen-plan')).json()
+        self.assertEqual(without_times(plan), [("fryer", [(self.fries.id, 2, [second]),
+                                                          (self.fries.id, 1, [second])])])
+        self.assertEqual([order["order"] for order in plan["orders"]], [second])
+
+        order = Order.objects.get(id=second)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = "ready"
+            order.save()
+        self.assertEqual(self.client.get(reverse('kitchen-plan')).json(), {"stations": [], "orders": []})
+
+
+class KitchenBatchesTest(TestCase):
+    def setUp(self):
+        kitchen.invalidate_batches()
+        self.user = User.objects.create(name="Test User")
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", price=10.0, type="main course")
+        self.fries = MenuItem.objects.create(name="Fries", description="Crispy", price=2.5, type="side")
+
+    def tearDown(self):
+        kitchen.invalidate_batches()
+
+    def create_order(self, status, lines):
+        data = {"user_id": self.user.id, "status": status,
+                "order_items": [{"item_id": item.id, "amount": amount} for item, amount in lines]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('order-list'), data, content_type="application/json")
+        return response.json()['id']
+
+    def batches(self, **params):
+        response = self.client.get(reverse('kitchen-batches'), params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['name'], row['quantity'], row['orders']) for row in response.json()]
+
+    def test_batches(self):
+        # Test case for totalling the open quantities per item and caching them until the next change
+        first = self.create_order("preparing", [(self.burger, 2), (self.fries, 1)])
+        self.create_order("preparing", [(self.fries, 3)])
+        self.create_order("pending", [(self.burger, 5)])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.batches(), [("Fries", 4, 2), ("Burger", 2, 1)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.batches(), [("Fries", 4, 2), ("Burger", 2, 1)])
+        self.assertEqual(self.batches(status="pending"), [("Burger", 5, 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('order-transition'), {"ids": [first], "status": "ready"},
+                             content_type="application/json")
+        self.assertEqual(self.batches(), [("Fries", 3, 1)])
+        self.create_order("preparing", [(self.burger, 1)])
+        self.assertEqual(self.batches(), [("Fries", 3, 1), ("Burger", 1, 1)])
+
+    def test_batches_expire(self):
+        # Test case for dropping cached quantities that another process' change did not invalidate here
+        order = self.create_order("preparing", [(self.fries, 2)])
+        self.assertEqual(self.batches(), [("Fries", 2, 1)])
+        Order.objects.filter(id=order).update(status="ready")
+        self.assertEqual(self.batches(), [("Fries", 2, 1)])
+        later = time.time() + kitchen.MAX_AGE.total_seconds() + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(self.batches(), [])
+
+    def test_batches_invalid_status(self):
+        # Test case for rejecting unknown statuses
+        response = self.client.get(reverse('kitchen-batches'), {"status": "eaten"})
+        self.assertEqual(response.status_code, 400)
@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase, Client
 from django.urls import reverse
 from app.models import User, Table, Reservation, MenuItem, Order, OrderItem
@@ -72,4 +73,30 @@ class ReservationModelTest(TestCase):
         self.assertEqual(
             str(self.reservation),
             "Reservation by John Doe on 2025-05-20 18:30"
-        )
\ No newline at end of file
+        )
+
+    def test_reservation_end_time(self):
+        # Test case for the stored end time of a reservation
+        self.assertEqual(self.reservation.end_time, datetime(2025, 5, 20, 20, 30))
+
+    def test_reservation_overlapping(self):
+        # Test case for the overlap query against the stored end time
+        start = datetime(2025, 5, 20, 20, 0)
+        self.assertTrue(Reservation.overlapping(self.table, start, start + timedelta(hours=1)).exists())
+        start = datetime(2025, 5, 20, 20, 30)
+        self.assertFalse(Reservation.overlapping(self.table, start, start + timedelta(hours=1)).exists())
+
+    def test_reservation_overlap_rejected_by_database(self):
+        # Test case for the database constraint against overlapping reservations
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reservation.objects.create(
+                number_of_people=2, date_and_time=datetime(2025, 5, 20, 20, 0),
+                duration=timedelta(hours=1), user=self.user, table=self.table
+            )
+        other = Reservation.objects.create(
+            number_of_people=2, date_and_time=datetime(2025, 5, 20, 20, 30),
+            duration=timedelta(hours=1), user=self.user, table=self.table
+        )
+        other.date_and_time = datetime(2025, 5, 20, 20, 15)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            other.save()
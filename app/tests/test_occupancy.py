@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+
+from app.models import User, Table, Reservation
+from app.occupancy import rasterize
+
+
+class RasterizeTest(TestCase):
+    def test_rasterize_matches_overlap(self):
+        # Test case for comparing the vectorized rasterization against plain interval overlap
+        starts = np.array([0.0, 10.0, 25.0, 5.0])
+        ends = np.array([5.0, 45.0, 30.0, 60.0])
+        rows = np.array([0, 0, 1, 1])
+        weights = np.array([1.0, 2.0, 1.0, 3.0])
+        matrix = rasterize(rows, starts, ends, weights, 2, 4, 15.0)
+
+        expected = np.zeros((2, 4))
+        for row, start, end, weight in zip(rows, starts, ends, weights):
+            for bucket in range(4):
+                overlap = min(end, (bucket + 1) * 15) - max(start, bucket * 15)
+                expected[row, bucket] += weight * max(overlap, 0)
+        np.testing.assert_allclose(matrix, expected)
+
+
+class OccupancyViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.table = Table.objects.create(min_people=2, max_people=4)
+        self.empty_table = Table.objects.create(min_people=2, max_people=4)
+        self.start = datetime(2030, 5, 20, 18, 0, tzinfo=timezone.utc)
+        Reservation.objects.create(user=self.user, table=self.table, number_of_people=2,
+                                   date_and_time=self.start + timedelta(minutes=30), duration=timedelta(minutes=45))
+
+    def test_get_occupancy(self):
+        # Test case for the occupancy matrix and utilisation of a two hour window
+        params = {"start": self.start.isoformat(), "end": (self.start + timedelta(hours=2)).isoformat(),
+                  "bucket": "30m"}
+        response = self.client.get(reverse('table-occupancy'), params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['bucket'], "00:30:00")
+        self.assertEqual(data['tables'][0], {"table": self.table.id, "utilisation": 0.1875,
+                                             "occupancy": [0.0, 1.0, 0.5, 0.0]})
+        self.assertEqual(data['tables'][1]['occupancy'], [0.0] * 4)
+        self.assertEqual(data['utilisation'], 0.09375)
+
+    def test_get_occupancy_invalid_bucket(self):
+        # Test case for rejecting a malformed bucket length
+        params = {"start": self.start.isoformat(), "end": (self.start + timedelta(hours=2)).isoformat(),
+                  "bucket": "15x"}
+        response = self.client.get(reverse('table-occupancy'), params)
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from app.models import User, Table, Reservation, ArchivedReservation
+from app.pagination import KeysetPagination
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        start = (timezone.now() + timedelta(days=1)).replace(microsecond=250000)
+        self.tables = [Table.objects.create(min_people=1, max_people=6) for _ in range(3)]
+        # Three reservations share each start time, on different tables
+        self.reservations = [
+            Reservation.objects.create(user=self.user, table=table, number_of_people=2,
+                                       date_and_time=start + timedelta(hours=hour), duration=timedelta(hours=1))
+            for hour in (2, 0, 1) for table in self.tables
+        ]
+        self.expected = [reservation.id for reservation in
+                         sorted(self.reservations, key=lambda reservation: (reservation.date_and_time, reservation.id))]
+
+    def walk(self, url, params=None, link='next'):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            ids.extend(row['id'] for row in response.json()['results'])
+            url, params = response.json()[link], None
+        return ids, pages
+
+    def test_walk_forward_and_back(self):
+        # Test case for paging through rows with equal ordering values in both directions
+        ids, pages = self.walk(reverse('reservation-list'), {"page_size": 2})
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 2, 2, 1])
+        self.assertIsNone(pages[0]['previous'])
+        back, pages = self.walk(pages[-1]['previous'], link='previous')
+        self.assertEqual(back, [row for start in (6, 4, 2, 0) for row in self.expected[start:start + 2]])
+        self.assertIsNotNone(pages[-1]['next'])
+
+    def test_page_size(self):
+        # Test case for the default page size, a client page size and its cap
+        User.objects.bulk_create([User(name=f"User {index:03}") for index in range(120)])
+        response = self.client.get(reverse('user-list'))
+        self.assertEqual(len(response.json()['results']), KeysetPagination.page_size)
+        response = self.client.get(reverse('user-list'), {"page_size": 7})
+        self.assertEqual(len(response.json()['results']), 7)
+        response = self.client.get(reverse('user-list'), {"page_size": 1000})
+        self.assertEqual(len(response.json()['results']), KeysetPagination.max_page_size)
+        response = self.client.get(reverse('user-list'), {"page_size": "many"})
+        self.assertEqual(len(response.json()['results']), KeysetPagination.page_size)
+
+    def test_deep_page_single_query(self):
+        # Test case for reading a page after a cursor with one range query and no count
+        _, pages = self.walk(reverse('reservation-list'), {"page_size": 4})
+        with self.assertNumQueries(1):
+            response = self.client.get(pages[1]['next'])
+        self.assertEqual([row['id'] for row in response.json()['results']], self.expected[8:])
+
+    def test_invalid_cursor(self):
+        # Test case for rejecting a tampered cursor
+        for cursor in ("nonsense", "eyJrZXkiOiBbMV19"):
+            response = self.client.get(reverse('reservation-list'), {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_nested_with_archived(self):
+        # Test case for paging through live and archived reservations as one listing
+        for index in range(3):
+            ArchivedReservation.objects.create(id=1000 + index, user=self.user, table=self.tables[0],
+                                               number_of_people=2, duration=timedelta(hours=1),
+                                               date_and_time=timezone.now() - timedelta(days=300 - index),
+                                               end_time=timezone.now() - timedelta(days=300 - index, hours=-1))
+        url = f"{reverse('user-detail', args=[self.user.id])}reservations/"
+        ids, _ = self.walk(url, {"include_archived": "true", "page_size": 4})
+        self.assertEqual(ids, [1000, 1001, 1002, *self.expected])
+
+    def test_descending_order(self):
+        # Test case for paging a queryset ordered by a descending field
+        request = Request(APIRequestFactory().get("/", {"page_size": 2}))
+        paginator = KeysetPagination()
+        queryset = Table.objects.order_by('-max_people')
+        first = paginator.paginate_queryset(queryset, request)
+        cursor = parse_qs(urlparse(paginator.get_next_link()).query)["cursor"][0]
+        second = paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(
+            "/", {"page_size": 2, "cursor": cursor})))
+        self.assertEqual([table.id for table in first + second], [table.id for table in self.tables])
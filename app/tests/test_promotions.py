@@ -0,0 +1,167 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app import promotions, versions
+from app.models import User, MenuItem, Order, OrderItem, Promotion
+
+
+def rule(rule_id, percent_off, items=(), **fields):
+    values = {"combo": False, "min_quantity": 1, "valid_from": None, "valid_until": None, "daily_start": None,
+              "daily_end": None, **fields}
+    return promotions.Rule(rule_id, percent_off, frozenset(items), **values)
+
+
+class EvaluatorTest(TestCase):
+    def setUp(self):
+        self.at = timezone.make_aware(datetime(2025, 5, 15, 17, 30))
+
+    def test_rules_by_item_and_type(self):
+        # Test case for applying rules only to the menu items and types they name
+        evaluator = promotions.Evaluator([(rule(1, 10, items=[1]), ""), (rule(2, 20), "drink")])
+        lines = [(1, "main course", 10.0, 2), (2, "drink", 3.0, 1), (3, "dessert", 5.0, 1)]
+        self.assertEqual(evaluator.price(lines, self.at), [(2.0, 1), (0.6, 2), (0.0, None)])
+        self.assertEqual(evaluator.discount(lines, self.at), 2.6)
+
+    def test_best_rule_wins(self):
+        # Test case for giving each line the largest discount instead of stacking them
+        evaluator = promotions.Evaluator([(rule(1, 10), ""), (rule(2, 25, items=[1]), ""), (rule(3, 15), "drink")])
+        self.assertEqual(evaluator.price([(1, "drink", 4.0, 1)], self.at), [(1.0, 2)])
+        self.assertEqual(evaluator.price([(2, "drink", 4.0, 1)], self.at), [(0.6, 3)])
+
+    def test_min_quantity_and_combo(self):
+        # Test case for the quantity and combo conditions over the whole order
+        evaluator = promotions.Evaluator([(rule(1, 50, min_quantity=3), "drink"),
+                                          (rule(2, 20, items=[1, 2], combo=True), "")])
+        self.assertEqual(evaluator.price([(5, "drink", 2.0, 2)], self.at), [(0.0, None)])
+        self.assertEqual(evaluator.price([(5, "drink", 2.0, 2), (6, "drink", 2.0, 1)], self.at),
+                         [(2.0, 1), (1.0, 1)])
+        self.assertEqual(evaluator.price([(1, "main course", 10.0, 1)], self.at), [(0.0, None)])
+        self.assertEqual(evaluator.price([(1, "main course", 10.0, 1), (2, "side", 5.0, 1)], self.at),
+                         [(2.0, 2), (1.0, 2)])
+
+    def test_time_windows(self):
+        # Test case for the validity range and daily windows, including one past midnight
+        evaluator = promotions.Evaluator([
+            (rule(1, 10, daily_start=time(16), daily_end=time(18)), "a"),
+            (rule(2, 10, daily_start=time(22), daily_end=time(2)), "b"),
+            (rule(3, 10, valid_from=self.at + timedelta(days=1)), "c"),
+            (rule(4, 10, valid_until=self.at), "d"),
+        ])
+        lines = [(1, "a", 10.0, 1), (2, "b", 10.0, 1), (3, "c", 10.0, 1), (4, "d", 10.0, 1)]
+        self.assertEqual([promotion for _, promotion in evaluator.price(lines, self.at)], [1, None, None, None])
+        late = self.at.replace(hour=23)
+        self.assertEqual([promotion for _, promotion in evaluator.price(lines, late)], [None, 2, None, None])
+        self.assertEqual([promotion for _, promotion in evaluator.price(lines, late + timedelta(hours=2))],
+                         [None, 2, None, None])
+        self.assertEqual([promotion for _, promotion in evaluator.price(lines, self.at + timedelta(days=1))],
+                         [1, None, 3, None])
+
+    def test_candidates_are_looked_up(self):
+        # Test case for checking only the rules indexed under a line's item and type
+        evaluator = promotions.Evaluator([(rule(rule_id, 10, items=[rule_id]), "") for rule_id in range(1000)])
+        self.assertEqual(evaluator.candidates(5, "drink"), [evaluator.by_item[5][0]])
+
+
+class PromotionApiTest(TestCase):
+    def setUp(self):
+        promotions.invalidate()
+        self.addCleanup(promotions.invalidate)
+        self.user = User.objects.create(name="Test User")
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", type="main course", price=10.0)
+        self.soda = MenuItem.objects.create(name="Soda", description="Fizzy", type="drink", price=3.0)
+        self.promotion = Promotion.objects.create(name="Drinks", percent_off=50, item_type="drink")
+
+    def test_preview(self):
+        # Test case for pricing lines without placing an order
+        data = {"order_items": [{"item_id": self.burger.id, "amount": 1}, {"item_id": self.soda.id, "amount": 2}]}
+        response = self.client.post(reverse('order-preview'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "order_items": [
+                {"item_id": self.burger.id, "amount": 1, "line_total": 10.0, "discount": 0.0, "promotion_id": None},
+                {"item_id": self.soda.id, "amount": 2, "line_total": 6.0, "discount": 3.0,
+                 "promotion_id": self.promotion.id},
+            ],
+            "subtotal": 16.0, "discount": 3.0, "total": 13.0,
+        })
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_preview_unknown_item(self):
+        # Test case for rejecting previews of missing menu items
+        data = {"order_items": [{"item_id": 999, "amount": 1}]}
+        response = self.client.post(reverse('order-preview'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def totals(self, order_id):
+        response = self.client.get(reverse('order-detail', args=[order_id]))
+        return response.json()['discount'], response.json()['total']
+
+    def test_order_total_with_promotion(self):
+        # Test case for keeping the discount an order was placed with until its lines change
+        data = {"user_id": self.user.id, "status": "pending",
+                "order_items": [{"item_id": self.burger.id, "amount": 1}, {"item_id": self.soda.id, "amount": 2}]}
+        order_id = self.client.post(reverse('order-list'), data, content_type="application/json").json()['id']
+        self.assertEqual(self.totals(order_id), (3.0, 13.0))
+        line = OrderItem.objects.get(order_id=order_id, item=self.soda)
+        self.assertEqual((line.discount, line.promotion_id), (3.0, self.promotion.id))
+
+        self.promotion.percent_off = 10
+        self.promotion.save()
+        self.assertEqual(self.totals(order_id), (3.0, 13.0))
+        self.promotion.delete()
+        self.assertEqual(self.totals(order_id), (3.0, 13.0))
+        response = self.client.post(reverse('order-preview'), {"order_items": data["order_items"]},
+                                    content_type="application/json")
+        self.assertEqual(response.json()['discount'], 0.0)
+
+        response = self.client.patch(reverse('orderitem-detail', args=[line.id]), {"amount": 3},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(order_id), (0.0, 19.0))
+
+    def test_order_total_without_stored_discounts(self):
+        # Test case for pricing lines stored without discounts with the current promotions
+        order = Order.objects.create(user=self.user, status="pending")
+        OrderItem.objects.bulk_create([OrderItem(order=order, item=self.burger, amount=1),
+                                       OrderItem(order=order, item=self.soda, amount=2)])
+        self.assertEqual(self.totals(order.id), (3.0, 13.0))
+        self.promotion.valid_from = order.created_at + timedelta(minutes=1)
+        self.promotion.save()
+        self.assertEqual(self.totals(order.id), (0.0, 16.0))
+        call_command("store_discounts", stdout=StringIO())
+        self.promotion.valid_from = None
+        self.promotion.save()
+        self.assertEqual(self.totals(order.id), (0.0, 16.0))
+
+    def test_compiled_once(self):
+        # Test case for reusing the compiled promotions until a promotion changes
+        promotions.evaluator()
+        with self.assertNumQueries(0):
+            promotions.evaluator()
+        response = self.client.patch(reverse('promotion-detail', args=[self.promotion.id]),
+                                     {"items": [self.burger.id], "item_type": ""}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(promotions.evaluator().price([(self.burger.id, "main course", 10.0, 1)], timezone.now()),
+                         [(5.0, self.promotion.id)])
+
+    def test_changed_by_other_process(self):
+        # Test case for picking up a change made by another process once the version is checked again
+        lines = [(self.soda.id, "drink", 3.0, 1)]
+        self.assertEqual(promotions.evaluator().discount(lines, timezone.now()), 1.5)
+        # Another process changes the rows and bumps the version, without touching this process' evaluator
+        Promotion.objects.filter(id=self.promotion.id).update(active=False)
+        versions.bump(promotions.VERSION_NAME)
+        self.assertEqual(promotions.evaluator().discount(lines, timezone.now()), 1.5)
+        promotions._evaluator.checked -= versions.CHECK_SECONDS  # pylint: disable=protected-access
+        self.assertEqual(promotions.evaluator().discount(lines, timezone.now()), 0.0)
+
+    def test_combo_needs_items(self):
+        # Test case for rejecting a combo without menu items
+        data = {"name": "Combo", "percent_off": 10, "combo": True}
+        response = self.client.post(reverse('promotion-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
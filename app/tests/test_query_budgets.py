@@ -0,0 +1,150 @@
+from datetime import timedelta
+from itertools import count
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import promotions
+from app.models import (User, Table, Reservation, ReservationRecurrence, MenuItem, Order, OrderItem, Promotion,
+                        ArchivedOrder, ArchivedOrderItem, ArchivedReservation)
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Every endpoint must serve a response in a fixed number of queries, however
+    many rows it returns. Each test measures an endpoint with one row and with
+    more rows than fit on a page, and checks both against the endpoint's budget.
+    """
+
+    def setUp(self):
+        # Compile the (empty) promotions up front so that they are not counted
+        promotions.invalidate()
+        self.addCleanup(promotions.invalidate)
+        promotions.evaluator()
+        self.ids = count(1)
+        self.now = timezone.now()
+        self.user = User.objects.create(name="Test User")
+        self.table = Table.objects.create(min_people=1, max_people=8)
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", price=10.0)
+        self.soda = MenuItem.objects.create(name="Soda", description="Fizzy", type="drink", price=3.0)
+
+    def queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertBudget(self, url, budget, add_row, params=None):
+        add_row()
+        one = self.queries(url, params)
+        for _ in range(settings.REST_FRAMEWORK['PAGE_SIZE'] * 2):
+            add_row()
+        many = self.queries(url, params)
+        self.assertLessEqual(one, budget)
+        self.assertEqual(many, one, f"{url} costs more queries with more rows")
+
+    def add_user(self):
+        User.objects.create(name=f"User {next(self.ids)}")
+
+    def add_table(self):
+        Table.objects.create(min_people=2, max_people=4)
+
+    def add_menu_item(self):
+        MenuItem.objects.create(name=f"Item {next(self.ids)}", description="Tasty", price=5.0, stock_shards=2)
+
+    def add_reservation(self):
+        reservation = Reservation.objects.create(user=self.user, table=self.table, number_of_people=2,
+                                                 date_and_time=self.now + timedelta(days=next(self.ids)),
+                                                 duration=timedelta(hours=1))
+        ReservationRecurrence.objects.create(reservation=reservation, until=reservation.date_and_time)
+
+    def add_archived_reservation(self):
+        reservation_id = next(self.ids)
+        ArchivedReservation.objects.create(id=reservation_id, user=self.user, table=self.table, number_of_people=2,
+                                           date_and_time=self.now - timedelta(days=400 + reservation_id),
+                                           duration=timedelta(hours=1),
+                                           end_time=self.now - timedelta(days=400 + reservation_id, hours=-1))
+
+    def add_order(self):
+        order = Order.objects.create(user=self.user, status="pending")
+        OrderItem.objects.bulk_create([OrderItem(order=order, item=self.burger, amount=1),
+                                       OrderItem(order=order, item=self.soda, amount=2)])
+
+    def add_archived_order(self):
+        order = ArchivedOrder.objects.create(id=10000 + next(self.ids), user=self.user, status="served",
+                                             created_at=self.now - timedelta(days=400))
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(id=order.id * 10 + index, order=order, item=item,
+                                                                 amount=1)
+                                               for index, item in enumerate([self.burger, self.soda])])
+
+    def add_promotion(self):
+        promotion = Promotion.objects.create(name=f"Promotion {next(self.ids)}", percent_off=10)
+        promotion.items.set([self.burger, self.soda])
+
+    def test_user_list(self):
+        # Test case for listing users: one page
+        self.assertBudget(reverse('user-list'), 1, self.add_user)
+
+    def test_table_list(self):
+        # Test case for listing tables: one page
+        self.assertBudget(reverse('table-list'), 1, self.add_table)
+
+    def test_menu_item_list(self):
+        # Test case for listing menu items: one page with the stock annotated
+        self.assertBudget(reverse('menuitem-list'), 1, self.add_menu_item)
+
+    def test_reservation_list(self):
+        # Test case for listing reservations: one page joined with their recurrence
+        self.assertBudget(reverse('reservation-list'), 1, self.add_reservation)
+
+    def test_order_list(self):
+        # Test case for listing orders: annotated page and its lines
+        self.assertBudget(reverse('order-list'), 2, self.add_order)
+
+    def test_order_item_list(self):
+        # Test case for listing order items: one annotated page
+        self.assertBudget(reverse('orderitem-list'), 1, self.add_order)
+
+    def test_promotion_list(self):
+        # Test case for listing promotions: page and their menu items
+        self.assertBudget(reverse('promotion-list'), 2, self.add_promotion)
+
+    def test_user_reservations(self):
+        # Test case for a user's reservations: user, reservations with recurrences, archived reservations
+        url = f"{reverse('user-detail', args=[self.user.id])}reservations/"
+        self.assertBudget(url, 3, lambda: (self.add_reservation(), self.add_archived_reservation()),
+                          {"include_archived": "true"})
+
+    def test_user_orders(self):
+        # Test case for a user's orders: user, orders and lines, archived orders, their lines and menu items
+        url = f"{reverse('user-detail', args=[self.user.id])}orders/"
+        self.assertBudget(url, 6, lambda: (self.add_order(), self.add_archived_order()),
+                          {"include_archived": "true"})
+
+    def test_table_reservations(self):
+        # Test case for a table's reservations: table, reservations with recurrences, archived reservations
+        url = f"{reverse('table-detail', args=[self.table.id])}reservations/"
+        self.assertBudget(url, 3, lambda: (self.add_reservation(), self.add_archived_reservation()),
+                          {"include_archived": "true"})
+
+    def test_reservation_bulk(self):
+        # Test case for importing reservations: the same queries for one row and a full batch
+        def rows(number):
+            return [{"user": self.user.id, "table": self.table.id, "number_of_people": 2, "duration": "01:00:00",
+                     "date_and_time": (self.now + timedelta(days=next(self.ids))).isoformat()}
+                    for _ in range(number)]
+
+        def queries(number):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(reverse('reservation-bulk'), rows(number),
+                                            content_type="application/json")
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.json()), number)
+            return len(context.captured_queries)
+
+        one, many = queries(1), queries(settings.REST_FRAMEWORK['PAGE_SIZE'] * 2)
+        self.assertEqual(many, one, "bulk import costs more queries with more rows")
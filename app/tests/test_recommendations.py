@@ -0,0 +1,103 @@
+import random
+from collections import Counter
+from itertools import product
+
+from django.test import TestCase
+from django.urls import reverse
+
+from app import recommendations
+from app.models import User, MenuItem, Order, OrderItem, ItemPair
+
+
+class CoOccurrenceTest(TestCase):
+    def test_co_occurrences(self):
+        # Test case for matching a direct count of the orders containing each pair
+        rng = random.Random(7)
+        lines = [(rng.randrange(50), rng.randrange(12)) for _ in range(400)]
+        expected = Counter()
+        for order_id in {order_id for order_id, _ in lines}:
+            items = {item_id for line_order, item_id in lines if line_order == order_id}
+            expected.update(product(items, items))
+        items, others, orders = recommendations.co_occurrences(*zip(*lines))
+        self.assertEqual(dict(zip(zip(items.tolist(), others.tolist()), orders.tolist())), dict(expected))
+
+    def test_co_occurrences_empty(self):
+        # Test case for building from no order lines
+        self.assertEqual(len(recommendations.co_occurrences([], [])[0]), 0)
+
+
+class RecommendationTest(TestCase):
+    def setUp(self):
+        recommendations.invalidate()
+        self.user = User.objects.create(name="Test User")
+        self.burger, self.fries, self.cola, self.salad = [
+            MenuItem.objects.create(name=name, description="Tasty", price=5.0)
+            for name in ("Burger", "Fries", "Cola", "Salad")]
+
+    def create_order(self, items):
+        data = {"user_id": self.user.id, "status": "pending",
+                "order_items": [{"item_id": item.id, "amount": 1} for item in items]}
+        response = self.client.post(reverse('order-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def recommended(self, item, **params):
+        response = self.client.get(reverse('menuitem-recommendations', args=[item.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['name'], row['orders'], row['confidence']) for row in response.json()]
+
+    def counts(self):
+        return {(pair.item_id, pair.other_id): pair.orders for pair in ItemPair.objects.all() if pair.orders}
+
+    def test_recommendations(self):
+        # Test case for ranking co-ordered items and answering repeated lookups from the cache
+        self.create_order([self.burger, self.fries, self.cola])
+        self.create_order([self.burger, self.fries, self.fries])
+        self.create_order([self.burger, self.salad])
+        self.create_order([self.burger])
+        self.assertEqual(self.recommended(self.burger),
+                         [("Fries", 2, 0.5), ("Cola", 1, 0.25), ("Salad", 1, 0.25)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.recommended(self.burger, limit=1), [("Fries", 2, 0.5)])
+        self.assertEqual(self.recommended(self.cola), [("Burger", 1, 1.0), ("Fries", 1, 1.0)])
+
+    def test_incremental_updates(self):
+        # Test case for following line changes, line replacement and order deletion
+        order_id = self.create_order([self.burger, self.fries])
+        self.create_order([self.burger, self.cola])
+        line = OrderItem.objects.create(order_id=order_id, item=self.cola, amount=1)
+        self.assertEqual(self.recommended(self.burger), [("Cola", 2, 1.0), ("Fries", 1, 0.5)])
+
+        line = OrderItem.objects.get(id=line.id)
+        line.item = self.salad
+        line.save()
+        response = self.client.patch(reverse('order-detail', args=[order_id]),
+                                     {"order_items": [{"item_id": self.burger.id, "amount": 1},
+                                                      {"item_id": self.salad.id, "amount": 2}]},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recommended(self.burger), [("Cola", 1, 0.5), ("Salad", 1, 0.5)])
+
+        incremental = self.counts()
+        recommendations.rebuild()
+        self.assertEqual(self.counts(), incremental)
+
+        Order.objects.get(id=order_id).delete()
+        OrderItem.objects.filter(item=self.cola).get().delete()
+        self.assertEqual(self.counts(), {(self.burger.id, self.burger.id): 1})
+
+    def test_recommendations_tied_with_item(self):
+        # Test case for an item whose own count ties with more co-ordered items than are cached
+        items = [MenuItem.objects.create(name=f"Item {index:02}", description="Tasty", price=5.0)
+                 for index in range(recommendations.TOP_K + 2)]
+        self.create_order(items)
+        recommended = self.recommended(items[-1], limit=recommendations.TOP_K)
+        self.assertEqual(recommended, [(item.name, 1, 1.0) for item in items[:recommendations.TOP_K]])
+
+    def test_recommendations_unknown_item(self):
+        # Test case for items that do not exist or were never ordered
+        response = self.client.get(reverse('menuitem-recommendations', args=[999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.recommended(self.salad), [])
+        response = self.client.get(reverse('menuitem-recommendations', args=[self.salad.id]), {"limit": 0})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app import recurrence
+from app.models import User, Table, Reservation, ReservationRecurrence
+
+
+def weekly(start, duration, interval=1, until=None):
+    return recurrence.Series(1, 1, start, duration, timedelta(weeks=interval), until, 2)
+
+
+class RecurrenceTest(TestCase):
+    def setUp(self):
+        self.start = datetime(2030, 5, 20, 18, 0, tzinfo=dt_timezone.utc)
+
+    def test_occurrence_range(self):
+        # Test case for finding the occurrences that overlap a window
+        series = weekly(self.start, timedelta(hours=2))
+        window_start = self.start + timedelta(weeks=3, hours=1)
+        self.assertEqual(recurrence.occurrence_range(series, window_start, window_start + timedelta(weeks=1)),
+                         range(3, 5))
+        until = weekly(self.start, timedelta(hours=2), until=self.start + timedelta(weeks=3))
+        self.assertEqual(recurrence.occurrence_range(until, window_start, window_start + timedelta(weeks=1)),
+                         range(3, 4))
+        self.assertFalse(recurrence.overlaps_interval(series, self.start, self.start + timedelta(hours=1)))
+
+    def test_overlaps_series(self):
+        # Test case for comparing two series analytically over one cycle
+        weekly_series = weekly(self.start, timedelta(hours=2))
+        fortnightly = weekly(self.start + timedelta(weeks=1, hours=1), timedelta(hours=1), interval=2)
+        daily = recurrence.Series(2, 1, self.start + timedelta(hours=3), timedelta(hours=1), timedelta(days=1),
+                                  None, 2)
+        self.assertTrue(recurrence.overlaps_series(weekly_series, fortnightly))
+        self.assertFalse(recurrence.overlaps_series(weekly_series, daily))
+        ended = weekly(self.start, timedelta(hours=2), until=self.start)
+        self.assertFalse(recurrence.overlaps_series(ended, fortnightly))
+
+
+class RecurringReservationViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.table = Table.objects.create(min_people=2, max_people=6)
+        self.start = (timezone.now() + timedelta(days=1)).replace(hour=18, minute=0, second=0, microsecond=0)
+        data = {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+                "date_and_time": self.start.isoformat(), "duration": "02:00:00",
+                "recurrence": {"frequency": "weekly", "interval": 1}}
+        response = self.client.post(reverse('reservation-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.reservation_id = response.json()['id']
+
+    def test_recurring_reservation_stored_once(self):
+        # Test case for storing a recurring reservation as a single row
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(ReservationRecurrence.objects.get().reservation_id, self.reservation_id)
+        response = self.client.get(reverse('reservation-detail', args=[self.reservation_id]))
+        self.assertEqual(response.json()['recurrence'], {"frequency": "weekly", "interval": 1, "until": None})
+
+    def test_conflict_with_later_occurrence(self):
+        # Test case for rejecting a reservation that clashes with a later occurrence
+        data = {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+                "date_and_time": (self.start + timedelta(weeks=10, hours=1)).isoformat(), "duration": "01:00:00"}
+        response = self.client.post(reverse('reservation-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+        data["date_and_time"] = (self.start + timedelta(weeks=10, hours=2)).isoformat()
+        response = self.client.post(reverse('reservation-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_conflicting_series_rejected(self):
+        # Test case for rejecting a series that clashes with another series
+        data = {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+                "date_and_time": (self.start + timedelta(days=2)).isoformat(), "duration": "01:00:00",
+                "recurrence": {"frequency": "daily", "interval": 1}}
+        response = self.client.post(reverse('reservation-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_series_conflicts_with_later_reservation(self):
+        # Test case for checking an open-ended series against a reservation years ahead, and only those in phase
+        table = Table.objects.create(min_people=2, max_people=6)
+        later = self.start + timedelta(weeks=156, hours=3)
+        Reservation.objects.create(user=self.user, table=table, number_of_people=4, date_and_time=later,
+                                   duration=timedelta(hours=1))
+        Reservation.objects.create(user=self.user, table=table, number_of_people=4,
+                                   date_and_time=later + timedelta(days=2), duration=timedelta(hours=1))
+        first = Reservation.objects.create(user=self.user, table=table, number_of_people=4,
+                                           date_and_time=self.start + timedelta(hours=3), duration=timedelta(hours=2))
+        series = recurrence.Series(first.id, table.id, first.date_and_time, first.duration, timedelta(weeks=1), None,
+                                   4)
+        reservations = Reservation.objects.filter(table=table).exclude(id=first.id)
+        self.assertEqual(list(recurrence.in_phase(reservations, series).values_list("date_and_time", flat=True)),
+                         [later])
+        self.assertTrue(recurrence.series_conflicts(series))
+        self.assertFalse(recurrence.series_conflicts(series._replace(start=first.date_and_time - timedelta(hours=2),
+                                                                     duration=timedelta(hours=1))))
+
+    def test_recurrence_longer_than_period_rejected(self):
+        # Test case for rejecting occurrences that would overlap each other
+        data = {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+                "date_and_time": (self.start + timedelta(hours=3)).isoformat(), "duration": "1 01:00:00",
+                "recurrence": {"frequency": "daily", "interval": 1}}
+        response = self.client.post(reverse('reservation-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_occurrences(self):
+        # Test case for expanding a recurring reservation inside a window
+        params = {"start": self.start.isoformat(), "end": (self.start + timedelta(weeks=3)).isoformat()}
+        response = self.client.get(reverse('reservation-occurrences'), params)
+        self.assertEqual(response.status_code, 200)
+        starts = [occurrence['start'] for occurrence in response.json()]
+        expected = [self.start + timedelta(weeks=week) for week in range(3)]
+        self.assertEqual(starts, [time.isoformat().replace('+00:00', 'Z') for time in expected])
+
+    def test_availability_excludes_occurrences(self):
+        # Test case for the free slot search skipping later occurrences
+        window_start = self.start + timedelta(weeks=5)
+        params = {"people": 4, "start": window_start.isoformat(),
+                  "end": (window_start + timedelta(hours=3)).isoformat(), "slot": "01:00:00",
+                  "duration": "01:00:00"}
+        response = self.client.get(reverse('table-availability'), params)
+        self.assertEqual([slot['start'] for slot in response.json()],
+                         [(window_start + timedelta(hours=2)).isoformat().replace('+00:00', 'Z')])
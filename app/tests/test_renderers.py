@@ -0,0 +1,50 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from app.models import User
+from app.renderers import FastJSONRenderer, msgpack
+
+
+class RendererTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Tëst Üser")
+
+    def test_json_parity(self):
+        # Test case for rendering the same bytes as DRF's stdlib JSON renderer
+        data = {"at": datetime(2025, 5, 15, 12, 30, 1, 500, tzinfo=dt_timezone.utc),
+                "naive": datetime(2025, 5, 15, 12, 30), "day": date(2025, 5, 15), "time": time(18, 15),
+                "duration": timedelta(minutes=90), "price": Decimal("10.50"), "name": "Tëst",
+                "items": [1, 2.5, None, True], "nested": {"empty": []}}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_indent_falls_back(self):
+        # Test case for indented responses rendered by the stdlib encoder
+        response = self.client.get(reverse('user-list'), HTTP_ACCEPT="application/json; indent=4")
+        self.assertIn(b'\n    "results"', response.content)
+
+    def test_json_request(self):
+        # Test case for parsing JSON bodies and rejecting malformed ones
+        response = self.client.post(reverse('user-list'), {"name": "Ann"}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Content-Type'], "application/json")
+        response = self.client.post(reverse('user-list'), b'{"name": ', content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack(self):
+        # Test case for negotiating MessagePack responses and parsing MessagePack bodies
+        response = self.client.get(reverse('user-detail', args=[self.user.id]), HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response['Content-Type'], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), {"id": self.user.id, "name": "Tëst Üser"})
+        response = self.client.post(reverse('user-list'), msgpack.packb({"name": "Bob"}),
+                                    content_type="application/msgpack", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(msgpack.unpackb(response.content)["name"], "Bob")
+        response = self.client.post(reverse('user-list'), b'\xc1', content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
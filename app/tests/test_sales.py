@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app import sales
+from app.archive import archive_chunk
+from app.models import User, MenuItem, Order, OrderItem, DailySales
+
+
+class SalesRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", price=10.0)
+        self.fries = MenuItem.objects.create(name="Fries", description="Crispy", price=2.5)
+        self.today = timezone.localdate()
+
+    def rollup(self):
+        return {(row.day, row.item_id): (row.quantity, row.revenue) for row in DailySales.objects.all()
+                if row.quantity}
+
+    def create_order(self, lines, status="pending"):
+        data = {"user_id": self.user.id, "status": status,
+                "order_items": [{"item_id": item.id, "amount": amount} for item, amount in lines]}
+        response = self.client.post(reverse('order-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def test_order_lines(self):
+        # Test case for keeping the rollup in sync with created, replaced and cancelled orders
+        order_id = self.create_order([(self.burger, 2), (self.fries, 1)])
+        self.create_order([(self.burger, 5)], status="cancelled")
+        self.assertEqual(self.rollup(), {(self.today, self.burger.id): (2, 20.0),
+                                         (self.today, self.fries.id): (1, 2.5)})
+
+        response = self.client.patch(reverse('order-detail', args=[order_id]),
+                                     {"order_items": [{"item_id": self.fries.id, "amount": 4}]},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.rollup(), {(self.today, self.fries.id): (4, 10.0)})
+
+        response = self.client.patch(reverse('order-detail', args=[order_id]), {"status": "cancelled"},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.rollup(), {})
+
+    def test_price_changes(self):
+        # Test case for removing lines at the price they were counted at after the menu price changed
+        first = self.create_order([(self.burger, 2)])
+        second = self.create_order([(self.burger, 1)])
+        self.burger.price = 12.0
+        self.burger.save()
+        line = OrderItem.objects.get(order_id=second)
+        line.amount = 3
+        line.save()
+        self.create_order([(self.burger, 1)])
+        self.assertEqual(self.rollup(), {(self.today, self.burger.id): (6, 62.0)})
+        incremental = self.rollup()
+        sales.rebuild()
+        self.assertEqual(self.rollup(), incremental)
+
+        self.client.patch(reverse('order-detail', args=[first]), {"status": "cancelled"},
+                          content_type="application/json")
+        self.client.post(reverse('order-transition'), {"ids": [second], "status": "cancelled"},
+                         content_type="application/json")
+        self.assertEqual(self.rollup(), {(self.today, self.burger.id): (1, 12.0)})
+
+    def test_order_total_keeps_price(self):
+        # Test case for keeping an order's total at the prices it was placed at, in line with the rollup
+        order_id = self.create_order([(self.burger, 2), (self.fries, 1)])
+        self.burger.price = 12.0
+        self.burger.save()
+        response = self.client.get(reverse('order-detail', args=[order_id]))
+        self.assertEqual(response.json()['total'], 22.5)
+        self.assertEqual([line['line_total'] for line in response.json()['order_items']], [20.0, 2.5])
+        response = self.client.get(reverse('orderitem-list'))
+        self.assertEqual([line['line_total'] for line in response.json()['results']], [20.0, 2.5])
+        self.assertEqual(sum(revenue for _, revenue in self.rollup().values()), 22.5)
+
+    def test_order_item_changes(self):
+        # Test case for applying single line creates, updates and deletes
+        order = Order.objects.create(user=self.user, status="preparing",
+                                     created_at=timezone.now() - timedelta(days=2))
+        day = timezone.localdate(order.created_at)
+        line = OrderItem.objects.create(order=order, item=self.burger, amount=1)
+        self.assertEqual(self.rollup(), {(day, self.burger.id): (1, 10.0)})
+        line = OrderItem.objects.get(id=line.id)
+        line.item = self.fries
+        line.amount = 3
+        line.save()
+        self.assertEqual(self.rollup(), {(day, self.fries.id): (3, 7.5)})
+        line.delete()
+        self.assertEqual(self.rollup(), {})
+
+    def test_transition_and_archive(self):
+        # Test case for removing bulk cancelled orders and keeping archived ones
+        cancelled = self.create_order([(self.burger, 1)])
+        served = Order.objects.create(user=self.user, status="served", created_at=timezone.now() - timedelta(days=200))
+        OrderItem.objects.create(order=served, item=self.fries, amount=2)
+        response = self.client.post(reverse('order-transition'), {"ids": [cancelled], "status": "cancelled"},
+                                    content_type="application/json")
+        self.assertEqual(response.json()['moved'], [cancelled])
+        expected = {(timezone.localdate(served.created_at), self.fries.id): (2, 5.0)}
+        self.assertEqual(self.rollup(), expected)
+
+        archive_chunk(timedelta(days=90))
+        self.assertFalse(Order.objects.filter(id=served.id).exists())
+        self.assertEqual(self.rollup(), expected)
+        sales.rebuild()
+        self.assertEqual(self.rollup(), expected)
+
+    def test_reports(self):
+        # Test case for reading the sales reports from the rollup only
+        self.create_order([(self.burger, 2), (self.fries, 1)])
+        self.create_order([(self.fries, 6)])
+        old = Order.objects.create(user=self.user, status="served", created_at=timezone.now() - timedelta(days=30))
+        OrderItem.objects.create(order=old, item=self.burger, amount=9)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('report-sales'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"day": self.today.isoformat(), "quantity": 9, "revenue": 37.5}])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('report-top-items'), {"limit": 1})
+        self.assertEqual(response.json(), [{"item_id": self.fries.id, "name": "Fries", "quantity": 7,
+                                            "revenue": 17.5}])
+
+        start = (self.today - timedelta(days=60)).isoformat()
+        response = self.client.get(reverse('report-top-items'), {"start": start})
+        self.assertEqual([row['item_id'] for row in response.json()], [self.burger.id, self.fries.id])
+
+    def test_reports_invalid_range(self):
+        # Test case for rejecting reversed and too long ranges
+        response = self.client.get(reverse('report-sales'), {"start": "2025-02-01", "end": "2025-01-01"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('report-sales'), {"start": "2020-01-01", "end": "2025-01-01"})
+        self.assertEqual(response.status_code, 400)
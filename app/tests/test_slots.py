@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from app import slots
+from app.models import User, Table, Reservation, ReservationRecurrence, TableSlotBitmap
+
+
+class SlotBitmapTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Test User")
+        self.table = Table.objects.create(min_people=2, max_people=6)
+        self.start = datetime(2030, 5, 20, 18, 0, tzinfo=timezone.utc)
+
+    def test_slot_masks_partial_slots(self):
+        # Test case for counting partially covered slots as occupied
+        masks = slots.slot_masks(self.start + timedelta(minutes=5), self.start + timedelta(minutes=20))
+        self.assertEqual(masks, {self.start.date(): 0b11 << 72})
+
+    def test_slot_masks_across_midnight(self):
+        # Test case for splitting an interval that crosses midnight
+        start = datetime(2030, 5, 20, 23, 30, tzinfo=timezone.utc)
+        masks = slots.slot_masks(start, start + timedelta(hours=1))
+        self.assertEqual(masks[start.date()], 0b11 << 94)
+        self.assertEqual(masks[start.date() + timedelta(days=1)], 0b11)
+
+    def test_bitmap_follows_reservation(self):
+        # Test case for updating the bitmap on create, update and delete
+        reservation = Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=2, date_and_time=self.start,
+            duration=timedelta(hours=1)
+        )
+        bitmap = TableSlotBitmap.objects.get(table=self.table, day=self.start.date())
+        self.assertEqual(bitmap.bits, 0b1111 << 72)
+
+        reservation.date_and_time = self.start + timedelta(hours=2)
+        reservation.save()
+        bitmap.refresh_from_db()
+        self.assertEqual(bitmap.bits, 0b1111 << 80)
+
+        reservation.delete()
+        bitmap.refresh_from_db()
+        self.assertEqual(bitmap.bits, 0)
+
+    def test_rebuild_keeps_shared_slot(self):
+        # Test case for keeping a slot shared by two reservations occupied
+        Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=2, date_and_time=self.start,
+            duration=timedelta(minutes=20)
+        )
+        second = Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=2,
+            date_and_time=self.start + timedelta(minutes=20), duration=timedelta(minutes=40)
+        )
+        second.delete()
+        bitmap = TableSlotBitmap.objects.get(table=self.table, day=self.start.date())
+        self.assertEqual(bitmap.bits, 0b11 << 72)
+
+    def test_delete_table_with_reservations(self):
+        # Test case for deleting a table whose future reservations and bitmaps go with it
+        for day in range(3):
+            reservation = Reservation.objects.create(
+                user=self.user, table=self.table, number_of_people=2,
+                date_and_time=self.start + timedelta(days=day), duration=timedelta(hours=1)
+            )
+        ReservationRecurrence.objects.create(reservation=reservation, frequency=ReservationRecurrence.WEEKLY)
+        response = self.client.delete(reverse('table-detail', args=[self.table.id]))
+        self.assertEqual(response.status_code, 204)
+        connection.check_constraints()
+        self.assertFalse(TableSlotBitmap.objects.filter(table_id=self.table.id).exists())
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import promotions
+from app.models import User, Table, Reservation, MenuItem, Order, OrderItem
+
+
+class SparseFieldsTest(TestCase):
+    def setUp(self):
+        promotions.invalidate()
+        promotions.evaluator()
+        self.user = User.objects.create(name="Test User")
+        self.table = Table.objects.create(min_people=2, max_people=6)
+        self.burger = MenuItem.objects.create(name="Burger", description="Tasty", price=10.0)
+        self.reservation = Reservation.objects.create(user=self.user, table=self.table, number_of_people=2,
+                                                      date_and_time=timezone.now() + timedelta(days=1),
+                                                      duration=timedelta(hours=1))
+        self.order = Order.objects.create(user=self.user, status="pending")
+        OrderItem.objects.create(order=self.order, item=self.burger, amount=2)
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        # Only the select list; an aggregating queryset still groups by every column
+        return response.json(), context.captured_queries[0]['sql'].split(' FROM ')[0]
+
+    def test_menu_items(self):
+        # Test case for narrowing the menu item list and its column list
+        data, sql = self.get(reverse('menuitem-list'), {"fields": "id,name,price"})
+        self.assertEqual(data['results'], [{"id": self.burger.id, "name": "Burger", "price": 10.0}])
+        self.assertNotIn('"description"', sql)
+
+    def test_reservations(self):
+        # Test case for narrowing a reservation and its column list
+        data, sql = self.get(reverse('reservation-detail', args=[self.reservation.id]),
+                             {"fields": "id,date_and_time,table"})
+        self.assertEqual(list(data), ["id", "table", "date_and_time"])
+        self.assertNotIn('"number_of_people"', sql)
+
+    def test_orders(self):
+        # Test case for loading only the order columns the selected fields read
+        data, sql = self.get(reverse('order-list'), {"fields": "id,status"})
+        self.assertEqual(data['results'], [{"id": self.order.id, "status": "pending"}])
+        self.assertNotIn('"created_at"', sql)
+        data, _ = self.get(reverse('order-list'), {"fields": "id,total", "omit": "id"})
+        self.assertEqual(data['results'], [{"total": 20.0}])
+        data, _ = self.get(reverse('order-detail', args=[self.order.id]), {"omit": "order_items,user_id"})
+        self.assertEqual(list(data), ["id", "status", "discount", "total", "item_count"])
+
+    def test_nested_action(self):
+        # Test case for narrowing the rows of a nested listing
+        data, _ = self.get(f"{reverse('user-detail', args=[self.user.id])}orders/", {"fields": "id"})
+        self.assertEqual(data['results'], [{"id": self.order.id}])
+
+    def test_unknown_field(self):
+        # Test case for rejecting fields the resource does not have
+        response = self.client.get(reverse('menuitem-list'), {"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": ["Unknown fields: secret."]})
+
+    def test_writes_use_all_fields(self):
+        # Test case for ignoring sparse fieldsets on write requests
+        response = self.client.post(f"{reverse('user-list')}?fields=id", {"name": "Ann"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(response.json()), {"id", "name"})
@@ -1,7 +1,12 @@
+from unittest import mock
+
+from django.db import DatabaseError
 from django.test import TestCase, Client
 from django.urls import reverse
+from app import promotions, slots
 from app.models import User, Table, Reservation, MenuItem, Order, OrderItem
 from datetime import timedelta
+from django.utils import timezone
 
 
 class UserViewSetTest(TestCase):
@@ -53,16 +58,16 @@ class UserViewSetTest(TestCase):
         )
         response = self.client.get(f"{self.user_url}reservations/")
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json()), 1)
-        self.assertEqual(response.json()[0]['id'], reservation.id)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(response.json()['results'][0]['id'], reservation.id)
 
     def test_get_user_orders(self):
         # Test case for getting the orders of a specific user
         order = Order.objects.create(user=self.user, status="Pending")
         response = self.client.get(f"{self.user_url}orders/")
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json()), 1)
-        self.assertEqual(response.json()[0]['id'], order.id)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(response.json()['results'][0]['id'], order.id)
 
 
 class TableViewSetTest(TestCase):
@@ -106,6 +111,41 @@ class TableViewSetTest(TestCase):
         self.assertEqual(response.json()['min_people'], created_table.min_people)
         self.assertEqual(response.json()['max_people'], created_table.max_people)
 
+    def test_get_availability(self):
+        # Test case for searching free slots around an existing reservation
+        start = (timezone.now() + timedelta(days=1)).replace(hour=18, minute=0, second=0, microsecond=0)
+        Table.objects.create(min_people=8, max_people=10)
+        Reservation.objects.create(
+            user=User.objects.create(name="Test User"), table=self.table, number_of_people=4,
+            date_and_time=start + timedelta(hours=1), duration=timedelta(hours=1)
+        )
+        params = {"people": 4, "start": start.isoformat(), "end": (start + timedelta(hours=3)).isoformat(),
+                  "slot": "00:30:00", "duration": "01:00:00"}
+        response = self.client.get(reverse('table-availability'), params)
+        self.assertEqual(response.status_code, 200)
+        starts = [slot['start'] for slot in response.json() if slot['table'] == self.table.id]
+        expected = [start, start + timedelta(hours=2), start + timedelta(hours=2, minutes=30)]
+        self.assertEqual(starts, [time.isoformat().replace('+00:00', 'Z') for time in expected])
+        self.assertEqual({slot['table'] for slot in response.json()}, {self.table.id})
+
+    def test_get_day_grid(self):
+        # Test case for getting the occupied slots of every table on a day
+        start = (timezone.now() + timedelta(days=1)).replace(hour=18, minute=0, second=0, microsecond=0)
+        Reservation.objects.create(
+            user=User.objects.create(name="Test User"), table=self.table, number_of_people=4,
+            date_and_time=start, duration=timedelta(minutes=30)
+        )
+        response = self.client.get(reverse('table-day-grid'), {"date": start.date().isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"table": self.table.id, "slots": "0" * 72 + "11" + "0" * 22}])
+
+    def test_get_availability_invalid_window(self):
+        # Test case for rejecting an empty search window
+        start = timezone.now() + timedelta(days=1)
+        params = {"people": 2, "start": start.isoformat(), "end": start.isoformat(), "duration": "01:00:00"}
+        response = self.client.get(reverse('table-availability'), params)
+        self.assertEqual(response.status_code, 400)
+
 
 class ReservationViewSetTest(TestCase):
     # Test case for ReservationViewSet
@@ -131,6 +171,121 @@ class ReservationViewSetTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['id'], self.reservation.id)
 
+    def test_get_reservation_list_time_status(self):
+        # Test case for filtering reservations by time status
+        now = timezone.now()
+        current = Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=4, date_and_time=now - timedelta(minutes=30),
+            duration=timedelta(hours=1)
+        )
+        upcoming = Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=4, date_and_time=now + timedelta(days=1),
+            duration=timedelta(hours=1)
+        )
+        expected = {"past": self.reservation.id, "current": current.id, "upcoming": upcoming.id}
+        for time_status, reservation_id in expected.items():
+            response = self.client.get(reverse('reservation-list'), {"time_status": time_status})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row['id'] for row in response.json()['results']], [reservation_id])
+
+        response = self.client.get(reverse('reservation-list'), {"time_status": "someday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_reservation_list_date_range(self):
+        # Test case for filtering reservations by a range of start times
+        params = {"start": "2025-05-15T00:00:00Z", "end": "2025-05-16T00:00:00Z"}
+        response = self.client.get(reverse('reservation-list'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.reservation.id])
+
+        params = {"start": "2025-05-16T00:00:00Z"}
+        response = self.client.get(reverse('reservation-list'), params)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_create_reservation_overlap(self):
+        # Test case for rejecting a reservation that overlaps a longer existing one
+        start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=4, date_and_time=start,
+            duration=timedelta(hours=3)
+        )
+        data = {"user": self.user.id, "table": self.table.id, "number_of_people": 2,
+                "date_and_time": (start + timedelta(hours=2)).isoformat(), "duration": "00:30:00"}
+        response = self.client.post(reverse('reservation-list'), data)
+        self.assertEqual(response.status_code, 400)
+
+        data["date_and_time"] = (start + timedelta(hours=3)).isoformat()
+        response = self.client.post(reverse('reservation-list'), data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['end_time'], (start + timedelta(hours=3, minutes=30)).isoformat()
+                         .replace('+00:00', 'Z'))
+
+    def test_create_reservation_without_table(self):
+        # Test case for assigning a table automatically
+        start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        small_table = Table.objects.create(min_people=1, max_people=2)
+        data = {"user": self.user.id, "number_of_people": 2, "date_and_time": start.isoformat(),
+                "duration": "01:00:00"}
+        response = self.client.post(reverse('reservation-list'), data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['table'], small_table.id)
+
+    def test_update_reservation_keeps_own_slot(self):
+        # Test case for updating a reservation without conflicting with itself
+        start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        reservation = Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=4, date_and_time=start,
+            duration=timedelta(hours=2)
+        )
+        url = reverse('reservation-detail', args=[reservation.id])
+        response = self.client.patch(url, {"duration": "02:30:00"}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.end_time, start + timedelta(hours=2, minutes=30))
+
+
+    def test_bulk_create_reservations(self):
+        # Test case for importing a batch of reservations
+        start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        other_table = Table.objects.create(min_people=1, max_people=2)
+        data = [
+            {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+             "date_and_time": start.isoformat(), "duration": "01:00:00"},
+            {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+             "date_and_time": (start + timedelta(hours=1)).isoformat(), "duration": "01:00:00"},
+            {"user": self.user.id, "table": other_table.id, "number_of_people": 2,
+             "date_and_time": start.isoformat(), "duration": "01:00:00"},
+        ]
+        response = self.client.post(reverse('reservation-bulk'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(Reservation.objects.filter(date_and_time__gte=start).count(), 3)
+        day = timezone.localdate(start)
+        self.assertTrue(slots.day_grid([other_table.id], day)[other_table.id]
+                        & slots.slot_masks(start, start + timedelta(hours=1))[day])
+
+    def test_bulk_create_reservations_conflicts(self):
+        # Test case for reporting per-row errors and creating nothing
+        start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        Reservation.objects.create(
+            user=self.user, table=self.table, number_of_people=4, date_and_time=start,
+            duration=timedelta(hours=1)
+        )
+        data = [
+            {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+             "date_and_time": (start + timedelta(minutes=30)).isoformat(), "duration": "01:00:00"},
+            {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+             "date_and_time": (start + timedelta(hours=2)).isoformat(), "duration": "01:00:00"},
+            {"user": self.user.id, "table": self.table.id, "number_of_people": 4,
+             "date_and_time": (start + timedelta(hours=2, minutes=30)).isoformat(), "duration": "01:00:00"},
+            {"user": self.user.id, "table": self.table.id, "number_of_people": 20,
+             "date_and_time": (start + timedelta(hours=5)).isoformat(), "duration": "01:00:00"},
+        ]
+        response = self.client.post(reverse('reservation-bulk'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [0, 2, 3])
+        self.assertEqual(Reservation.objects.filter(date_and_time__gte=start).count(), 1)
+
 
 class MenuItemViewSetTest(TestCase):
     # Test case for MenuItemViewSet
@@ -157,6 +312,9 @@ class OrderViewSetTest(TestCase):
     def setUp(self):
         # Set up the test client and create an order
         self.client = Client()
+        # Compile the (empty) promotions up front so that the query counts do not depend on test order
+        promotions.invalidate()
+        promotions.evaluator()
         self.user = User.objects.create(name="Test User")
         self.order = Order.objects.create(user=self.user, status="Pending")
         self.order_url = reverse('order-detail', args=[self.order.id])
@@ -189,15 +347,99 @@ class OrderViewSetTest(TestCase):
         # Assert that the response status is 201 Created
         self.assertEqual(response.status_code, 201)
 
-        # Assert that the order was created in the database
-        self.assertTrue(Order.objects.filter(user=user, status="Preparing").exists())
+        # Assert that the order was created in the database, with the status normalised
+        self.assertTrue(Order.objects.filter(user=user, status="preparing").exists())
 
         # Assert that the response contains the correct data
-        created_order = Order.objects.get(user=user, status="Preparing")
+        created_order = Order.objects.get(user=user, status="preparing")
         self.assertEqual(response.json()['user_id'], created_order.user.id)
         self.assertEqual(response.json()['status'], created_order.status)
 
 
+    def test_create_order_with_items(self):
+        # Test case for creating an order with nested lines in one request
+        items = [MenuItem.objects.create(name=f"Burger {i}", description="Tasty", price=10.0) for i in range(5)]
+        data = {"user_id": self.user.id, "status": "pending",
+                "order_items": [{"item_id": item.id, "amount": 2} for item in items]}
+        # User and menu item lookups, savepoint, order insert, line bulk insert, sales rollup
+        # aggregate and upsert, co-occurrence upsert, priced lines and their discounts, release,
+        # then the annotated order and its lines for the response
+        with self.assertNumQueries(13):
+            response = self.client.post(reverse('order-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([line['item_id'] for line in response.json()['order_items']], [item.id for item in items])
+        self.assertEqual(OrderItem.objects.filter(order_id=response.json()['id']).count(), 5)
+        self.assertEqual(response.json()['total'], 100.0)
+        self.assertEqual(response.json()['item_count'], 10)
+        self.assertEqual(response.json()['order_items'][0]['line_total'], 20.0)
+
+    def test_get_order_list_totals(self):
+        # Test case for listing orders with totals in a constant number of queries
+        item = MenuItem.objects.create(name="Fries", description="Crispy", price=2.5)
+        for _ in range(4):
+            order = Order.objects.create(user=self.user, status="pending")
+            OrderItem.objects.bulk_create([OrderItem(order=order, item=item, amount=amount) for amount in (1, 3)])
+        # Annotated orders, annotated lines
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('order-list'))
+        self.assertEqual(response.status_code, 200)
+        totals = [(order['total'], order['item_count']) for order in response.json()['results']]
+        self.assertEqual(totals, [(0.0, 0)] + [(10.0, 4)] * 4)
+
+    def test_create_order_with_unknown_item(self):
+        # Test case for rejecting lines that reference missing menu items
+        data = {"user_id": self.user.id, "status": "pending", "order_items": [{"item_id": 999, "amount": 1}]}
+        response = self.client.post(reverse('order-list'), data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_update_order_status(self):
+        # Test case for allowing only the transitions of the order state machine
+        order = Order.objects.create(user=self.user, status="preparing")
+        url = reverse('order-detail', args=[order.id])
+        response = self.client.patch(url, {"status": "pending"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(url, {"status": "unknown"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(url, {"status": "ready"}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], "ready")
+
+    def test_transition_orders(self):
+        # Test case for moving many orders to a status with one conditional update
+        orders = [Order.objects.create(user=self.user, status=status)
+                  for status in ("preparing", "preparing", "pending", "served")]
+        ids = [order.id for order in orders] + [999]
+        # The update, in a savepoint inside the test's transaction
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('order-transition'), {"ids": ids, "status": "ready"},
+                                        content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "ready", "moved": [orders[0].id, orders[1].id],
+                                           "skipped": [orders[2].id, orders[3].id, 999]})
+        self.assertEqual(list(Order.objects.filter(id__in=ids).values_list('status', flat=True)),
+                         ["ready", "ready", "pending", "served"])
+
+    def test_transition_orders_atomic(self):
+        # Test case for leaving every status as it was when a later step of a transition fails
+        order = Order.objects.create(user=self.user, status="preparing")
+        with mock.patch("app.views.sales.record_orders", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse('order-transition'), {"ids": [order.id], "status": "cancelled"},
+                                 content_type="application/json")
+        order.refresh_from_db()
+        self.assertEqual(order.status, "preparing")
+
+    def test_transition_orders_invalid(self):
+        # Test case for rejecting unknown statuses and empty batches
+        response = self.client.post(reverse('order-transition'), {"ids": [self.order.id], "status": "eaten"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('order-transition'), {"ids": [], "status": "ready"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
 class OrderItemViewSetTest(TestCase):
     # Test case for OrderItemViewSet
     def setUp(self):
@@ -5,7 +5,8 @@ URL configuration for the app.
 from django.urls import path, include
 from rest_framework import routers
 
-from app.views import UserViewSet, TableViewSet, ReservationViewSet, MenuItemViewSet, OrderItemViewSet, OrderViewSet
+from app.views import UserViewSet, TableViewSet, ReservationViewSet, MenuItemViewSet, OrderItemViewSet, OrderViewSet, \
+    ReportViewSet, KitchenViewSet, PromotionViewSet
 
 router = routers.DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -14,6 +15,9 @@ router.register(r'reservations', ReservationViewSet, basename='reservation')
 router.register(r'menu-items', MenuItemViewSet, basename='menuitem')
 router.register(r'order-items', OrderItemViewSet, basename='orderitem')
 router.register(r'orders', OrderViewSet, basename='order')
+router.register(r'promotions', PromotionViewSet, basename='promotion')
+router.register(r'reports', ReportViewSet, basename='report')
+router.register(r'kitchen', KitchenViewSet, basename='kitchen')
 
 # Wire up our API using automatic URL routing.
 # Additionally, we include login URLs for the browsable API.
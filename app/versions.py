@@ -0,0 +1,74 @@
+"""
+Invalidation of process-local caches across processes.
+
+Caches such as the compiled promotions live in each worker process. A
+change bumps a Version row in the same transaction as the change itself, so
+the new value becomes visible to every process when it commits. A process
+re-reads the value at most every CHECK_SECONDS and rebuilds its cache when
+it differs from the one the cache was built from, so a cache is stale in
+other processes for at most that long, and reading a cached value costs no
+query in between.
+"""
+import threading
+import time
+
+from app import counters
+from app.models import Version
+
+# How long a process uses its cache before comparing the version again
+CHECK_SECONDS = 5
+
+
+def bump(name):
+    """
+    Counts a change to the rows behind a cache, as part of the current transaction.
+    """
+    counters.increment(Version, ["name"], ["value"], [(name, 1)])
+
+
+def current(name):
+    """
+    Returns the number of changes counted for a cache, with one query.
+    """
+    return Version.objects.filter(name=name).values_list("value", flat=True).first() or 0
+
+
+class LocalCache:
+    """
+    A value built from the database and kept in the process until its
+    version changes or the process drops it.
+
+    Args:
+        name (str): Name of the Version row of the value.
+        build (Callable[[int], Any]): Builds the value for a version.
+    """
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self.value = None
+        self.version = None
+        self.checked = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns the value, rebuilding it when another process has changed its rows.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if self.value is not None and now - self.checked < CHECK_SECONDS:
+                return self.value
+            # Read before building, so that a change made while building is seen by the next check
+            version = current(self.name)
+            if self.value is None or version != self.version:
+                self.value, self.version = self.build(version), version
+            self.checked = now
+            return self.value
+
+    def invalidate(self):
+        """
+        Drops the value of this process, so that the next get() rebuilds it.
+        """
+        with self.lock:
+            self.value = None
@@ -1,14 +1,82 @@
 """
 This module contains the views for the REST API.
 """
-from drf_spectacular.utils import extend_schema_view, extend_schema
-from rest_framework import viewsets
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 
-from app.models import User, Table, Reservation, MenuItem, OrderItem, Order
+from app import inventory, kitchen, promotions, recommendations, sales, slots
+from app.availability import find_available_slots
+from app.bulk import import_reservations, MAX_BATCH_SIZE
+from app.events import publish_on_commit
+from app.fastpath import FastReadMixin
+from app.sparse import SparseQuerysetMixin
+from app.occupancy import occupancy_report
+from app.recurrence import occurrences_in_window
+from app.models import User, Table, Reservation, MenuItem, OrderItem, Order, Promotion, ArchivedReservation, \
+    ArchivedOrder
 from app.serializers import UserSerializer, ReservationSerializer, TableSerializer, MenuItemSerializer, \
-    OrderItemSerializer, OrderSerializer
+    OrderItemSerializer, OrderSerializer, AvailabilityQuerySerializer, AvailableSlotSerializer, \
+    DayGridQuerySerializer, DayGridSerializer, ReservationImportSerializer, ReservationFilterSerializer, \
+    OccupancyQuerySerializer, OccupancySerializer, ArchiveQuerySerializer, OccurrenceQuerySerializer, \
+    OccurrenceSerializer, OrderTransitionSerializer, OrderTransitionResultSerializer, SalesQuerySerializer, \
+    TopItemsQuerySerializer, DailySalesSerializer, TopItemSerializer, RecommendationQuerySerializer, \
+    RecommendationSerializer, KitchenPlanSerializer, KitchenBatchQuerySerializer, KitchenItemSerializer, \
+    OrderPreviewSerializer, OrderPreviewResultSerializer, PromotionSerializer
+
+INCLUDE_ARCHIVED_PARAMETER = OpenApiParameter("include_archived", bool,
+                                              description="Also return rows moved to the archive.")
+# Reservation listings return stored rows, so a recurring reservation appears once
+RECURRENCE_NOTE = (" A recurring reservation is listed once, as its first occurrence with its recurrence rule, "
+                   "and time and date filters apply to that first occurrence only. Use "
+                   "/api/reservations/occurrences/ to list the occurrences within a window.")
+
+
+def include_archived(request):
+    """
+    Returns whether the request explicitly asks for archived rows.
+    """
+    query = ArchiveQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    return query.validated_data['include_archived']
+
+
+def paginated(view, request, querysets, serializer_class):
+    """
+    Returns a page of the rows of the querysets, merged in their common order, as a paginated response.
+    """
+    page = view.paginator.paginate_querysets(querysets, request, view=view)
+    return view.get_paginated_response(serializer_class(page, many=True, context=view.get_serializer_context()).data)
+
+
+class ArchiveFallbackMixin:
+    """
+    ViewSet mixin returning a row moved to the archive when the retrieve action
+    finds no live row with the id. Archived rows keep their ids and are read-only,
+    so every other action still returns 404 for them.
+    """
+    archived_queryset = None
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Returns the live row, or else the archived row with the same id.
+        """
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            try:
+                archived = self.archived_queryset.filter(pk=self.kwargs[self.lookup_url_kwarg or 'pk']).first()
+            except (TypeError, ValueError):
+                archived = None
+            if archived is None:
+                raise
+            return Response(self.get_serializer(archived).data)
 
 
 @extend_schema_view(
@@ -23,11 +91,13 @@ from app.serializers import UserSerializer, ReservationSerializer, TableSerializ
     partial_update=extend_schema(summary="Partially update user", description="Update one or more fields of a user.",
                                  request=UserSerializer, responses={200: UserSerializer, 400: None, 404: None}),
     destroy=extend_schema(summary="Delete user", description="Delete a user by ID.", responses={204: None, 404: None}),
-    reservations=extend_schema(summary="List user reservations", description="Retrieve all reservations for a specific user.",
-                               responses={200: ReservationSerializer}),
-    orders=extend_schema(summary="List user orders", description="Retrieve all orders for a specific user.",
-                         responses={200: OrderSerializer}))
-class UserViewSet(viewsets.ModelViewSet):
+    reservations=extend_schema(summary="List user reservations",
+                               description="Retrieve a page of the reservations of a specific user."
+                                           + RECURRENCE_NOTE,
+                               parameters=[INCLUDE_ARCHIVED_PARAMETER], responses={200: ReservationSerializer}),
+    orders=extend_schema(summary="List user orders", description="Retrieve a page of the orders of a specific user.",
+                         parameters=[INCLUDE_ARCHIVED_PARAMETER], responses={200: OrderSerializer}))
+class UserViewSet(FastReadMixin, viewsets.ModelViewSet):
     """
     A ViewSet for managing users.
     """
@@ -42,9 +112,10 @@ class UserViewSet(viewsets.ModelViewSet):
         Retrieve all reservations for a specific user.
         """
         user = self.get_object()
-        reservations = user.reservations.all()
-        serializer = ReservationSerializer(reservations, many=True)
-        return Response(serializer.data)
+        querysets = [user.reservations.select_related('recurrence')]
+        if include_archived(request):
+            querysets.append(user.archived_reservations.all())
+        return paginated(self, request, querysets, ReservationSerializer)
 
     @action(detail=True, methods=['get'])
     # pylint: disable=unused-argument
@@ -53,9 +124,10 @@ class UserViewSet(viewsets.ModelViewSet):
         Retrieve all orders for a specific user.
         """
         user = self.get_object()
-        orders = user.orders.all()
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        querysets = [user.orders.with_totals().order_by('id')]
+        if include_archived(request):
+            querysets.append(user.archived_orders.prefetch_related('order_items__item'))
+        return paginated(self, request, querysets, OrderSerializer)
 
     def perform_create(self, serializer):
         serializer.save()
@@ -80,10 +152,39 @@ class UserViewSet(viewsets.ModelViewSet):
     destroy=extend_schema(summary="Delete table", description="Delete a table by ID.",
                           responses={204: None, 404: None}),
     reservations=extend_schema(summary="List table reservations",
-                               description="Retrieve all reservations for a specific table.",
-                               responses={200: ReservationSerializer})
+                               description="Retrieve a page of the reservations of a specific table."
+                                           + RECURRENCE_NOTE,
+                               parameters=[INCLUDE_ARCHIVED_PARAMETER], responses={200: ReservationSerializer}),
+    availability=extend_schema(summary="Search free slots",
+                               description="Retrieve every bookable (table, start) pair for a party size "
+                                           "within a time window.",
+                               parameters=[OpenApiParameter("people", int, required=True),
+                                           OpenApiParameter("start", str, required=True,
+                                                            description="Earliest start time (ISO 8601)."),
+                                           OpenApiParameter("end", str, required=True,
+                                                            description="Latest start time, exclusive (ISO 8601)."),
+                                           OpenApiParameter("slot", str,
+                                                            description="Slot granularity, e.g. 00:15:00."),
+                                           OpenApiParameter("duration", str, required=True,
+                                                            description="Reservation length, e.g. 01:30:00.")],
+                               responses={200: AvailableSlotSerializer(many=True), 400: None}),
+    day_grid=extend_schema(summary="Retrieve day grid",
+                           description="Retrieve the occupied 15-minute slots of every table on a day.",
+                           parameters=[OpenApiParameter("date", str,
+                                                        description="The day (YYYY-MM-DD), defaults to today.")],
+                           responses={200: DayGridSerializer(many=True), 400: None}),
+    occupancy=extend_schema(summary="Retrieve occupancy report",
+                            description="Retrieve a table x time bucket occupancy matrix and the seat-hours "
+                                        "utilisation (party size divided by max_people) of every table.",
+                            parameters=[OpenApiParameter("start", str, required=True,
+                                                         description="Start of the window (ISO 8601)."),
+                                        OpenApiParameter("end", str, required=True,
+                                                         description="End of the window (ISO 8601)."),
+                                        OpenApiParameter("bucket", str,
+                                                         description="Bucket length, e.g. 15m, 1h or 1d.")],
+                            responses={200: OccupancySerializer, 400: None})
 )
-class TableViewSet(viewsets.ModelViewSet):
+class TableViewSet(FastReadMixin, viewsets.ModelViewSet):
     """
     A ViewSet for managing tables.
     """
@@ -97,8 +198,58 @@ class TableViewSet(viewsets.ModelViewSet):
         Retrieve all reservations for a specific table.
         """
         table = self.get_object()
-        reservations = table.reservations.all()
-        serializer = ReservationSerializer(reservations, many=True)
+        querysets = [table.reservations.select_related('recurrence')]
+        if include_archived(request):
+            querysets.append(table.archived_reservations.all())
+        return paginated(self, request, querysets, ReservationSerializer)
+
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        Retrieve every bookable (table, start) pair for a party size within a time window.
+        """
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        free_slots = find_available_slots(
+            query.validated_data['people'],
+            query.validated_data['start'],
+            query.validated_data['end'],
+            query.validated_data['slot'],
+            query.validated_data['duration'],
+        )
+        serializer = AvailableSlotSerializer(free_slots, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='day-grid')
+    def day_grid(self, request):
+        """
+        Retrieve the occupied 15-minute slots of every table on a day.
+        """
+        query = DayGridQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        day = query.validated_data.get('date', timezone.localdate())
+        table_ids = Table.objects.values_list('id', flat=True)
+        grid = slots.day_grid(table_ids, day)
+        rows = [
+            {'table': table_id, 'slots': format(bits, f'0{slots.SLOTS_PER_DAY}b')[::-1]}
+            for table_id, bits in grid.items()
+        ]
+        serializer = DayGridSerializer(rows, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def occupancy(self, request):
+        """
+        Retrieve the occupancy matrix and seat-hours utilisation of every table.
+        """
+        query = OccupancyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        report = occupancy_report(
+            query.validated_data['start'],
+            query.validated_data['end'],
+            query.validated_data['bucket'],
+        )
+        serializer = OccupancySerializer(report)
         return Response(serializer.data)
 
     def perform_create(self, serializer):
@@ -106,13 +257,22 @@ class TableViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema_view(
-    list=extend_schema(summary="List reservations", description="Retrieve a paginated list of all reservations.",
-                       responses={200: ReservationSerializer}),
+    list=extend_schema(summary="List reservations",
+                       description="Retrieve a paginated list of reservations, optionally filtered by time status "
+                                   "and by a range of start times." + RECURRENCE_NOTE,
+                       parameters=[OpenApiParameter("time_status", str, enum=["upcoming", "current", "past"]),
+                                   OpenApiParameter("start", str,
+                                                    description="Earliest start time, inclusive (ISO 8601)."),
+                                   OpenApiParameter("end", str,
+                                                    description="Latest start time, exclusive (ISO 8601).")],
+                       responses={200: ReservationSerializer, 400: None}),
     create=extend_schema(summary="Create reservation",
                          description="Create a new reservation with the provided details.",
                          request=ReservationSerializer,
                          responses={201: ReservationSerializer,400: None}),
-    retrieve=extend_schema(summary="Retrieve reservation", description="Get details of a specific reservation by ID.",
+    retrieve=extend_schema(summary="Retrieve reservation",
+                           description="Get details of a specific reservation by ID, also when it has been moved "
+                                       "to the archive.",
                            responses={200: ReservationSerializer, 404: None}),
     update=extend_schema(summary="Update reservation", description="Update all fields of a reservation.",
                          request=ReservationSerializer, responses={200: ReservationSerializer, 400: None, 404: None}),
@@ -121,14 +281,89 @@ class TableViewSet(viewsets.ModelViewSet):
                                  request=ReservationSerializer,
                                  responses={200: ReservationSerializer, 400: None, 404: None}),
     destroy=extend_schema(summary="Delete reservation", description="Delete a reservation by ID.",
-                          responses={204: None, 404: None}))
-class ReservationViewSet(viewsets.ModelViewSet):
+                          responses={204: None, 404: None}),
+    bulk=extend_schema(summary="Import reservations",
+                       description="Create many reservations at once. Nothing is created unless every row "
+                                   "is valid; errors are reported per row index.",
+                       request=ReservationImportSerializer(many=True),
+                       responses={201: ReservationSerializer(many=True), 400: None}),
+    occurrences=extend_schema(summary="List reservation occurrences",
+                              description="Retrieve every occurrence of every reservation within a window, "
+                                          "with recurring reservations expanded.",
+                              parameters=[OpenApiParameter("start", str, required=True,
+                                                           description="Start of the window (ISO 8601)."),
+                                          OpenApiParameter("end", str, required=True,
+                                                           description="End of the window (ISO 8601).")],
+                              responses={200: OccurrenceSerializer(many=True), 400: None}))
+class ReservationViewSet(ArchiveFallbackMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     A ViewSet for managing reservations.
     """
-    queryset = Reservation.objects.all()
+    queryset = Reservation.objects.select_related('recurrence')
+    archived_queryset = ArchivedReservation.objects.all()
     serializer_class = ReservationSerializer
 
+    def get_queryset(self):
+        """
+        Apply the time status and date range filters of the list action.
+        The predicates compare date_and_time and the stored end_time against
+        constants, so each one is answered from an index.
+        """
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        query = ReservationFilterSerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = query.validated_data
+        now = timezone.now()
+
+        time_status = filters.get('time_status')
+        if time_status == 'upcoming':
+            queryset = queryset.filter(date_and_time__gt=now)
+        elif time_status == 'current':
+            queryset = queryset.filter(date_and_time__lte=now, end_time__gt=now)
+        elif time_status == 'past':
+            queryset = queryset.filter(end_time__lte=now)
+
+        if 'start' in filters:
+            queryset = queryset.filter(date_and_time__gte=filters['start'])
+        if 'end' in filters:
+            queryset = queryset.filter(date_and_time__lt=filters['end'])
+        return queryset
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many reservations at once.
+        """
+        if not isinstance(request.data, list):
+            return Response({"detail": "Expected a list of reservations."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > MAX_BATCH_SIZE:
+            return Response({"detail": f"A batch cannot contain more than {MAX_BATCH_SIZE} reservations."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        reservations, errors = import_reservations(request.data)
+        if errors:
+            return Response({"errors": [{"index": index, "errors": row_errors}
+                                        for index, row_errors in sorted(errors.items())]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # One query for the recurrences of all created rows instead of one per row
+        prefetch_related_objects(reservations, 'recurrence')
+        serializer = ReservationSerializer(reservations, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def occurrences(self, request):
+        """
+        Retrieve every occurrence of every reservation within a window.
+        """
+        query = OccurrenceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        occurrences = occurrences_in_window(query.validated_data['start'], query.validated_data['end'])
+        serializer = OccurrenceSerializer(occurrences, many=True)
+        return Response(serializer.data)
+
 
 @extend_schema_view(
     list=extend_schema(summary="List menu items", description="Retrieve a paginated list of all menu items.",
@@ -143,14 +378,47 @@ class ReservationViewSet(viewsets.ModelViewSet):
                                  description="Update one or more fields of a menu item.", request=MenuItemSerializer,
                                  responses={200: MenuItemSerializer, 400: None, 404: None}),
     destroy=extend_schema(summary="Delete menu item", description="Delete a menu item by ID.",
-                          responses={204: None, 404: None}))
-class MenuItemViewSet(viewsets.ModelViewSet):
+                          responses={204: None, 404: None}),
+    recommendations=extend_schema(summary="Frequently ordered together",
+                                  description="Retrieve the menu items most often ordered together with this one.",
+                                  parameters=[OpenApiParameter("limit", int,
+                                                               description=f"Number of items, 1 to "
+                                                                           f"{recommendations.TOP_K}, 5 by default.")],
+                                  responses={200: RecommendationSerializer(many=True), 400: None, 404: None}))
+class MenuItemViewSet(FastReadMixin, viewsets.ModelViewSet):
     """
     A ViewSet for managing menu items.
     """
-    queryset = MenuItem.objects.all()
+    queryset = MenuItem.objects.with_stock().order_by('name')
     serializer_class = MenuItemSerializer
 
+    def perform_create(self, serializer):
+        serializer.save()
+        # Reload with the stock annotated for the response
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    @action(detail=True, methods=['get'])
+    def recommendations(self, request, pk=None):
+        """
+        Returns the items most often ordered together with this one, from the
+        cached co-occurrence counts.
+        """
+        query = RecommendationQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            item_id = int(pk)
+        except ValueError as error:
+            raise NotFound() from error
+        rows = recommendations.recommend(item_id, query.validated_data['limit'])
+        # Only items without any orders need the existence check
+        if not rows and not MenuItem.objects.filter(id=item_id).exists():
+            raise NotFound()
+        return Response(RecommendationSerializer(rows, many=True).data)
+
 
 @extend_schema_view(
     list=extend_schema(summary="List orders", description="Retrieve a paginated list of all orders.",
@@ -159,7 +427,8 @@ class MenuItemViewSet(viewsets.ModelViewSet):
                          description="Create a new order with the provided details.",
                          request=OrderSerializer, responses={201: OrderSerializer, 400: None}),
     retrieve=extend_schema(summary="Retrieve order",
-                           description="Get details of a specific order by ID.",
+                           description="Get details of a specific order by ID, also when it has been moved to the "
+                                       "archive.",
                            responses={200: OrderSerializer, 404: None}),
     update=extend_schema(summary="Update order", description="Update all fields of an order.",
                          request=OrderSerializer,
@@ -169,16 +438,87 @@ class MenuItemViewSet(viewsets.ModelViewSet):
                                  request=OrderSerializer,
                                  responses={200: OrderSerializer, 400: None, 404: None}),
     destroy=extend_schema(summary="Delete order", description="Delete an order by ID.",
-                          responses={204: None, 404: None}))
-class OrderViewSet(viewsets.ModelViewSet):
+                          responses={204: None, 404: None}),
+    transition=extend_schema(summary="Move orders to a status",
+                             description="Move many orders to a new status at once. Only orders whose current "
+                                         "status may move to the new one are changed.",
+                             request=OrderTransitionSerializer,
+                             responses={200: OrderTransitionResultSerializer, 400: None}),
+    preview=extend_schema(summary="Price an order",
+                          description="Price order lines with the active promotions applied, without placing "
+                                      "the order.",
+                          request=OrderPreviewSerializer, responses={200: OrderPreviewResultSerializer, 400: None}))
+class OrderViewSet(ArchiveFallbackMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     A ViewSet for managing orders.
     """
-    queryset = Order.objects.all()
+    queryset = Order.objects.with_totals().order_by('id')
+    archived_queryset = ArchivedOrder.objects.prefetch_related('order_items__item')
     serializer_class = OrderSerializer
 
+    @action(detail=False, methods=['post'])
+    def transition(self, request):
+        """
+        Moves the given orders to a status with one conditional update and
+        reports which of them moved.
+        """
+        query = OrderTransitionSerializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        ids, new_status = query.validated_data['ids'], query.validated_data['status']
+        # One transaction, so that the statuses, the sales rollup and the stock
+        # change together and the commit callbacks run after all of them
+        with transaction.atomic():
+            moved = Order.transition(set(ids), new_status)
+            moved_ids = [order_id for order_id, _ in moved]
+            if moved and not sales.is_counted(new_status):
+                # Uncounted statuses are only reachable from counted ones
+                sales.record_orders(moved_ids, -1)
+            if moved and new_status == 'cancelled':
+                inventory.give_back(inventory.order_amounts(moved_ids))
+            if moved and new_status not in Order.OPEN_STATUSES:
+                transaction.on_commit(lambda: kitchen.orders_closed(moved_ids))
+            if moved:
+                transaction.on_commit(kitchen.invalidate_batches)
+            for order_id, user_id in moved:
+                # The update bypasses the model signals, so publish to the kitchen feed here
+                publish_on_commit({"type": "order.status_changed", "order": order_id, "user": user_id,
+                                   "status": new_status, "previous_status": None})
+        return Response(OrderTransitionResultSerializer({
+            "status": new_status,
+            "moved": moved_ids,
+            "skipped": sorted(set(ids) - set(moved_ids)),
+        }).data)
+
+    @action(detail=False, methods=['post'])
+    def preview(self, request):
+        """
+        Prices the given lines with the compiled promotions.
+        """
+        query = OrderPreviewSerializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        lines = [(line['item_id'], *query.menu_items[line['item_id']], line['amount'])
+                 for line in query.validated_data['order_items']]
+        priced = promotions.evaluator().price(lines, query.validated_data.get('at') or timezone.now())
+        rows = [{"item_id": item_id, "amount": amount, "line_total": round(amount * price, 2),
+                 "discount": discount, "promotion_id": promotion_id}
+                for (item_id, _, price, amount), (discount, promotion_id) in zip(lines, priced)]
+        subtotal = round(sum(row["line_total"] for row in rows), 2)
+        discount = round(sum(row["discount"] for row in rows), 2)
+        return Response(OrderPreviewResultSerializer({
+            "order_items": rows,
+            "subtotal": subtotal,
+            "discount": discount,
+            "total": round(subtotal - discount, 2),
+        }).data)
+
     def perform_create(self, serializer):
         serializer.save()
+        # Reload with the totals annotated for the response
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
 
 
 @extend_schema_view(
@@ -195,9 +535,110 @@ class OrderViewSet(viewsets.ModelViewSet):
                                  responses={200: OrderItemSerializer, 400: None, 404: None}),
     destroy=extend_schema(summary="Delete order item", description="Delete an order item by ID.",
                           responses={204: None, 404: None}))
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     A ViewSet for managing order items.
     """
-    queryset = OrderItem.objects.all()
+    queryset = OrderItem.objects.with_line_totals()
     serializer_class = OrderItemSerializer
+
+
+@extend_schema_view(
+    list=extend_schema(summary="List promotions", description="Retrieve a paginated list of all promotions.",
+                       responses={200: PromotionSerializer}),
+    create=extend_schema(summary="Create promotion", description="Create a new promotion with the provided details.",
+                         request=PromotionSerializer, responses={201: PromotionSerializer, 400: None}),
+    retrieve=extend_schema(summary="Retrieve promotion", description="Get details of a specific promotion by ID.",
+                           responses={200: PromotionSerializer, 404: None}),
+    update=extend_schema(summary="Update promotion", description="Update all fields of a promotion.",
+                         request=PromotionSerializer, responses={200: PromotionSerializer, 400: None, 404: None}),
+    partial_update=extend_schema(summary="Partially update promotion",
+                                 description="Update one or more fields of a promotion.", request=PromotionSerializer,
+                                 responses={200: PromotionSerializer, 400: None, 404: None}),
+    destroy=extend_schema(summary="Delete promotion", description="Delete a promotion by ID.",
+                          responses={204: None, 404: None}))
+class PromotionViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
+    """
+    A ViewSet for managing promotions.
+    """
+    queryset = Promotion.objects.prefetch_related('items')
+    serializer_class = PromotionSerializer
+
+
+SALES_RANGE_PARAMETERS = [
+    OpenApiParameter("start", str, description="First day (YYYY-MM-DD), defaults to six days before the end."),
+    OpenApiParameter("end", str, description="Last day (YYYY-MM-DD), defaults to today."),
+]
+
+
+@extend_schema_view(
+    sales=extend_schema(summary="Daily sales",
+                        description="Quantity sold and revenue per day, by default over the last seven days. "
+                                    "Cancelled orders are not counted.",
+                        parameters=SALES_RANGE_PARAMETERS,
+                        responses={200: DailySalesSerializer(many=True), 400: None}),
+    top_items=extend_schema(summary="Top selling items",
+                            description="Menu items by quantity sold, by default over the last seven days.",
+                            parameters=[*SALES_RANGE_PARAMETERS,
+                                        OpenApiParameter("limit", int, description="Number of items, 10 by default.")],
+                            responses={200: TopItemSerializer(many=True), 400: None}))
+class ReportViewSet(viewsets.ViewSet):
+    """
+    A ViewSet for sales reports, read from the daily sales rollup.
+    """
+
+    @action(detail=False, methods=['get'])
+    def sales(self, request):
+        """
+        Returns the total sales of each day in the range.
+        """
+        query = SalesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rows = sales.sales_by_day(query.validated_data['start'], query.validated_data['end'])
+        return Response(DailySalesSerializer(rows, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='top-items')
+    def top_items(self, request):
+        """
+        Returns the best selling menu items in the range.
+        """
+        query = TopItemsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rows = sales.top_items(query.validated_data['start'], query.validated_data['end'],
+                               query.validated_data['limit'])
+        return Response(TopItemSerializer(rows, many=True).data)
+
+
+@extend_schema_view(
+    plan=extend_schema(summary="Kitchen work plan",
+                       description="Retrieve the queue of batches of every kitchen station for the open orders, "
+                                   "with identical items batched across orders, and the predicted ready time "
+                                   "of each open order.",
+                       responses={200: KitchenPlanSerializer}),
+    batches=extend_schema(summary="Outstanding quantities per item",
+                          description="Retrieve the total quantity of each menu item over all orders in a status, "
+                                      "so that identical items can be prepared together.",
+                          parameters=[OpenApiParameter("status", str, enum=Order.STATUSES,
+                                                       description="Order status, preparing by default.")],
+                          responses={200: KitchenItemSerializer(many=True), 400: None}))
+class KitchenViewSet(viewsets.ViewSet):
+    """
+    A ViewSet for the kitchen's view of the open orders.
+    """
+
+    @action(detail=False, methods=['get'])
+    def plan(self, request):
+        """
+        Returns the current work plan of the kitchen stations.
+        """
+        return Response(KitchenPlanSerializer(kitchen.current_plan()).data)
+
+    @action(detail=False, methods=['get'])
+    def batches(self, request):
+        """
+        Returns the outstanding quantity of each menu item over the orders in a status.
+        """
+        query = KitchenBatchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rows = kitchen.outstanding_items(query.validated_data['status'])
+        return Response(KitchenItemSerializer(rows, many=True).data)
@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'burgir.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, as the feed uses the models' signals
+from app.streams import ORDER_STREAM_PATH, order_stream  # pylint: disable=wrong-import-position
+
+
+async def application(scope, receive, send):
+    """
+    Serves the kitchen order feed directly and everything else through Django.
+    """
+    if scope["type"] == "http" and scope["path"] == ORDER_STREAM_PATH:
+        await order_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -129,10 +130,26 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 5
+    # Keyset pagination; clients may ask for up to 100 rows with ?page_size=
+    'DEFAULT_PAGINATION_CLASS': 'app.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
+    # orjson backed JSON first; the classes fall back to the stdlib encoder without orjson
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'app.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# MessagePack for the point of sale clients, when the package is installed
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'app.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'app.renderers.MessagePackParser')
+
 # Spectacular settings
 # https://drf-spectacular.readthedocs.io/en/latest/settings.html
 SPECTACULAR_SETTINGS = {
@@ -2,12 +2,14 @@ import os
 import django
 import random
 from datetime import timedelta
+from django.db import models
 from django.utils import timezone
 
 # Set up Django environment
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "burgir.settings")
 django.setup()
 
+from app.assignment import assign_table
 from app.models import User, Table, MenuItem, Order, OrderItem, Reservation
 
 # Support functions:
@@ -53,30 +55,6 @@ def get_next_available_item_number(item_type):
 
     return new_number
 
-def is_table_available(table, start_time, duration):
-    """
-    Checks if a table is available at a given time.
-
-    Args:
-        table (Table): The table to check availability for.
-        start_time (datetime): The desired reservation start time.
-        duration (timedelta): The duration of the reservation.
-
-    Returns:
-        bool: True if the table is available, False otherwise.
-    """
-    end_time = start_time + duration
-
-    # Check if any existing reservation overlaps
-    overlapping_reservations = Reservation.objects.filter(
-        table=table,
-        date_and_time__lt=end_time,  # Starts before this reservation ends
-    ).filter(
-        date_and_time__gt=start_time - timedelta(minutes=1)  # Ends after this reservation starts
-    )
-
-    return not overlapping_reservations.exists()  # True if no overlap
-
 # Population functions:
 
 def populate_users(n=10):
@@ -196,14 +174,13 @@ def populate_reservations(n=10):
         n (int): Number of reservations to create.
     """
     users = list(User.objects.all())
-    tables = list(Table.objects.all())
-    tables.sort(key=lambda t: t.min_people)
+    max_capacity = Table.objects.aggregate(max_capacity=models.Max("max_people"))["max_capacity"]
 
     if not users:
         print("No users found. Please populate the User model first.")
         return
 
-    if not tables:
+    if max_capacity is None:
         print("No tables found. Please populate the Table model first.")
         return
 
@@ -212,17 +189,14 @@ def populate_reservations(n=10):
     for _ in range(n):
         user = random.choice(users)
 
-        number_of_people = random.randint(1, max(t.max_people for t in tables))
+        number_of_people = random.randint(1, max_capacity)
 
         days_ahead = random.randint(1, 90)
         start_time = timezone.now() + timedelta(days=days_ahead, hours=random.randint(8, 22))
 
         duration = timedelta(minutes=random.choice([30, 60, 90, 120, 150, 180]))
 
-        suitable_table = next(
-            (table for table in tables if table.min_people <= number_of_people <= table.max_people and is_table_available(table, start_time, duration)),
-            None
-        )
+        suitable_table = assign_table(number_of_people, start_time, duration)
 
         if not suitable_table:
             print(f"No available table found for {number_of_people} people at {start_time}.")